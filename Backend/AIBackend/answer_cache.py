@@ -0,0 +1,145 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple, FrozenSet
+
+logger = logging.getLogger(__name__)
+
+# Semantic cache of chat answers: a question whose embedding is close enough to a cached
+# question, and which retrieves the same source chunks, gets the cached answer
+CHAT_ANSWER_CACHE_THRESHOLD = float(os.getenv("CHAT_ANSWER_CACHE_THRESHOLD", "0.95"))
+CHAT_ANSWER_CACHE_ENTRIES = int(os.getenv("CHAT_ANSWER_CACHE_ENTRIES", "512"))
+CHAT_ANSWER_CACHE_TTL_SECONDS = float(os.getenv("CHAT_ANSWER_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = sum(x * x for x in a) ** 0.5
+    norm_b = sum(y * y for y in b) ** 0.5
+    if not norm_a or not norm_b:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+class SemanticAnswerCache:
+    """Cached answers grouped by the set of source chunk IDs they were generated from.
+
+    Entries are only compared with questions that retrieved exactly the same chunks, so a
+    lookup for a question with unseen sources needs no embedding at all. Answers are stored
+    without an embedding; the cached question is embedded only once another question with
+    the same sources needs comparing.
+    """
+
+    def __init__(self, threshold: float = CHAT_ANSWER_CACHE_THRESHOLD, max_entries: int = CHAT_ANSWER_CACHE_ENTRIES,
+                 ttl_seconds: float = CHAT_ANSWER_CACHE_TTL_SECONDS):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # (sources, question key) -> (question embedding or None, response, created_at, question), in LRU order
+        self._entries: "OrderedDict[Tuple[FrozenSet[str], str], Tuple[Optional[List[float]], Dict[str, Any], float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @staticmethod
+    def source_key(source_ids: List[str]) -> FrozenSet[str]:
+        return frozenset(source_ids)
+
+    @staticmethod
+    def question_key(question: str) -> str:
+        return question.strip().lower()
+
+    def _fresh(self, key, now: float) -> bool:
+        if now - self._entries[key][2] > self.ttl_seconds:
+            del self._entries[key]
+            return False
+        return True
+
+    def _hit(self, key, score: Optional[float] = None) -> Dict[str, Any]:
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        logger.info("Semantic answer cache hit" + (f" (similarity {score:.3f})" if score is not None else " (same question)"))
+        return dict(self._entries[key][1])
+
+    def exact(self, question: str, source_ids: List[str]) -> Optional[Dict[str, Any]]:
+        """The answer cached for the same question and sources, found without any embedding.
+        Not counted as a miss, since a semantic lookup may follow"""
+        key = (self.source_key(source_ids), self.question_key(question))
+        with self._lock:
+            if key in self._entries and self._fresh(key, time.time()):
+                return self._hit(key)
+        return None
+
+    def unembedded_questions(self, source_ids: List[str]) -> List[str]:
+        """Cached questions with these sources that have not been embedded yet"""
+        sources = self.source_key(source_ids)
+        with self._lock:
+            return [entry[3] for key, entry in self._entries.items() if key[0] == sources and entry[0] is None]
+
+    def set_embedding(self, question: str, source_ids: List[str], question_embedding: List[float]) -> None:
+        key = (self.source_key(source_ids), self.question_key(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (question_embedding, *entry[1:])
+
+    def has_candidates(self, source_ids: List[str]) -> bool:
+        """True when some cached answer was generated from these chunks"""
+        sources = self.source_key(source_ids)
+        with self._lock:
+            return any(key[0] == sources for key in self._entries)
+
+    def lookup(self, question_embedding: List[float], source_ids: List[str]) -> Optional[Dict[str, Any]]:
+        sources = self.source_key(source_ids)
+        now = time.time()
+        best_key, best_score = None, self.threshold
+        with self._lock:
+            for key in list(self._entries):
+                if not self._fresh(key, now) or key[0] != sources or self._entries[key][0] is None:
+                    continue
+                score = cosine_similarity(question_embedding, self._entries[key][0])
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                self._stats["misses"] += 1
+                return None
+            return self._hit(best_key, best_score)
+
+    def miss(self) -> None:
+        """Count a lookup that was decided without comparing embeddings"""
+        with self._lock:
+            self._stats["misses"] += 1
+
+    def store(self, question: str, question_embedding: Optional[List[float]], source_ids: List[str],
+              response: Dict[str, Any]) -> None:
+        if not source_ids:
+            return
+        key = (self.source_key(source_ids), self.question_key(question))
+        with self._lock:
+            self._entries[key] = (question_embedding, dict(response), time.time(), question)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, summary: Optional[Dict[str, Any]] = None) -> None:
+        """Drop every cached answer; registered as a re-index listener"""
+        with self._lock:
+            self._entries.clear()
+            self._stats["invalidations"] += 1
+        logger.info("Semantic answer cache invalidated after re-index")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            entries = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({
+            "entries": entries,
+            "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+            "threshold": self.threshold
+        })
+        return stats
+
+
+answer_cache = SemanticAnswerCache()
@@ -0,0 +1,63 @@
+"""
+Benchmark the batched embedding pipeline offline with the deterministic fake embedder.
+
+Compares one request per chunk (what an unbatched build does) with the batched,
+concurrent pipeline, then measures a resumed build against a warm checkpoint.
+
+Usage:
+    python benchmarks/benchmark_embeddings.py [--chunks 2000] [--latency 0.05] [--rpm 600]
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_pipeline import BatchedEmbeddings, EmbeddingCheckpoint, FakeEmbeddings
+
+
+def make_texts(count):
+    return [f"PN/BW notice chunk {i}: component R5{i % 30:02d}.{i % 7} change details " * 8 for i in range(count)]
+
+
+def run(label, pipeline, texts):
+    start = time.perf_counter()
+    pipeline.embed_documents(texts)
+    elapsed = time.perf_counter() - start
+    stats = pipeline.stats()
+    print(f"{label:<28}{elapsed:>10.2f}{len(texts) / elapsed:>14.1f}{stats['requests']:>10}"
+          f"{stats['rate_limited']:>10}{stats['checkpoint_hits']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the batched embedding pipeline.')
+    parser.add_argument('--chunks', type=int, default=2000, help='Number of chunks to embed')
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated seconds per request')
+    parser.add_argument('--rpm', type=float, default=600, help='Simulated requests-per-minute quota')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    texts = make_texts(args.chunks)
+    print(f"{'Variant':<28}{'Time (s)':>10}{'Chunks/s':>14}{'Requests':>10}{'429s':>10}{'Resumed':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def pipeline(batch_size, concurrency, checkpoint_name=None):
+            checkpoint = EmbeddingCheckpoint(os.path.join(tmp, checkpoint_name)) if checkpoint_name else None
+            return BatchedEmbeddings(
+                FakeEmbeddings(latency_seconds=args.latency, requests_per_minute=args.rpm), model_name="fake",
+                batch_size=batch_size, concurrency=concurrency, requests_per_minute=args.rpm, checkpoint=checkpoint
+            )
+
+        # The unbatched variant is capped so a default run stays short
+        sample = texts[:min(len(texts), 50)]
+        run(f"unbatched ({len(sample)} chunks)", pipeline(1, 1), sample)
+        run("batched, sequential", pipeline(args.batch_size, 1), texts)
+        run("batched, concurrent", pipeline(args.batch_size, args.concurrency, "build.sqlite3"), texts)
+        run("resumed from checkpoint", pipeline(args.batch_size, args.concurrency, "build.sqlite3"), texts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Measure server cold start: how long `import server` takes in a fresh interpreter, which
+modules dominate it, and how long the background warm-up takes to report ready.
+
+Usage:
+    python benchmarks/benchmark_startup.py [--runs 5] [--top 15] [--warmup]
+"""
+import os
+import sys
+import argparse
+import subprocess
+import statistics
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_import(module, env):
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=backend_dir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def top_imports(module, env, top):
+    """Slowest direct imports of the module, as (cumulative seconds, name) from -X importtime"""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=backend_dir,
+                            env=env, capture_output=True, text=True, check=True).stderr
+    parsed = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or "cumulative" in parts[1]:
+            continue
+        name_column = parts[2].rstrip()
+        # One space, then two more per nesting level; level 1 is imported by the module itself
+        level = (len(name_column) - len(name_column.lstrip()) - 1) // 2
+        if level == 1:
+            parsed.append((int(parts[1].strip()) / 1e6, name_column.strip()))
+    return sorted(parsed, reverse=True)[:top]
+
+
+def time_warmup(env):
+    code = (
+        "import time; t = time.perf_counter()\n"
+        "import server\n"
+        "imported = time.perf_counter() - t\n"
+        "server.warmup.start_all()\n"
+        "while not server.warmup.readiness()['ready']:\n"
+        "    if any(c['state'] == 'failed' for c in server.warmup.readiness()['components'].values()): break\n"
+        "    time.sleep(0.05)\n"
+        "print(imported, time.perf_counter() - t)\n"
+        "for name, status in server.warmup.readiness()['components'].items(): print(name, status)\n"
+    )
+    return subprocess.run([sys.executable, "-c", code], cwd=backend_dir, env=env,
+                          capture_output=True, text=True).stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark server import time and warm-up.')
+    parser.add_argument('--module', default='server', help='Module to import')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh-interpreter imports to time')
+    parser.add_argument('--top', type=int, default=15, help='Slowest top-level imports to list')
+    parser.add_argument('--warmup', action='store_true', help='Also time the background warm-up until ready')
+    args = parser.parse_args()
+
+    env = dict(os.environ, WARMUP_ON_STARTUP="false")
+    timings = [time_import(args.module, env) for _ in range(args.runs)]
+    print(f"import {args.module}: median {statistics.median(timings):.3f}s, "
+          f"min {min(timings):.3f}s, max {max(timings):.3f}s over {args.runs} runs")
+
+    print("\nSlowest direct imports (cumulative):")
+    for seconds, name in top_imports(args.module, env, args.top):
+        print(f"  {seconds:>8.3f}s  {name}")
+
+    if args.warmup:
+        print("\nWarm-up:")
+        print(time_warmup(env))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compare full-document tabula extraction with the page-restricted extraction used by
+scn_accumulation.read_release_issue_tables.
+
+Usage:
+    python benchmarks/benchmark_tabula_pages.py [--input data/For_IssuesFixed_KnownIssues]
+"""
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scn_accumulation import issues_dir, find_issue_table_pages, read_issue_tables
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark page-restricted tabula extraction.')
+    parser.add_argument('--input', default=issues_dir, help='Directory containing SCN PDFs')
+    args = parser.parse_args()
+
+    pdf_files = sorted(Path(args.input).glob("*.pdf"))
+    if not pdf_files:
+        print(f"No PDFs found in {args.input}")
+        return
+
+    # Start the JVM once up front so neither variant pays for it in its timings
+    read_issue_tables(str(pdf_files[0]), [1])
+
+    print(f"{'Document':<28}{'Pages':>8}{'Full (s)':>11}{'Scan (s)':>11}{'Restricted (s)':>16}{'Saved (s)':>11}{'Tables':>12}")
+    total_saved = 0.0
+    for pdf_path in pdf_files:
+        full_tables, full_time = time_call(read_issue_tables, str(pdf_path), None)
+        table_pages, scan_time = time_call(find_issue_table_pages, str(pdf_path))
+        if table_pages == []:
+            restricted_tables, restricted_time = [], 0.0
+        else:
+            restricted_tables, restricted_time = time_call(read_issue_tables, str(pdf_path), table_pages)
+
+        saved = full_time - (scan_time + restricted_time)
+        total_saved += saved
+        page_count = "all" if table_pages is None else str(len(table_pages))
+        print(f"{pdf_path.stem:<28}{page_count:>8}{full_time:>11.2f}{scan_time:>11.2f}{restricted_time:>16.2f}"
+              f"{saved:>11.2f}{len(full_tables):>6}/{len(restricted_tables):<5}")
+
+    print(f"\nTotal time saved: {total_saved:.2f}s across {len(pdf_files)} documents")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,19 @@
 import os
 from dotenv import load_dotenv
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
 from langchain_chroma import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
+from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
 from langchain.prompts import PromptTemplate
 import logging
+from contextlib import nullcontext
+from langchain_core.documents import Document
+from typing import Dict, List, Any, AsyncIterator, Optional, Tuple
 from fastapi import HTTPException
+from session_memory import session_store
+from vector_index import IncrementalIndexer
+from embedding_pipeline import create_embeddings
+from hybrid_retriever import BM25Index, HybridRetriever, prefetched_documents
+from answer_cache import answer_cache
 
 
 logging.basicConfig(level=logging.INFO)
@@ -25,6 +30,16 @@ db_dir = os.path.join(current_dir, "db", "chroma_db")
 os.makedirs(docs_dir, exist_ok=True)
 os.makedirs(db_dir, exist_ok=True)
 
+# Also index users' uploaded PDFs from pdfs/<user>/ into the chat knowledge base
+INDEX_USER_PDFS = os.getenv("INDEX_USER_PDFS", "").lower() in ("1", "true", "yes")
+indexer = None
+embedding = None
+bm25_index = BM25Index()
+
+# Tag on the LLM that writes the final answer, so streamed tokens from the
+# question-condensing step can be told apart from the answer itself
+ANSWER_LLM_TAG = "answer_llm"
+
 
 CUSTOM_PROMPT = PromptTemplate(
     template="""You are CrawlShastra's AI assistant, a helpful and knowledgeable chatbot for Honeywell's document management system.
@@ -44,74 +59,74 @@ Helpful Answer:""",
 
 def initialize_vector_store():
     """
-    Initialize or load the vector store with document embeddings.
+    Initialize or load the vector store and bring it in sync with the documents.
+    Only new or changed chunks are embedded; vectors of removed files are deleted.
     """
+    global indexer, embedding
     try:
         logger.info("Initializing embedding model...")
-        embedding = GoogleGenerativeAIEmbeddings(
-            model="models/text-embedding-004"
-        )
+        embedding = create_embeddings()
         
-        if not os.path.exists(os.path.join(db_dir, "chroma.sqlite3")):
-            logger.info("Creating new vector store...")
-            
-            if not any(os.scandir(docs_dir)):
-                raise FileNotFoundError(f"No documents found in {docs_dir}")
-
-            loader = DirectoryLoader(docs_dir, glob="*.txt", loader_cls=TextLoader)
-            documents = loader.load()
-            logger.info(f"Loaded {len(documents)} documents")
-
-            text_splitter = CharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200,
-                separator="\n"
-            )
-            docs = text_splitter.split_documents(documents)
-            logger.info(f"Split into {len(docs)} chunks")
-
-            db = Chroma.from_documents(
-                docs,
-                embedding,
-                persist_directory=db_dir
-            )
-            logger.info("Vector store created successfully")
-            return db
-        else:
-            logger.info("Loading existing vector store...")
-            return Chroma(
-                persist_directory=db_dir,
-                embedding_function=embedding
-            )
+        logger.info("Loading vector store...")
+        db = Chroma(
+            persist_directory=db_dir,
+            embedding_function=embedding
+        )
+
+        indexer = IncrementalIndexer(db, db_dir)
+        summary = indexer.sync(include_user_pdfs=INDEX_USER_PDFS)
+        if not summary["indexed_files"]:
+            raise FileNotFoundError(f"No documents found in {docs_dir}")
+
+        logger.info("Vector store ready")
+        return db
     except Exception as e:
         logger.error(f"Error in vector store initialization: {str(e)}")
         raise
 
+def reindex_knowledge_base(include_user_pdfs: bool = INDEX_USER_PDFS) -> Dict[str, Any]:
+    """Re-sync the vector store after documents (or uploaded PDFs) change."""
+    if indexer is None:
+        raise RuntimeError("Vector store has not been initialized")
+    return indexer.sync(include_user_pdfs=include_user_pdfs)
+
+def get_embedding_stats() -> Dict[str, Any]:
+    """Batching, rate-limit, checkpoint and query-cache counters of the embedding pipeline."""
+    return embedding.stats() if embedding is not None else {}
+
+def get_answer_cache_stats() -> Dict[str, Any]:
+    """Hit rate of the semantic answer cache."""
+    return answer_cache.stats()
+
 def setup_conversation_chain():
     """Set up the conversation chain with the vector store."""
     try:
         logger.info("Setting up conversation chain...")
         vector_store = initialize_vector_store()
+        # Keep the lexical index over the same chunks as the vector store
+        bm25_index.rebuild_from_vector_store(vector_store)
+        indexer.add_listener(lambda summary: bm25_index.rebuild_from_vector_store(vector_store))
+        # Cached answers may cite chunks that no longer exist
+        indexer.add_listener(answer_cache.invalidate)
         
         logger.info("Initializing language model...")
         llm = ChatGoogleGenerativeAI(
             model="gemini-2.0-flash",
             temperature=0.7,
-            convert_system_message_to_human=True
+            convert_system_message_to_human=True,
+            tags=[ANSWER_LLM_TAG]
         )
-        
-        logger.info("Setting up conversation memory...")
-        memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            output_key="answer",
-            return_messages=True
+        condense_question_llm = ChatGoogleGenerativeAI(
+            model="gemini-2.0-flash",
+            temperature=0.7,
+            convert_system_message_to_human=True
         )
         
         logger.info("Creating conversation chain...")
         conversation_chain = ConversationalRetrievalChain.from_llm(
             llm=llm,
-            retriever=vector_store.as_retriever(search_kwargs={"k": 3}),
-            memory=memory,
+            retriever=HybridRetriever(vector_store=vector_store, bm25_index=bm25_index, k=3),
+            condense_question_llm=condense_question_llm,
             combine_docs_chain_kwargs={"prompt": CUSTOM_PROMPT},
             return_source_documents=True,
             chain_type="stuff"
@@ -123,31 +138,170 @@ def setup_conversation_chain():
         logger.error(f"Error in conversation chain setup: {str(e)}")
         raise
 
-def get_conversation_response(conversation_chain, question: str) -> dict:
+def format_conversation_result(result: Dict[str, Any], session_id: Optional[str] = None) -> dict:
+    """Shape a chain result into the answer/sources response."""
+    source_docs = []
+    if "source_documents" in result:
+        logger.info(f"Found {len(result['source_documents'])} relevant documents")
+        for doc in result["source_documents"]:
+            source_docs.append({
+                "content": doc.page_content,
+                "source": doc.metadata.get("source", "Unknown")
+            })
+            logger.info(f"Using source: {doc.metadata.get('source', 'Unknown')}")
+    
+    return {
+        "answer": result["answer"],
+        "sources": source_docs,
+        "session_id": session_id
+    }
+
+def source_ids(docs) -> List[str]:
+    return [doc.id for doc in docs if doc.id]
+
+def lookup_cached_answer(conversation_chain, question: str) -> Tuple[Optional[dict], Optional[List[Document]]]:
+    """
+    Look the question up in the semantic answer cache.
+    Returns (cached response or None, the documents the question retrieves); the chain reuses
+    them through prefetched_documents instead of retrieving again.
+    """
+    if embedding is None:
+        return None, None
+    docs, lexical = conversation_chain.retriever.retrieve(question)
+    ids = source_ids(docs)
+    # Only embed questions when some cached answer came from the same chunks. A question found
+    # lexically made no embedding for retrieval either, so it only matches the same question
+    if not answer_cache.has_candidates(ids):
+        answer_cache.miss()
+        return None, docs
+    cached = answer_cache.exact(question, ids)
+    if cached is not None or lexical:
+        if cached is None:
+            answer_cache.miss()
+        return cached, docs
+    for cached_question in answer_cache.unembedded_questions(ids):
+        answer_cache.set_embedding(cached_question, ids, embedding.embed_query(cached_question))
+    return answer_cache.lookup(embedding.embed_query(question), ids), docs
+
+async def alookup_cached_answer(conversation_chain, question: str) -> Tuple[Optional[dict], Optional[List[Document]]]:
+    """Async version of lookup_cached_answer."""
+    if embedding is None:
+        return None, None
+    docs, lexical = await conversation_chain.retriever.aretrieve(question)
+    ids = source_ids(docs)
+    if not answer_cache.has_candidates(ids):
+        answer_cache.miss()
+        return None, docs
+    cached = answer_cache.exact(question, ids)
+    if cached is not None or lexical:
+        if cached is None:
+            answer_cache.miss()
+        return cached, docs
+    for cached_question in answer_cache.unembedded_questions(ids):
+        answer_cache.set_embedding(cached_question, ids, await embedding.aembed_query(cached_question))
+    return answer_cache.lookup(await embedding.aembed_query(question), ids), docs
+
+def cache_answer(question: str, result: Dict[str, Any], response: dict) -> None:
+    """Store the answer; the question is embedded later, only if a similar lookup needs it"""
+    if embedding is None:
+        return
+    cached = {key: value for key, value in response.items() if key != "session_id"}
+    answer_cache.store(question, None, source_ids(result.get("source_documents", [])), cached)
+
+def _retrieved(question: str, docs: Optional[List[Document]]):
+    """Hand the lookup's documents to the chain's retriever, or do nothing without a lookup"""
+    return prefetched_documents(question, docs) if docs is not None else nullcontext()
+
+def get_conversation_response(conversation_chain, question: str, session_id: Optional[str] = None) -> dict:
     """
     Get a response from the conversation chain.
     """
     try:
         logger.info("Retrieving answer from conversation chain...")
-        result = conversation_chain({"question": question})
-        
-        source_docs = []
-        if "source_documents" in result:
-            logger.info(f"Found {len(result['source_documents'])} relevant documents")
-            for doc in result["source_documents"]:
-                source_docs.append({
-                    "content": doc.page_content,
-                    "source": doc.metadata.get("source", "Unknown")
-                })
-                logger.info(f"Using source: {doc.metadata.get('source', 'Unknown')}")
-        
-        return {
-            "answer": result["answer"],
-            "sources": source_docs
-        }
+        session_id, memory = session_store.get(session_id)
+        history = memory.history()
+        docs = None
+        # Follow-up questions depend on the history, so only standalone questions use the answer cache
+        if not history:
+            cached, docs = lookup_cached_answer(conversation_chain, question)
+            if cached is not None:
+                memory.add_turn(question, cached["answer"])
+                return {**cached, "session_id": session_id}
+        with _retrieved(question, docs):
+            result = conversation_chain({"question": question, "chat_history": history})
+        memory.add_turn(question, result["answer"])
+        response = format_conversation_result(result, session_id)
+        if not history:
+            cache_answer(question, result, response)
+        return response
+    except Exception as e:
+        logger.error(f"Error in conversation chain: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating response: {str(e)}"
+        )
+
+async def aget_conversation_response(conversation_chain, question: str, session_id: Optional[str] = None) -> dict:
+    """
+    Get a response from the conversation chain without blocking the event loop.
+    """
+    try:
+        logger.info("Retrieving answer from conversation chain...")
+        session_id, memory = session_store.get(session_id)
+        history = memory.history()
+        docs = None
+        # Follow-up questions depend on the history, so only standalone questions use the answer cache
+        if not history:
+            cached, docs = await alookup_cached_answer(conversation_chain, question)
+            if cached is not None:
+                memory.add_turn(question, cached["answer"])
+                return {**cached, "session_id": session_id}
+        with _retrieved(question, docs):
+            result = await conversation_chain.ainvoke({"question": question, "chat_history": history})
+        memory.add_turn(question, result["answer"])
+        response = format_conversation_result(result, session_id)
+        if not history:
+            cache_answer(question, result, response)
+        return response
     except Exception as e:
         logger.error(f"Error in conversation chain: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Error generating response: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+async def astream_conversation_response(conversation_chain, question: str,
+                                        session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream the answer as it is generated.
+
+    Yields {"event": "token", "token": ...} for each chunk of the answer, then one
+    {"event": "sources", "answer": ..., "sources": [...], "session_id": ...} once the chain has finished.
+    """
+    logger.info("Streaming answer from conversation chain...")
+    session_id, memory = session_store.get(session_id)
+    history = memory.history()
+    docs = None
+    if not history:
+        cached, docs = await alookup_cached_answer(conversation_chain, question)
+        if cached is not None:
+            memory.add_turn(question, cached["answer"])
+            yield {"event": "token", "token": cached["answer"]}
+            yield {"event": "sources", **cached, "session_id": session_id}
+            return
+    chain_input = {"question": question, "chat_history": history}
+    with _retrieved(question, docs):
+        async for event in conversation_chain.astream_events(chain_input, version="v2"):
+            kind = event["event"]
+            if kind == "on_chat_model_stream" and ANSWER_LLM_TAG in event.get("tags", []):
+                token = event["data"]["chunk"].content
+                if token:
+                    yield {"event": "token", "token": token}
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                # The root chain has finished: the answer is complete and source documents are available
+                result = event["data"]["output"]
+                response = format_conversation_result(result, session_id)
+                memory.add_turn(question, response["answer"])
+                if not history:
+                    cache_answer(question, result, response)
+                yield {"event": "sources", **response}
@@ -0,0 +1,331 @@
+import os
+import time
+import array
+import random
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Embedding stage for index builds: batches chunks, runs a bounded number of concurrent
+# requests behind a token bucket, backs off on 429s and checkpoints every finished batch
+script_dir = os.path.dirname(os.path.abspath(__file__))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_REQUESTS_PER_MINUTE = float(os.getenv("EMBED_REQUESTS_PER_MINUTE", "1500"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+EMBED_BACKOFF_BASE_SECONDS = float(os.getenv("EMBED_BACKOFF_BASE_SECONDS", "1.0"))
+EMBED_BACKOFF_MAX_SECONDS = float(os.getenv("EMBED_BACKOFF_MAX_SECONDS", "60.0"))
+EMBED_CHECKPOINT_PATH = os.getenv("EMBED_CHECKPOINT_PATH", os.path.join(script_dir, "cache", "embeddings.sqlite3"))
+# "google" for the Gemini embedding model, "fake" for the offline deterministic embedder
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "google").lower()
+EMBED_MODEL = "models/text-embedding-004"
+# Chat questions are embedded for every vector search; repeated questions reuse the vector
+QUERY_EMBEDDING_CACHE_ENTRIES = int(os.getenv("QUERY_EMBEDDING_CACHE_ENTRIES", "1024"))
+
+RATE_LIMIT_MARKERS = ("429", "resource exhausted", "resourceexhausted", "rate limit", "quota")
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for 429 / quota errors, whichever client library raised them"""
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+def backoff_delay(attempt: int, base: float = EMBED_BACKOFF_BASE_SECONDS,
+                  maximum: float = EMBED_BACKOFF_MAX_SECONDS) -> float:
+    """Exponential backoff with full jitter, so retrying workers do not hit the API in lockstep"""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a request may be sent"""
+
+    def __init__(self, rate_per_second: float, capacity: Optional[float] = None):
+        self.rate = rate_per_second
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_second)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens, sleeping as needed; returns the time spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def consume(self, tokens: float) -> None:
+        """Charge tokens without waiting (the balance may go negative), e.g. to settle an underestimate"""
+        with self._lock:
+            self._tokens -= tokens
+
+    def refund(self, tokens: float) -> None:
+        """Return tokens taken but not used, e.g. to settle an overestimate"""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+
+class EmbeddingCheckpoint:
+    """SQLite store of finished embeddings keyed by model and text hash, so builds can resume"""
+
+    def __init__(self, db_path: str = EMBED_CHECKPOINT_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array.array("f", blob).tolist()
+        return found
+
+    def set_many(self, items: Dict[str, List[float]], model_name: str = "") -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, created_at) VALUES (?, ?, ?, ?)",
+                [(key, model_name, array.array("f", vector).tobytes(), now) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class FakeRateLimitError(Exception):
+    """Raised by FakeEmbeddings when its simulated quota is exceeded"""
+
+    code = 429
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic offline embedder for tests and benchmarks.
+
+    Vectors are derived from the text hash, so the same text always gets the same vector.
+    latency_seconds simulates a network round trip per request, and requests_per_minute
+    simulates the API quota by raising FakeRateLimitError when it is exceeded.
+    """
+
+    def __init__(self, dimensions: int = 768, latency_seconds: float = 0.0,
+                 requests_per_minute: Optional[float] = None):
+        self.dimensions = dimensions
+        self.latency_seconds = latency_seconds
+        self.requests_per_minute = requests_per_minute
+        self.requests = 0
+        self.rate_limited = 0
+        self._request_times: deque = deque()
+        self._lock = threading.Lock()
+
+    def _request(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self.requests_per_minute:
+                while self._request_times and now - self._request_times[0] > 60:
+                    self._request_times.popleft()
+                if len(self._request_times) >= self.requests_per_minute:
+                    self.rate_limited += 1
+                    raise FakeRateLimitError("429 Resource has been exhausted (e.g. check quota).")
+                self._request_times.append(now)
+            self.requests += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def _vector(self, text: str) -> List[float]:
+        values = []
+        counter = 0
+        while len(values) < self.dimensions:
+            digest = hashlib.sha256(f"{counter}\0{text}".encode("utf-8")).digest()
+            values.extend(byte / 127.5 - 1.0 for byte in digest)
+            counter += 1
+        vector = values[:self.dimensions]
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._request()
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self._request()
+        return self._vector(text)
+
+
+class BatchedEmbeddings(Embeddings):
+    """Wraps an Embeddings model with batching, bounded concurrency, rate limiting and checkpointing.
+
+    embed_documents() looks every text up in the checkpoint first, then embeds the rest in
+    batches on up to `concurrency` workers. Each request takes a token from the bucket, 429s are
+    retried with jittered exponential backoff, and every finished batch is written to the
+    checkpoint straight away, so an interrupted build only re-embeds what it had not finished.
+    """
+
+    def __init__(self, base: Embeddings, model_name: str = EMBED_MODEL, batch_size: int = EMBED_BATCH_SIZE,
+                 concurrency: int = EMBED_CONCURRENCY, requests_per_minute: float = EMBED_REQUESTS_PER_MINUTE,
+                 max_retries: int = EMBED_MAX_RETRIES, checkpoint: Optional[EmbeddingCheckpoint] = None,
+                 query_cache_size: int = QUERY_EMBEDDING_CACHE_ENTRIES):
+        self.base = base
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.checkpoint = checkpoint
+        self.query_cache_size = query_cache_size
+        self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.bucket = TokenBucket(requests_per_minute / 60.0, capacity=max(1.0, float(self.concurrency)))
+        self._lock = threading.Lock()
+        self._stats = {
+            "texts": 0, "checkpoint_hits": 0, "embedded": 0, "requests": 0,
+            "rate_limited": 0, "throttle_wait_seconds": 0.0, "query_cache_hits": 0, "query_cache_misses": 0
+        }
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def _call(self, func, *args):
+        """Call the wrapped model behind the token bucket, retrying rate-limit errors"""
+        attempt = 0
+        while True:
+            self._count("throttle_wait_seconds", self.bucket.acquire())
+            self._count("requests")
+            try:
+                return func(*args)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+                self._count("rate_limited")
+                logger.warning(f"Embedding request rate limited, retrying in {delay:.1f}s (attempt {attempt + 1})")
+                time.sleep(delay)
+                attempt += 1
+
+    def _embed_batch(self, keys: List[str], texts: List[str]) -> Dict[str, List[float]]:
+        vectors = self._call(self.base.embed_documents, texts)
+        embedded = dict(zip(keys, vectors))
+        if self.checkpoint is not None:
+            self.checkpoint.set_many(embedded, self.model_name)
+        self._count("embedded", len(texts))
+        return embedded
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        keys = [EmbeddingCheckpoint.make_key(self.model_name, text) for text in texts]
+        vectors = self.checkpoint.get_many(list(set(keys))) if self.checkpoint is not None else {}
+        self._count("texts", len(texts))
+        self._count("checkpoint_hits", sum(1 for key in keys if key in vectors))
+
+        # Duplicate texts are embedded once
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                pending.setdefault(key, text)
+        pending_keys = list(pending)
+        batches = [pending_keys[start:start + self.batch_size]
+                   for start in range(0, len(pending_keys), self.batch_size)]
+
+        if len(batches) == 1 or self.concurrency == 1:
+            for batch in batches:
+                vectors.update(self._embed_batch(batch, [pending[key] for key in batch]))
+        elif batches:
+            logger.info(f"Embedding {len(pending_keys)} texts in {len(batches)} batches "
+                        f"({self.concurrency} concurrent requests)")
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embed") as pool:
+                futures = [pool.submit(self._embed_batch, batch, [pending[key] for key in batch]) for batch in batches]
+                try:
+                    for future in futures:
+                        vectors.update(future.result())
+                except BaseException:
+                    # Finished batches are already checkpointed; don't start the rest
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._lock:
+            vector = self._query_cache.get(text)
+            if vector is not None:
+                self._query_cache.move_to_end(text)
+                self._stats["query_cache_hits"] += 1
+                return vector
+            self._stats["query_cache_misses"] += 1
+        vector = self._call(self.base.embed_query, text)
+        if self.query_cache_size > 0:
+            with self._lock:
+                self._query_cache[text] = vector
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            query_cache_entries = len(self._query_cache)
+        stats["throttle_wait_seconds"] = round(stats["throttle_wait_seconds"], 3)
+        query_lookups = stats["query_cache_hits"] + stats["query_cache_misses"]
+        stats.update({
+            "query_cache_hit_rate": round(stats["query_cache_hits"] / query_lookups, 4) if query_lookups else 0.0,
+            "query_cache_entries": query_cache_entries,
+            "model": self.model_name,
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+            "requests_per_minute": round(self.bucket.rate * 60, 2),
+            "checkpointed": len(self.checkpoint) if self.checkpoint is not None else 0
+        })
+        return stats
+
+
+def create_embeddings(backend: str = EMBED_BACKEND) -> BatchedEmbeddings:
+    """Embedding model used for the chat knowledge base, wrapped in the batching pipeline"""
+    if backend == "fake":
+        return BatchedEmbeddings(FakeEmbeddings(), model_name="fake", checkpoint=EmbeddingCheckpoint())
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    base = GoogleGenerativeAIEmbeddings(model=EMBED_MODEL)
+    return BatchedEmbeddings(base, model_name=EMBED_MODEL, checkpoint=EmbeddingCheckpoint())
@@ -0,0 +1,153 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Dedicated executor for blocking PDF/LLM/Excel work so it never runs on the event loop
+EXECUTOR_THREAD_WORKERS = int(os.getenv("EXECUTOR_THREAD_WORKERS", "16"))
+
+# Maximum concurrent calls per endpoint; callers beyond the limit queue up and are counted
+# as queue depth. Override with EXECUTOR_LIMIT_<ENDPOINT>, e.g. EXECUTOR_LIMIT_CHAT=8.
+DEFAULT_ENDPOINT_LIMITS = {
+    "chat": 4,
+    "process_migration": 8,
+    "migration_batch": 2,
+    "download_results": 4,
+    "scn_process": 2,
+    "upload_pdf": 8,
+    "reindex": 1,
+    "scn_index": 1,
+    "scn_precompute": 1,
+}
+DEFAULT_ENDPOINT_LIMIT = 4
+WAIT_SAMPLES = 1000
+
+
+class EndpointMetrics:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_times: deque = deque(maxlen=WAIT_SAMPLES)
+        self.run_times: deque = deque(maxlen=WAIT_SAMPLES)
+
+    @staticmethod
+    def _summary(samples: deque) -> Dict[str, float]:
+        if not samples:
+            return {"avg_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(samples)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return {
+            "avg_ms": round(1000 * sum(ordered) / len(ordered), 2),
+            "p99_ms": round(1000 * p99, 2),
+            "max_ms": round(1000 * ordered[-1], 2),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "queue_depth": self.queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "wait_time": self._summary(self.wait_times),
+            "run_time": self._summary(self.run_times),
+        }
+
+
+class ExecutorLayer:
+    """Sized thread pool plus per-endpoint concurrency limits and queueing metrics"""
+
+    def __init__(self, thread_workers: int = EXECUTOR_THREAD_WORKERS):
+        self.thread_workers = thread_workers
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._metrics: Dict[str, EndpointMetrics] = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="blocking")
+            return self._thread_pool
+
+    def _limit_for(self, endpoint: str) -> int:
+        env_limit = os.getenv(f"EXECUTOR_LIMIT_{endpoint.upper()}")
+        if env_limit:
+            return int(env_limit)
+        return DEFAULT_ENDPOINT_LIMITS.get(endpoint, DEFAULT_ENDPOINT_LIMIT)
+
+    def _get_endpoint(self, endpoint: str):
+        with self._lock:
+            if endpoint not in self._semaphores:
+                limit = self._limit_for(endpoint)
+                self._semaphores[endpoint] = asyncio.Semaphore(limit)
+                self._metrics[endpoint] = EndpointMetrics(limit)
+            return self._semaphores[endpoint], self._metrics[endpoint]
+
+    @asynccontextmanager
+    async def limit(self, endpoint: str):
+        """Hold one of the endpoint's concurrency slots, recording queue depth and wait time.
+
+        Yields a dict; set "started_at" in it to count time spent queued inside an executor as wait.
+        """
+        semaphore, metrics = self._get_endpoint(endpoint)
+        timing = {"submitted_at": time.perf_counter()}
+        metrics.queued += 1
+        admitted = False
+        try:
+            async with semaphore:
+                admitted = True
+                metrics.queued -= 1
+                metrics.in_flight += 1
+                timing["started_at"] = time.perf_counter()
+                try:
+                    yield timing
+                    metrics.completed += 1
+                except BaseException:
+                    metrics.failed += 1
+                    raise
+                finally:
+                    metrics.in_flight -= 1
+                    finished_at = time.perf_counter()
+                    metrics.wait_times.append(timing["started_at"] - timing["submitted_at"])
+                    metrics.run_times.append(finished_at - timing["started_at"])
+        finally:
+            # Cancelled while still waiting for a slot
+            if not admitted:
+                metrics.queued -= 1
+
+    async def run(self, endpoint: str, func: Callable, *args, **kwargs) -> Any:
+        """Run func off the event loop, honouring the endpoint's concurrency limit"""
+        loop = asyncio.get_running_loop()
+        async with self.limit(endpoint) as timing:
+            def call():
+                # Runs on the worker, so the wait time includes time spent queued in the pool
+                timing["started_at"] = time.perf_counter()
+                return func(*args, **kwargs)
+            return await loop.run_in_executor(self._get_pool(), call)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {name: m.to_dict() for name, m in self._metrics.items()}
+        return {
+            "thread_workers": self.thread_workers,
+            "endpoints": endpoints,
+        }
+
+
+executor_layer = ExecutorLayer()
+
+
+async def run_blocking(endpoint: str, func: Callable, *args, **kwargs) -> Any:
+    """Shortcut for executor_layer.run"""
+    return await executor_layer.run(endpoint, func, *args, **kwargs)
@@ -0,0 +1,261 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Any, Optional, Sequence
+from llm_cache import get_llm_cache, make_cache_key
+from section_locator import normalize_title
+from scn_patterns import heading_lines
+
+logger = logging.getLogger(__name__)
+
+# Splits an SCN features section into numbered features (6.1, 6.1.1, ...) and summarizes only their
+# descriptions, several per Gemini request. Summaries are cached by a hash of the feature's title and
+# body, so a feature repeated unchanged in later releases is never summarized again.
+FEATURE_SUMMARY_MODEL = "gemini-1.5-flash"
+FEATURE_SUMMARY_BATCH_SIZE = int(os.getenv("FEATURE_SUMMARY_BATCH_SIZE", "8"))
+FEATURE_SUMMARY_BATCH_CHARS = int(os.getenv("FEATURE_SUMMARY_BATCH_CHARS", "12000"))
+# Descriptions are cut here; the opening paragraphs carry what a one-line summary needs
+FEATURE_BODY_MAX_CHARS = int(os.getenv("FEATURE_BODY_MAX_CHARS", "800"))
+# Bodies shorter than this are used as their own summary
+FEATURE_BODY_MIN_CHARS = int(os.getenv("FEATURE_BODY_MIN_CHARS", "60"))
+FEATURE_SUMMARY_VERSION = 1
+
+PAGE_FOOTER = re.compile(r"^\s*-\s*\d+\s*-\s*$")
+
+_lock = threading.Lock()
+_stats = {"features": 0, "cached": 0, "deduplicated": 0, "summarized": 0, "requests": 0, "prompt_chars": 0}
+# Feature hash -> summary being produced right now, so concurrent releases share one request
+_inflight: Dict[str, Future] = {}
+
+
+class Feature:
+    def __init__(self, number: str, title: str, body: str):
+        self.number = number
+        self.title = title
+        self.body = body
+
+    @property
+    def content_hash(self) -> str:
+        """Hash of what the summary depends on; the number is left out since it shifts between releases"""
+        material = f"{normalize_title(self.title)}\n{' '.join(self.body.split())}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"number": self.number, "title": self.title, "body": self.body}
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _lock:
+        _stats[name] += amount
+
+
+def _clean_lines(text: str, section_title: str = "") -> List[str]:
+    """Section lines without page footers ("- 79 -") and running chapter headers"""
+    running_header = normalize_title(section_title)
+    lines = []
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if PAGE_FOOTER.match(stripped):
+            continue
+        if running_header and normalize_title(stripped) == running_header:
+            continue
+        lines.append(stripped)
+    return lines
+
+
+def _heading_positions(lines: Sequence[str], number: str) -> List[int]:
+    pattern = re.compile(rf"^{re.escape(number)}(?![\d.])")
+    return [index for index, line in enumerate(lines) if pattern.match(line)]
+
+
+def parse_features(section_text: str, known: Optional[Sequence[Dict[str, Any]]] = None,
+                   section_title: str = "") -> List[Feature]:
+    """Split a features section into numbered features with title and body.
+
+    `known` is the outline's list of {number, title} (from the SCN index). Each heading is taken
+    at its last occurrence before the next feature's, which skips the subsection list some
+    chapters open with. Without an outline, numbered heading lines are detected directly.
+    """
+    lines = _clean_lines(section_text, section_title)
+    if known:
+        numbers = [(feature["number"], feature["title"]) for feature in known]
+    else:
+        numbers = []
+        for _, number, title in heading_lines(lines):
+            if number not in {seen for seen, _ in numbers}:
+                numbers.append((number, title))
+
+    # Resolve heading lines back to front so each one lies before the following feature's
+    starts: Dict[str, int] = {}
+    limit = len(lines)
+    for number, _ in reversed(numbers):
+        candidates = [index for index in _heading_positions(lines, number) if index < limit]
+        if candidates:
+            starts[number] = candidates[-1]
+            limit = candidates[-1]
+
+    ordered = sorted((index, number, title) for number, title in numbers
+                     for index in [starts.get(number)] if index is not None)
+    features = []
+    for position, (index, number, title) in enumerate(ordered):
+        end = ordered[position + 1][0] if position + 1 < len(ordered) else len(lines)
+        body_lines = lines[index + 1:end]
+        # Skip the title where it sits on its own line(s) below the number
+        title_words = normalize_title(title)
+        heading_text = normalize_title(lines[index][len(number):])
+        while body_lines and heading_text != title_words and title_words.startswith(
+                normalize_title(f"{heading_text} {body_lines[0]}")):
+            heading_text = normalize_title(f"{heading_text} {body_lines.pop(0)}")
+        body = "\n".join(line for line in body_lines if line).strip()
+        features.append(Feature(number, " ".join(title.split()), body))
+    return features
+
+
+def _cache_key(content_hash: str) -> str:
+    return make_cache_key(FEATURE_SUMMARY_MODEL, f"feature-summary:v{FEATURE_SUMMARY_VERSION}:{content_hash}")
+
+
+def build_batch_prompt(features: Sequence[Feature]) -> str:
+    entries = "\n\n".join(
+        f'[{index}] {feature.title}\n{feature.body[:FEATURE_BODY_MAX_CHARS]}' for index, feature in enumerate(features)
+    )
+    return f"""Summarize each software feature below in one clear sentence for an Experion PKS engineer.
+Respond with a JSON object mapping each bracketed number to its summary, e.g. {{"0": "...", "1": "..."}}.
+
+{entries}
+"""
+
+
+def _batches(features: Sequence[Feature]) -> List[List[Feature]]:
+    batches, current, size = [], [], 0
+    for feature in features:
+        length = len(feature.title) + min(len(feature.body), FEATURE_BODY_MAX_CHARS)
+        if current and (len(current) >= FEATURE_SUMMARY_BATCH_SIZE or size + length > FEATURE_SUMMARY_BATCH_CHARS):
+            batches.append(current)
+            current, size = [], 0
+        current.append(feature)
+        size += length
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _summarize_batch(batch: Sequence[Feature]) -> Dict[str, str]:
+    """Feature hash -> summary for one request"""
+    # Imported on first use so parsing features does not load the client
+    from gemini_client import get_gemini_client, parse_json_response
+
+    def validate(text: str) -> None:
+        data = parse_json_response(text)
+        if not isinstance(data, dict) or any(str(index) not in data for index in range(len(batch))):
+            raise ValueError("Summary response does not cover every feature")
+
+    prompt = build_batch_prompt(batch)
+    _count("requests")
+    _count("prompt_chars", len(prompt))
+    text = get_gemini_client().generate(
+        FEATURE_SUMMARY_MODEL, prompt, {"temperature": 0.3, "max_output_tokens": 150 * len(batch)}, validate=validate
+    )
+    data = parse_json_response(text)
+    return {feature.content_hash: " ".join(str(data[str(index)]).split()) for index, feature in enumerate(batch)}
+
+
+def summarize_features(features: Sequence[Feature]) -> Dict[str, str]:
+    """Feature hash -> one-sentence summary, asking Gemini only for features not seen before.
+    Features whose request failed are left out"""
+    cache = get_llm_cache()
+    summaries: Dict[str, str] = {}
+    waiting: Dict[str, Future] = {}
+    owned: Dict[str, Future] = {}
+    pending: List[Feature] = []
+
+    for feature in features:
+        content_hash = feature.content_hash
+        _count("features")
+        if content_hash in summaries or content_hash in waiting or content_hash in owned:
+            _count("deduplicated")
+            continue
+        if len(feature.body) < FEATURE_BODY_MIN_CHARS:
+            summaries[content_hash] = " ".join(feature.body.split()) or feature.title
+            continue
+        cached = cache.get(_cache_key(content_hash))
+        if cached is not None:
+            _count("cached")
+            summaries[content_hash] = cached
+            continue
+        with _lock:
+            future = _inflight.get(content_hash)
+            if future is None:
+                future = Future()
+                _inflight[content_hash] = future
+                owned[content_hash] = future
+                pending.append(feature)
+        if content_hash not in owned:
+            _count("deduplicated")
+            waiting[content_hash] = future
+
+    try:
+        for batch in _batches(pending):
+            try:
+                produced = _summarize_batch(batch)
+            except Exception as e:
+                logger.error(f"Feature summary request failed: {str(e)}")
+                produced = {}
+            for feature in batch:
+                content_hash = feature.content_hash
+                summary = produced.get(content_hash)
+                if summary:
+                    cache.set(_cache_key(content_hash), summary, FEATURE_SUMMARY_MODEL)
+                    summaries[content_hash] = summary
+                    _count("summarized")
+                owned[content_hash].set_result(summary)
+    finally:
+        with _lock:
+            for content_hash, future in owned.items():
+                _inflight.pop(content_hash, None)
+                if not future.done():
+                    future.set_result(summaries.get(content_hash))
+
+    for content_hash, future in waiting.items():
+        summary = future.result()
+        if summary:
+            summaries[content_hash] = summary
+    return summaries
+
+
+def feature_rows(features: Sequence[Feature], summaries: Dict[str, str]) -> List[Dict[str, Any]]:
+    """One {number, title, content_hash, summary} row per feature. Features without a summary get
+    the first line of their description and are marked provisional"""
+    rows = []
+    for feature in features:
+        summary = summaries.get(feature.content_hash)
+        row = {"number": feature.number, "title": feature.title, "content_hash": feature.content_hash,
+               "summary": summary or feature.body.split("\n")[0][:200]}
+        if summary is None:
+            row["provisional"] = True
+        rows.append(row)
+    return rows
+
+
+def format_feature_summaries(rows: Sequence[Dict[str, Any]]) -> str:
+    """Markdown list in the shape the SCN outputs have always used. Rows without a number carry
+    a whole-section summary and are written as they are"""
+    return "\n\n".join(
+        f"- **{row['number']} {row['title']}:** {row['summary']}" if row["number"] else row["summary"] for row in rows
+    )
+
+
+def get_stats() -> Dict[str, Any]:
+    with _lock:
+        stats = dict(_stats)
+    stats["llm_features_share"] = round(stats["summarized"] / stats["features"], 4) if stats["features"] else 0.0
+    return stats
+
+
+def reset_stats() -> None:
+    with _lock:
+        for key in _stats:
+            _stats[key] = 0
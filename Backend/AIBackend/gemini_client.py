@@ -0,0 +1,324 @@
+import os
+import re
+import math
+import time
+import json
+import random
+import hashlib
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Tuple
+from dotenv import load_dotenv
+if __package__:
+    from .embedding_pipeline import TokenBucket, FakeRateLimitError, is_rate_limit_error, backoff_delay
+else:
+    from embedding_pipeline import TokenBucket, FakeRateLimitError, is_rate_limit_error, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# One Gemini client for the whole process: the API is configured once and models are reused,
+# every request passes a requests- and tokens-per-minute budget and an adaptive (AIMD)
+# concurrency cap, and 429s, transient server errors and unparseable JSON are retried
+# "google" for the Gemini API, "fake" for the offline deterministic backend
+GEMINI_BACKEND = os.getenv("GEMINI_BACKEND", "google").lower()
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_INITIAL_CONCURRENCY = int(os.getenv("GEMINI_INITIAL_CONCURRENCY", "4"))
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "1000"))
+GEMINI_TOKENS_PER_MINUTE = float(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+GEMINI_BACKOFF_BASE_SECONDS = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "2.0"))
+GEMINI_BACKOFF_MAX_SECONDS = float(os.getenv("GEMINI_BACKOFF_MAX_SECONDS", "60.0"))
+# Output tokens reserved for a request whose generation_config sets no max_output_tokens
+GEMINI_DEFAULT_OUTPUT_TOKENS = int(os.getenv("GEMINI_DEFAULT_OUTPUT_TOKENS", "1024"))
+
+TRANSIENT_STATUS_CODES = (500, 503, 504)
+TRANSIENT_MARKERS = ("unavailable", "deadline exceeded", "deadlineexceeded", "timed out", "timeout",
+                     "connection reset")
+# A status code leading the message ("503 The service is currently unavailable") or named as a
+# status ("HTTP status 504"); other numbers in a message, such as a row count of 500, do not count
+TRANSIENT_STATUS = re.compile(r"(?:^|\bstatus(?: code)?[\s:=]*)(500|503|504)\b")
+
+
+def is_transient_error(error: Exception) -> bool:
+    """True for server-side failures that are worth retrying (5xx, timeouts, dropped connections)"""
+    if any(getattr(error, name, None) in TRANSIENT_STATUS_CODES for name in ("code", "status_code")):
+        return True
+    if TRANSIENT_STATUS.search(str(error).strip().lower()):
+        return True
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in TRANSIENT_MARKERS)
+
+
+def estimate_tokens(prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> int:
+    """Rough request size for the TPM budget: ~4 characters per prompt token plus the output allowance"""
+    max_output = (generation_config or {}).get("max_output_tokens") or GEMINI_DEFAULT_OUTPUT_TOKENS
+    return math.ceil(len(prompt) / 4) + int(max_output)
+
+
+def parse_json_response(text: str) -> Any:
+    """Parse a JSON answer, tolerating the ```json fences Gemini likes to add"""
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.strip("`").strip()
+        if cleaned.lower().startswith("json"):
+            cleaned = cleaned[4:]
+    return json.loads(cleaned.strip())
+
+
+class AdaptiveConcurrencyLimiter:
+    """Concurrency cap that adapts to the quota: additive increase, multiplicative decrease.
+
+    The limit grows by one slot after `limit` consecutive successful requests and is halved
+    whenever a request is rate limited, staying within [minimum, maximum].
+    """
+
+    def __init__(self, maximum: int = GEMINI_MAX_CONCURRENCY, initial: int = GEMINI_INITIAL_CONCURRENCY,
+                 minimum: int = 1):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = max(self.minimum, min(initial, self.maximum))
+        self.in_flight = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> float:
+        """Wait for a free slot; returns the time spent waiting"""
+        start = time.monotonic()
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+        return time.monotonic() - start
+
+    def release(self, throttled: bool = False) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit // 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+
+class GoogleGeminiBackend:
+    """google.generativeai, configured once per process with one GenerativeModel per model name.
+
+    Models share the library's default client, so every request goes over the same transport
+    instead of a model (and connection) being built per chunk or per retry.
+    """
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self._genai = None
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _model(self, model_name: str):
+        model = self._models.get(model_name)
+        if model is None:
+            with self._lock:
+                if self._genai is None:
+                    # Imported on first use so modules that only read the cache stay light
+                    import google.generativeai as genai
+                    if not self.api_key:
+                        logger.warning("GEMINI_API_KEY not found in environment variables")
+                    genai.configure(api_key=self.api_key)
+                    self._genai = genai
+                model = self._models.get(model_name)
+                if model is None:
+                    model = self._genai.GenerativeModel(model_name)
+                    self._models[model_name] = model
+        return model
+
+    def generate(self, model_name: str, prompt: str,
+                 generation_config: Optional[Dict[str, Any]] = None) -> Tuple[str, Optional[int]]:
+        """Response text and the total tokens Gemini reports for it"""
+        response = self._model(model_name).generate_content(prompt, generation_config=generation_config)
+        usage = getattr(response, "usage_metadata", None)
+        return response.text, getattr(usage, "total_token_count", None)
+
+
+class FakeGeminiBackend:
+    """Deterministic offline backend for tests and benchmarks.
+
+    Answers with a small JSON object derived from the prompt hash (or whatever `responder`
+    returns). latency_seconds simulates the round trip, requests_per_minute the quota
+    (raising FakeRateLimitError when exceeded), and invalid_json_rate the share of
+    answers that come back truncated. The quota is enforced over a sliding window_seconds
+    window (scaled from the per-minute figure) so short benchmarks can exercise it.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0, requests_per_minute: Optional[float] = None,
+                 invalid_json_rate: float = 0.0, responder: Optional[Callable[[str], str]] = None,
+                 seed: int = 0, window_seconds: float = 60.0):
+        self.latency_seconds = latency_seconds
+        self.requests_per_minute = requests_per_minute
+        self.window_seconds = window_seconds
+        self.invalid_json_rate = invalid_json_rate
+        self.responder = responder
+        self.requests = 0
+        self.rate_limited = 0
+        self._random = random.Random(seed)
+        self._request_times: deque = deque()
+        self._lock = threading.Lock()
+
+    def generate(self, model_name: str, prompt: str,
+                 generation_config: Optional[Dict[str, Any]] = None) -> Tuple[str, Optional[int]]:
+        with self._lock:
+            now = time.monotonic()
+            if self.requests_per_minute:
+                while self._request_times and now - self._request_times[0] > self.window_seconds:
+                    self._request_times.popleft()
+                if len(self._request_times) >= max(1.0, self.requests_per_minute * self.window_seconds / 60):
+                    self.rate_limited += 1
+                    raise FakeRateLimitError("429 Resource has been exhausted (e.g. check quota).")
+                self._request_times.append(now)
+            self.requests += 1
+            truncated = self._random.random() < self.invalid_json_rate
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+        if self.responder is not None:
+            text = self.responder(prompt)
+        else:
+            text = json.dumps({"model": model_name, "prompt_sha256": hashlib.sha256(prompt.encode("utf-8")).hexdigest()})
+        if truncated:
+            text = text[:len(text) // 2]
+        return text, math.ceil(len(prompt) / 4) + math.ceil(len(text) / 4)
+
+
+class GeminiClient:
+    """Rate-limited, adaptively concurrent, retrying front for a Gemini backend"""
+
+    def __init__(self, backend=None, max_concurrency: int = GEMINI_MAX_CONCURRENCY,
+                 initial_concurrency: int = GEMINI_INITIAL_CONCURRENCY,
+                 requests_per_minute: float = GEMINI_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = GEMINI_TOKENS_PER_MINUTE, max_retries: int = GEMINI_MAX_RETRIES,
+                 backoff_base_seconds: float = GEMINI_BACKOFF_BASE_SECONDS,
+                 backoff_max_seconds: float = GEMINI_BACKOFF_MAX_SECONDS):
+        self.backend = backend if backend is not None else GoogleGeminiBackend()
+        self.limiter = AdaptiveConcurrencyLimiter(max_concurrency, initial_concurrency)
+        self.requests_bucket = TokenBucket(requests_per_minute / 60.0)
+        self.tokens_bucket = TokenBucket(tokens_per_minute / 60.0, capacity=tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0, "succeeded": 0, "failed": 0, "rate_limited": 0, "transient_errors": 0,
+            "invalid_responses": 0, "retries": 0, "tokens_reserved": 0, "tokens_used": 0,
+            "queue_seconds": 0.0, "backoff_seconds": 0.0, "request_seconds": 0.0
+        }
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def _backoff(self, attempt: int) -> None:
+        delay = backoff_delay(attempt, self.backoff_base_seconds, self.backoff_max_seconds)
+        self._count("backoff_seconds", delay)
+        time.sleep(delay)
+
+    def generate(self, model_name: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                 validate: Optional[Callable[[str], Any]] = None) -> str:
+        """Response text for a prompt.
+
+        `validate` (e.g. parse_json_response) is run on the text; a ValueError from it counts as a
+        bad answer and the prompt is asked again, up to max_retries times like a 429 would be.
+        """
+        estimate = min(estimate_tokens(prompt, generation_config), self.tokens_bucket.capacity)
+        for attempt in range(self.max_retries + 1):
+            waited = self.requests_bucket.acquire()
+            waited += self.tokens_bucket.acquire(estimate)
+            waited += self.limiter.acquire()
+            self._count("queue_seconds", waited)
+            self._count("requests")
+            self._count("tokens_reserved", estimate)
+
+            start = time.perf_counter()
+            try:
+                text, tokens_used = self.backend.generate(model_name, prompt, generation_config)
+            except Exception as e:
+                throttled = is_rate_limit_error(e)
+                self.limiter.release(throttled=throttled)
+                self._count("request_seconds", time.perf_counter() - start)
+                retryable = throttled or is_transient_error(e)
+                self._count("rate_limited" if throttled else "transient_errors" if retryable else "failed")
+                if not retryable or attempt == self.max_retries:
+                    if retryable:
+                        self._count("failed")
+                    raise
+                logger.warning(f"Gemini request failed (attempt {attempt + 1}), retrying: {str(e)}")
+                self._count("retries")
+                self._backoff(attempt)
+                continue
+
+            self.limiter.release()
+            self._count("request_seconds", time.perf_counter() - start)
+            if tokens_used:
+                self._count("tokens_used", tokens_used)
+                if tokens_used > estimate:
+                    self.tokens_bucket.consume(tokens_used - estimate)
+                elif tokens_used < estimate:
+                    self.tokens_bucket.refund(estimate - tokens_used)
+
+            if validate is not None:
+                try:
+                    validate(text)
+                except ValueError as e:
+                    self._count("invalid_responses")
+                    if attempt == self.max_retries:
+                        self._count("failed")
+                        raise
+                    logger.warning(f"Unusable Gemini response (attempt {attempt + 1}), asking again: {str(e)}")
+                    self._count("retries")
+                    continue
+
+            self._count("succeeded")
+            return text
+
+    def generate_json(self, model_name: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> Any:
+        return parse_json_response(self.generate(model_name, prompt, generation_config, validate=parse_json_response))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        for name in ("queue_seconds", "backoff_seconds", "request_seconds"):
+            stats[name] = round(stats[name], 4)
+        stats["concurrency_limit"] = self.limiter.limit
+        stats["in_flight"] = self.limiter.in_flight
+        stats["backend"] = type(self.backend).__name__
+        return stats
+
+
+_client: Optional[GeminiClient] = None
+_client_lock = threading.Lock()
+
+
+def create_backend(backend: str = GEMINI_BACKEND):
+    if backend == "fake":
+        return FakeGeminiBackend()
+    return GoogleGeminiBackend()
+
+
+def get_gemini_client() -> GeminiClient:
+    """Return the process-wide client, creating it for GEMINI_BACKEND on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GeminiClient(create_backend())
+        return _client
+
+
+def set_gemini_client(client: GeminiClient) -> None:
+    """Swap in a different client (e.g. one with the fake backend for tests and benchmarks)"""
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,222 @@
+import re
+import math
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import Counter, defaultdict
+from typing import Dict, List, Any, Iterator, Optional, Set, Tuple
+from langchain_core.callbacks import CallbackManagerForRetrieverRun, AsyncCallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+from scn_patterns import PAR_ID_PATTERN
+
+logger = logging.getLogger(__name__)
+
+# Lexical (BM25) retrieval over the same chunks as the vector store, fused with vector
+# search by reciprocal rank. Exact identifiers are matched without an embedding call.
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+
+# Compound tokens such as "1-G9ENCXT", "R520.2" or "R520.2_TCU6" are kept whole and also
+# split into their parts, so "R520.2 TCU6" matches "R520.2_TCU6"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._\-/][a-z0-9]+)*")
+TOKEN_SEPARATORS = re.compile(r"[._\-/]")
+RELEASE_PATTERN = re.compile(r"\bR\d{3}(?:\.\d+)*(?:[_ ]?TCU\d+)?\b|\bTCU\d+\b", re.IGNORECASE)
+
+
+# Documents already retrieved for a query in this request (see prefetched_documents)
+_prefetched: ContextVar[Optional[Tuple[str, List[Document]]]] = ContextVar("prefetched_documents", default=None)
+
+
+@contextmanager
+def prefetched_documents(query: str, docs: List[Document]) -> Iterator[None]:
+    """Serve `docs` for `query` from any HybridRetriever inside the block, so a chain run after
+    an answer-cache lookup does not retrieve the same documents again"""
+    token = _prefetched.set((query, docs))
+    try:
+        yield
+    finally:
+        _prefetched.reset(token)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = TOKEN_SEPARATORS.split(token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part)
+    return tokens
+
+
+def identifier_terms(query: str) -> Set[str]:
+    """The PAR numbers and complete release/TCU strings named in the query, lowercased, with
+    "R520.2 TCU6" and "R520.2_TCU6" both written as "r520.2_tcu6". Parts such as "r520" are
+    not included: they also match other releases"""
+    matches = PAR_ID_PATTERN.findall(query.upper()) + RELEASE_PATTERN.findall(query)
+    return {re.sub(r"[_ ]+", "_", match.lower()) for match in matches}
+
+
+def contains_identifier(text: str, identifier: str) -> bool:
+    """Whether the text names the identifier itself, not a longer version of it. "R520.2 TCU6"
+    contains "r520.2"; "R520.21" and "R520.1 TCU3" do not"""
+    pattern = re.escape(identifier).replace("_", "[_ ]?")
+    return re.search(rf"(?<![a-z0-9.\-]){pattern}(?!\.?\d|[a-z])", text.lower()) is not None
+
+
+def document_key(doc: Document) -> str:
+    return doc.id or f"{doc.metadata.get('source', '')}\0{doc.page_content}"
+
+
+class BM25Index:
+    """In-memory inverted index with Okapi BM25 scoring"""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._doc_lengths: Dict[str, int] = {}
+        self._documents: Dict[str, Document] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_id: str, doc: Document) -> None:
+        with self._lock:
+            if doc_id in self._documents:
+                self.remove(doc_id)
+            term_counts = Counter(tokenize(doc.page_content))
+            for term, count in term_counts.items():
+                self._postings[term][doc_id] = count
+            length = sum(term_counts.values())
+            self._doc_lengths[doc_id] = length
+            self._total_length += length
+            self._documents[doc_id] = doc
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            doc = self._documents.pop(doc_id, None)
+            if doc is None:
+                return
+            for term in set(tokenize(doc.page_content)):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_length -= self._doc_lengths.pop(doc_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._doc_lengths.clear()
+            self._documents.clear()
+            self._total_length = 0
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[Document, float]]:
+        with self._lock:
+            doc_count = len(self._documents)
+            if not doc_count:
+                return []
+            avg_length = self._total_length / doc_count
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [(self._documents[doc_id], score) for doc_id, score in ranked]
+
+    def rebuild_from_vector_store(self, vector_store) -> int:
+        """Reload every chunk stored in the Chroma collection; no embeddings are computed"""
+        stored = vector_store.get(include=["documents", "metadatas"])
+        with self._lock:
+            self.clear()
+            for doc_id, content, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+                self.add(doc_id, Document(page_content=content, metadata=metadata or {}, id=doc_id))
+        logger.info(f"BM25 index built over {len(self)} chunks")
+        return len(self)
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Document]], k: int, rrf_k: int = RRF_K) -> List[Document]:
+    scores: Dict[str, float] = defaultdict(float)
+    documents: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results):
+            key = document_key(doc)
+            scores[key] += 1.0 / (rrf_k + rank + 1)
+            documents.setdefault(key, doc)
+    ranked = sorted(scores, key=lambda key: scores[key], reverse=True)[:k]
+    return [documents[key] for key in ranked]
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuses BM25 and vector search with reciprocal-rank fusion.
+
+    Queries that name PAR numbers or release strings are answered from the BM25 index alone when
+    BM25 finds chunks naming every one of those identifiers in full, which skips the
+    query-embedding round trip. Otherwise both result lists are fused.
+    """
+
+    vector_store: Any
+    bm25_index: BM25Index
+    k: int = 3
+    fetch_k: int = 10
+    rrf_k: int = RRF_K
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    def _lexical(self, query: str) -> Tuple[List[Document], Optional[List[Document]]]:
+        """Return the BM25 hits, plus the final answer when the vector search can be skipped"""
+        lexical = [doc for doc, _ in self.bm25_index.search(query, self.fetch_k)]
+        terms = identifier_terms(query)
+        if terms:
+            exact = [doc for doc in lexical if all(contains_identifier(doc.page_content, term) for term in terms)]
+            if exact:
+                return lexical, exact[:self.k]
+        return lexical, None
+
+    @staticmethod
+    def _prefetched(query: str) -> Optional[List[Document]]:
+        prefetched = _prefetched.get()
+        if prefetched is not None and prefetched[0] == query:
+            return prefetched[1]
+        return None
+
+    def retrieve(self, query: str) -> Tuple[List[Document], bool]:
+        """The documents for a query, and whether they were found lexically (no embedding made)"""
+        lexical, answer = self._lexical(query)
+        if answer is not None:
+            return answer, True
+        semantic = self.vector_store.similarity_search(query, k=self.fetch_k)
+        return reciprocal_rank_fusion([semantic, lexical], self.k, self.rrf_k), False
+
+    async def aretrieve(self, query: str) -> Tuple[List[Document], bool]:
+        """Async version of retrieve"""
+        lexical, answer = self._lexical(query)
+        if answer is not None:
+            return answer, True
+        semantic = await self.vector_store.asimilarity_search(query, k=self.fetch_k)
+        return reciprocal_rank_fusion([semantic, lexical], self.k, self.rrf_k), False
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        prefetched = self._prefetched(query)
+        if prefetched is not None:
+            return prefetched
+        return self.retrieve(query)[0]
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        prefetched = self._prefetched(query)
+        if prefetched is not None:
+            return prefetched
+        return (await self.aretrieve(query))[0]
@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import importlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Callable
+from dotenv import load_dotenv
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Persistent cache of Gemini responses keyed by model, generation config and prompt hash
+script_dir = os.path.dirname(os.path.abspath(__file__))
+CACHE_DB_PATH = os.getenv("LLM_CACHE_DB_PATH", os.path.join(script_dir, "cache", "llm_responses.sqlite3"))
+CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+
+def make_cache_key(model_name: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+    """Build a stable key from the model name, generation config and prompt hash"""
+    key_material = json.dumps({
+        "model": model_name,
+        "generation_config": generation_config or {},
+        "prompt_sha256": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+    }, sort_keys=True)
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+class MemoryLRUStore:
+    """In-process LRU store of (response, expires_at) pairs"""
+
+    def __init__(self, max_entries: int = CACHE_MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, response: str, expires_at: Optional[float]) -> None:
+        with self._lock:
+            self._entries[key] = (response, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteStore:
+    """SQLite backing store so cached responses survive restarts"""
+
+    def __init__(self, db_path: str = CACHE_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, response: str, expires_at: Optional[float], model_name: str = "") -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, response, time.time(), expires_at),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class LLMResponseCache:
+    """Two-tier response cache: a memory LRU in front of an optional persistent store"""
+
+    def __init__(self, memory_store: Optional[MemoryLRUStore] = None, persistent_store: Optional[SQLiteStore] = None,
+                 ttl_seconds: float = CACHE_TTL_SECONDS):
+        self.memory_store = memory_store or MemoryLRUStore()
+        self.persistent_store = persistent_store
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "memory_hits": 0, "misses": 0, "expired": 0, "bypassed": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.memory_store.get(key)
+        from_memory = entry is not None
+        if entry is None and self.persistent_store is not None:
+            entry = self.persistent_store.get(key)
+
+        if entry is None:
+            self._count("misses")
+            return None
+
+        response, expires_at = entry
+        if expires_at is not None and expires_at < time.time():
+            self._count("expired")
+            self._count("misses")
+            self.delete(key)
+            return None
+
+        if from_memory:
+            self._count("memory_hits")
+        else:
+            # Promote to the memory tier so the next lookup skips SQLite
+            self.memory_store.set(key, response, expires_at)
+        self._count("hits")
+        return response
+
+    def set(self, key: str, response: str, model_name: str = "") -> None:
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds > 0 else None
+        self.memory_store.set(key, response, expires_at)
+        if self.persistent_store is not None:
+            self.persistent_store.set(key, response, expires_at, model_name)
+
+    def delete(self, key: str) -> None:
+        self.memory_store.delete(key)
+        if self.persistent_store is not None:
+            self.persistent_store.delete(key)
+
+    def clear(self) -> None:
+        self.memory_store.clear()
+        if self.persistent_store is not None:
+            self.persistent_store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["memory_entries"] = len(self.memory_store)
+        stats["persistent_entries"] = len(self.persistent_store) if self.persistent_store is not None else 0
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Return the process-wide response cache, creating the default one on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                persistent_store = SQLiteStore()
+            except Exception as e:
+                logger.warning(f"LLM cache falling back to memory only: {str(e)}")
+                persistent_store = None
+            _cache = LLMResponseCache(persistent_store=persistent_store)
+        return _cache
+
+
+def set_llm_cache(cache: LLMResponseCache) -> None:
+    """Swap in a different cache implementation (e.g. memory-only for tests)"""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def _gemini_client_module():
+    """gemini_client, imported on first use so loading the cache (e.g. for stats) does not pull in
+    the client. Follows how this module was loaded: top-level, or as AIBackend.llm_cache"""
+    if __package__:
+        return importlib.import_module(".gemini_client", __package__)
+    return importlib.import_module("gemini_client")
+
+
+def _generate(model_name: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+              validate: Optional[Callable[[str], Any]] = None) -> str:
+    return _gemini_client_module().get_gemini_client().generate(model_name, prompt, generation_config, validate=validate)
+
+
+def cached_generate_content(model_name: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                            bypass: bool = False, validate: Optional[Callable[[str], Any]] = None) -> str:
+    """Return Gemini's response text for a prompt, serving repeats from the cache.
+
+    With `validate`, a cached answer that fails it is dropped and only answers that pass are cached.
+    """
+    cache = get_llm_cache()
+    if bypass or CACHE_BYPASS:
+        cache._count("bypassed")
+        return _generate(model_name, prompt, generation_config, validate)
+
+    key = make_cache_key(model_name, prompt, generation_config)
+    cached = cache.get(key)
+    if cached is not None:
+        if validate is None:
+            return cached
+        try:
+            validate(cached)
+            return cached
+        except ValueError:
+            cache.delete(key)
+
+    text = _generate(model_name, prompt, generation_config, validate)
+    cache.set(key, text, model_name)
+    return text
+
+
+def cached_generate_json(model_name: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                         bypass: bool = False) -> Any:
+    """Parsed JSON answer for a prompt; unparseable answers are re-asked rather than cached"""
+    parse_json_response = _gemini_client_module().parse_json_response
+    return parse_json_response(cached_generate_content(model_name, prompt, generation_config, bypass,
+                                                       validate=parse_json_response))
+
+
+def invalidate_cached_response(model_name: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> None:
+    """Drop a cached response, e.g. when it turned out to be unparseable"""
+    get_llm_cache().delete(make_cache_key(model_name, prompt, generation_config))
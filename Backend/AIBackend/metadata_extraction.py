@@ -1,28 +1,35 @@
-import fitz  # This is PyMuPDF
 import re
 import os
 import logging
-import time
-import json
 import argparse
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
-import google.generativeai as genai
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Alignment, Font, Border, Side
 from openpyxl.utils import get_column_letter
+from pdf_cache import get_page_texts
+from llm_cache import cached_generate_json
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Configure Gemini API
+# Gemini is configured once by the shared client (gemini_client.py)
 load_dotenv()
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if not GEMINI_API_KEY:
-    logger.warning("GEMINI_API_KEY not found in environment variables")
-else:
-    genai.configure(api_key=GEMINI_API_KEY)
+
+# LLM extraction reads at most MAX_WINDOWS windows of WINDOW_CHARS characters, built from the
+# pages that score highest for PAR/release keywords, with WINDOW_WORKERS requests in flight
+WINDOW_CHARS = int(os.getenv("METADATA_WINDOW_CHARS", "12000"))
+MAX_WINDOWS = int(os.getenv("METADATA_MAX_WINDOWS", "5"))
+WINDOW_WORKERS = int(os.getenv("METADATA_WINDOW_WORKERS", "3"))
+RELEVANCE_PATTERNS = [
+    (re.compile(r'\b1-[A-Z0-9]{6,8}\b'), 5),  # PAR IDs
+    (re.compile(r'\bPARs?\b|PROBLEM REPORT', re.IGNORECASE), 3),
+    (re.compile(r'\bR\d{3}(?:\.\d+)?\b'), 2),  # Experion releases
+    (re.compile(r'\b(?:TCU|HF|Hotfix)\s*\d+', re.IGNORECASE), 2),
+    (re.compile(r'\b(?:affected|fixed in|resolved in|configuration)\b', re.IGNORECASE), 1),
+]
 
 # Style configurations
 WHITE_FILL = PatternFill(start_color="FFFFFFFF", end_color="FFFFFFFF", fill_type="solid")
@@ -62,27 +69,53 @@ def extract_document_id(pdf_path):
         logger.error(f"Error extracting document ID: {str(e)}")
         return "UNKNOWN"
 
-def extract_with_llm(text, doc_id):
-    """Enhanced LLM extraction with sliding window"""
-    chunk_size = 12000  # Keep original truncation size
-    overlap = 3000  # Preserve context between chunks
-    max_chunks = 5  # Prevent infinite processing
-    base_delay = 15
-    max_retries = 3
-    required_keys = ["affected_assets", "affected_release", 
-                    "fixed_release", "par_number", "configuration"]
-    
-    combined_result = {}
-    
-    for chunk_idx in range(max_chunks):
-        start = chunk_idx * (chunk_size - overlap)
-        end = start + chunk_size
-        chunk_text = text[start:end]
-        
-        if not chunk_text:
-            break  # End of document
-
-        prompt = f"""Analyze this technical document and extract the following information:
+def score_page(page_text):
+    """Relevance of a page for metadata extraction: weighted hits of PAR/release keywords"""
+    return sum(weight * len(pattern.findall(page_text)) for pattern, weight in RELEVANCE_PATTERNS)
+
+def select_windows(pages, window_chars=WINDOW_CHARS, max_windows=MAX_WINDOWS):
+    """Group the most relevant pages into at most max_windows windows of up to window_chars.
+
+    Each window starts at an unused page in score order and grows with the following (then
+    preceding) unused pages while it fits, so related tables stay together. Windows come back
+    best first. Documents with no keyword hits fall back to the leading pages.
+    """
+    pages = [page[:window_chars] for page in pages]
+    scores = [score_page(page) for page in pages]
+    ranked = sorted((i for i in range(len(pages)) if pages[i].strip()), key=lambda i: (-scores[i], i))
+    if ranked and scores[ranked[0]] == 0:
+        ranked.sort()
+    used = set()
+    windows = []
+    for seed in ranked:
+        if len(windows) >= max_windows:
+            break
+        if seed in used:
+            continue
+        members = [seed]
+        size = len(pages[seed])
+        for step in (1, -1):
+            neighbour = seed + step
+            while 0 <= neighbour < len(pages) and neighbour not in used \
+                    and size + len(pages[neighbour]) <= window_chars:
+                members.append(neighbour)
+                size += len(pages[neighbour])
+                neighbour += step
+        used.update(members)
+        windows.append({
+            "pages": sorted(members),
+            "score": sum(scores[i] for i in members),
+            "text": "\n".join(pages[i] for i in sorted(members))
+        })
+    windows.sort(key=lambda window: -window["score"])
+    return windows
+
+def split_pages(text, page_chars=3000):
+    """Pseudo-pages for callers that only have the joined document text"""
+    return [text[start:start + page_chars] for start in range(0, len(text), page_chars)]
+
+def build_extraction_prompt(window_text):
+    return f"""Analyze this technical document and extract the following information:
         - Affected assets (list of hardware/software components)
         - Affected software releases/versions
         - Fixed releases/versions with updates
@@ -102,44 +135,71 @@ def extract_with_llm(text, doc_id):
         }}
 
         Document text:
-        {chunk_text}
+        {window_text}
         """
 
-        for attempt in range(max_retries):
-            try:
-                model = genai.GenerativeModel('gemini-1.5-flash')
-                response = model.generate_content(prompt)
-                json_str = response.text.replace('```json', '').replace('```', '').strip()
-                chunk_data = json.loads(json_str)
-
-                # Merge new findings without overwriting existing values
-                for key in required_keys:
-                    if key not in combined_result or not combined_result[key]:
-                        combined_result[key] = chunk_data.get(key, "")
-
-                # Early exit if we've found all fields
-                if all(combined_result.get(k) for k in required_keys):
-                    return combined_result
-
-                break  # Successfully processed chunk
-
-            except json.JSONDecodeError:
-                logger.warning(f"Invalid JSON in chunk {chunk_idx+1}, attempt {attempt+1}")
-                if attempt == max_retries-1:
-                    continue  # Move to next chunk after final retry
-            except Exception as e:
-                logger.error(f"Chunk {chunk_idx+1} failed: {str(e)}")
-                if '429' in str(e):
-                    time.sleep(base_delay * (2 ** attempt))
-                continue
-
-        # Early exit if all fields found
-        if all(combined_result.get(k) for k in required_keys):
-            break
+def _field_value(value):
+    if isinstance(value, (list, tuple)):
+        return "\n".join(str(v).strip() for v in value if str(v).strip())
+    return str(value).strip() if value is not None else ""
+
+def extract_with_llm(text, doc_id, pages=None):
+    """Extract the metadata fields from the most relevant windows of the document, concurrently.
+
+    Up to WINDOW_WORKERS windows are in flight at once, best first. For each field the value from
+    the most relevant window that has one wins, and the remaining windows are dropped as soon as
+    every field is filled.
+    """
+    required_keys = ["affected_assets", "affected_release",
+                    "fixed_release", "par_number", "configuration"]
+    windows = select_windows(pages if pages is not None else split_pages(text))
+    if not windows:
+        return None
+
+    results = {}
+    prompts = [build_extraction_prompt(window["text"]) for window in windows]
+    pool = ThreadPoolExecutor(max_workers=min(WINDOW_WORKERS, len(windows)), thread_name_prefix="metadata-llm")
+    # Submit lazily so no more than WINDOW_WORKERS windows are ever committed to a request
+    in_flight = {}
+    next_rank = 0
+    try:
+        while next_rank < len(windows) or in_flight:
+            while next_rank < len(windows) and len(in_flight) < WINDOW_WORKERS:
+                future = pool.submit(cached_generate_json, 'gemini-1.5-flash', prompts[next_rank])
+                in_flight[future] = next_rank
+                next_rank += 1
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                rank = in_flight.pop(future)
+                try:
+                    data = future.result()
+                except Exception as e:
+                    # The shared client already retried 429s and unparseable JSON
+                    logger.error(f"Window {rank+1} (pages {windows[rank]['pages']}) failed: {str(e)}")
+                    continue
+                if not isinstance(data, dict):
+                    logger.warning(f"Unexpected response shape in window {rank+1}")
+                    continue
+                results[rank] = {key: _field_value(data.get(key)) for key in required_keys}
+
+            if all(any(result[key] for result in results.values()) for key in required_keys):
+                skipped = len(windows) - next_rank
+                logger.info(f"{doc_id}: all fields found after {len(results)} of {len(windows)} windows, "
+                            f"{skipped} skipped, {len(in_flight)} abandoned in flight")
+                break
+    finally:
+        # Abandoned requests finish in the background; their answers still land in the LLM cache
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    # Field priority follows window relevance, not completion order
+    combined_result = {}
+    for key in required_keys:
+        combined_result[key] = next((results[rank][key] for rank in sorted(results) if results[rank][key]), "")
 
     return combined_result if any(combined_result.values()) else None
 
-def extract_sections(text, doc_id):
+def extract_sections(text, doc_id, pages=None):
     """Enhanced hybrid extraction with improved patterns"""
     sections = {
         "document_id": doc_id,
@@ -200,7 +260,7 @@ def extract_sections(text, doc_id):
         logger.error(f"Regex extraction error: {str(e)}")
 
     # LLM augmentation for all fields
-    llm_data = extract_with_llm(text, doc_id)
+    llm_data = extract_with_llm(text, doc_id, pages)
     if llm_data:
         for key in sections:
             # Only overwrite if LLM provides better data
@@ -232,21 +292,21 @@ def process_pdf(pdf_path):
             logger.error(f"PDF file not found: {pdf_path}")
             return None
             
-        doc = fitz.open(str(pdf_path))
-        text = " ".join([page.get_text("text") for page in doc])
+        pages = get_page_texts(pdf_path)
+        text = " ".join(pages)
         doc_id = extract_document_id(str(pdf_path))
         
         if doc_id in DOCUMENT_MAP:
             logger.info(f"Using predefined mapping for {doc_id}")
             return DOCUMENT_MAP[doc_id]
             
-        result = extract_sections(text, doc_id)
+        result = extract_sections(text, doc_id, pages)
         
         # Final validation
         required_fields = ["affected_assets", "affected_release", "fixed_release"]
         if not all(result.get(field) for field in required_fields):
             logger.warning(f"Incomplete data for {doc_id}, retrying with full LLM")
-            llm_data = extract_with_llm(text, doc_id)
+            llm_data = extract_with_llm(text, doc_id, pages)
             if llm_data:
                 result.update(llm_data)
         
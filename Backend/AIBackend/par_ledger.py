@@ -0,0 +1,163 @@
+from typing import Dict, List, Any, Optional, Tuple
+import pandas as pd
+from scn_patterns import PAR_ID_PATTERN
+
+# Merges the Fixed/Known issue tables of a release range by PAR ID. Each PAR gets one entry that
+# records the release it was first listed in, the release it was fixed in and whether it is still
+# open at the end of the range, so the outputs list every PAR once instead of once per release.
+
+STATUS_OPEN = "open"
+STATUS_FIXED = "fixed"
+# A PAR listed as known again after a release that fixed it
+STATUS_REOPENED = "reopened"
+
+LEDGER_COLUMNS = ["PAR", "Status", "First Seen", "Fixed In", "Last Seen", "Description"]
+
+
+def par_key(value: Any) -> Optional[str]:
+    """PAR ID of a table cell ("1-ABC1234"), or the cell's text when it holds no recognizable ID"""
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    text = " ".join(str(value).split())
+    if not text:
+        return None
+    match = PAR_ID_PATTERN.search(text.upper())
+    return match.group(0) if match else text
+
+
+class PAREntry:
+    def __init__(self, par: str, release: str):
+        self.par = par
+        self.first_seen = release
+        self.last_seen = release
+        self.fixed_in: Optional[str] = None
+        self.status = STATUS_OPEN
+        # Latest row of each table kind, without the Release column
+        self.fixed_row: Optional[Dict[str, Any]] = None
+        self.known_row: Optional[Dict[str, Any]] = None
+
+    def description(self) -> Any:
+        """Description from the row behind the current status: the fixing row for a fixed PAR, the
+        latest known-issue row for an open or reopened one"""
+        row = self.fixed_row if self.status == STATUS_FIXED else self.known_row
+        return (row or self.fixed_row or self.known_row or {}).get("Description")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"PAR": self.par, "Status": self.status, "First Seen": self.first_seen, "Fixed In": self.fixed_in,
+                "Last Seen": self.last_seen, "Description": self.description()}
+
+
+def _table_rows(table: pd.DataFrame) -> List[Tuple[str, Dict[str, Any]]]:
+    """(PAR, row) pairs of an issue table. Rows without a PAR continue the previous row (a cell
+    split across a page break), so their text is appended to it"""
+    if table.empty or "PAR" not in table.columns:
+        return []
+    columns = [column for column in table.columns if column != "Release"]
+    rows: List[Tuple[str, Dict[str, Any]]] = []
+    for values in table[columns].itertuples(index=False):
+        row = {column: (None if isinstance(value, float) and value != value else value)
+               for column, value in zip(columns, values)}
+        par = par_key(row["PAR"])
+        if par is None:
+            if rows:
+                previous = rows[-1][1]
+                for column, value in row.items():
+                    if value is not None and column != "PAR":
+                        previous[column] = f"{previous[column]} {value}" if previous.get(column) is not None else value
+            continue
+        row["PAR"] = par
+        rows.append((par, row))
+    return rows
+
+
+def _extend_columns(columns: List[str], row: Dict[str, Any]) -> None:
+    """Add the row's columns missing from `columns`, keeping first-seen order"""
+    columns.extend(column for column in row if column not in columns)
+
+
+class PARLedger:
+    """One entry per PAR across a release range, fed one release at a time in release order"""
+
+    def __init__(self):
+        self.entries: Dict[str, PAREntry] = {}
+        self.releases: List[str] = []
+        self._fixed_columns: List[str] = []
+        self._known_columns: List[str] = []
+
+    def add_release(self, release: str, fixed: pd.DataFrame, known: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Merge one release's tables and return its net change: PARs fixed for the first time in
+        this release and PARs listed as known that were not known before. A PAR on both lists of
+        the same release counts as fixed"""
+        self.releases.append(release)
+        new_fixed, new_known = [], []
+        fixed_rows = _table_rows(fixed)
+        fixed_here = {par for par, _ in fixed_rows}
+
+        for par, row in _table_rows(known):
+            _extend_columns(self._known_columns, row)
+            if par in fixed_here:
+                continue
+            entry = self.entries.get(par)
+            if entry is None:
+                entry = self.entries[par] = PAREntry(par, release)
+                new_known.append(row)
+            elif entry.status == STATUS_FIXED:
+                entry.status = STATUS_REOPENED
+                new_known.append(row)
+            entry.last_seen = release
+            entry.known_row = row
+
+        for par, row in fixed_rows:
+            _extend_columns(self._fixed_columns, row)
+            entry = self.entries.get(par)
+            if entry is None:
+                entry = self.entries[par] = PAREntry(par, release)
+            if entry.status != STATUS_FIXED:
+                entry.status = STATUS_FIXED
+                entry.fixed_in = release
+                new_fixed.append(row)
+            entry.last_seen = release
+            entry.fixed_row = row
+
+        return (self._frame(new_fixed, self._fixed_columns, release),
+                self._frame(new_known, self._known_columns, release))
+
+    @staticmethod
+    def _frame(rows: List[Dict[str, Any]], columns: List[str], release: str) -> pd.DataFrame:
+        if not rows:
+            return pd.DataFrame()
+        frame = pd.DataFrame(rows, columns=columns)
+        frame["Release"] = release
+        return frame
+
+    def fixed_issues(self) -> pd.DataFrame:
+        """One row per PAR fixed within the range, with the release it was fixed in and first listed in"""
+        rows = []
+        for entry in self.entries.values():
+            if entry.status == STATUS_FIXED:
+                rows.append(dict(entry.fixed_row, Release=entry.fixed_in, **{"First Seen": entry.first_seen}))
+        return pd.DataFrame(rows, columns=self._fixed_columns + ["Release", "First Seen"]) if rows else pd.DataFrame()
+
+    def known_issues(self) -> pd.DataFrame:
+        """One row per PAR still open at the end of the range, as last listed"""
+        rows = []
+        for entry in self.entries.values():
+            if entry.status != STATUS_FIXED and entry.known_row is not None:
+                rows.append(dict(entry.known_row, Release=entry.last_seen,
+                                 **{"First Seen": entry.first_seen, "Status": entry.status}))
+        columns = self._known_columns + ["Release", "First Seen", "Status"]
+        return pd.DataFrame(rows, columns=columns) if rows else pd.DataFrame()
+
+    def to_frame(self) -> pd.DataFrame:
+        """The ledger itself: status and release history of every PAR"""
+        return pd.DataFrame([entry.to_dict() for entry in self.entries.values()], columns=LEDGER_COLUMNS)
+
+    def stats(self) -> Dict[str, int]:
+        statuses = [entry.status for entry in self.entries.values()]
+        return {
+            "releases": len(self.releases),
+            "pars": len(statuses),
+            STATUS_FIXED: statuses.count(STATUS_FIXED),
+            STATUS_OPEN: statuses.count(STATUS_OPEN),
+            STATUS_REOPENED: statuses.count(STATUS_REOPENED)
+        }
@@ -0,0 +1,188 @@
+import os
+import json
+import zlib
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple, Any
+from dotenv import load_dotenv
+import fitz  # PyMuPDF
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Content-addressed cache of per-page PDF text, shared by every pipeline that reads PDFs
+script_dir = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.getenv("PDF_TEXT_CACHE_DIR", os.path.join(script_dir, "cache", "pdf_text"))
+CACHE_MAX_BYTES = int(os.getenv("PDF_TEXT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_FORMAT_VERSION = 1
+CACHE_SUFFIX = ".json.z"
+
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "range_reads": 0}
+# (path, size, mtime_ns) -> sha256, so unchanged files are not re-hashed on every call
+_digest_memo: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_sha256(pdf_path: str) -> str:
+    """Return the SHA-256 hex digest of a file's bytes"""
+    pdf_path = os.path.abspath(str(pdf_path))
+    stats = os.stat(pdf_path)
+    memo_key = (pdf_path, stats.st_size, stats.st_mtime_ns)
+    with _lock:
+        digest = _digest_memo.get(memo_key)
+    if digest:
+        return digest
+
+    sha = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    digest = sha.hexdigest()
+
+    with _lock:
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def _entry_path(digest: str) -> str:
+    return os.path.join(CACHE_DIR, f"{digest}{CACHE_SUFFIX}")
+
+
+def _read_entry(digest: str) -> Optional[List[str]]:
+    """Load cached page texts for a digest, or None if absent or unreadable"""
+    path = _entry_path(digest)
+    try:
+        with open(path, "rb") as f:
+            payload = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+        if payload.get("version") != CACHE_FORMAT_VERSION:
+            return None
+        # Touch the entry so eviction treats it as recently used
+        os.utime(path, None)
+        return payload["pages"]
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Discarding unreadable PDF text cache entry {path}: {str(e)}")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+
+def _write_entry(digest: str, pages: List[str]) -> None:
+    """Write page texts atomically so concurrent readers never see a partial entry"""
+    payload = json.dumps({"version": CACHE_FORMAT_VERSION, "pages": pages}, ensure_ascii=False)
+    path = _entry_path(digest)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(zlib.compress(payload.encode("utf-8"), 6))
+    os.replace(tmp_path, path)
+    _evict()
+
+
+def _list_entries() -> List[Tuple[float, int, str]]:
+    entries = []
+    for entry in os.scandir(CACHE_DIR):
+        if entry.is_file() and entry.name.endswith(CACHE_SUFFIX):
+            stats = entry.stat()
+            entries.append((stats.st_mtime, stats.st_size, entry.path))
+    return entries
+
+
+def _evict() -> None:
+    """Remove least recently used entries until the cache fits in CACHE_MAX_BYTES"""
+    entries = sorted(_list_entries())
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            with _lock:
+                _stats["evictions"] += 1
+        except OSError:
+            continue
+
+
+def get_page_texts(pdf_path: str) -> List[str]:
+    """Return the text of every page, reading PyMuPDF only on a cache miss"""
+    pdf_path = str(pdf_path)
+    digest = file_sha256(pdf_path)
+
+    pages = _read_entry(digest)
+    if pages is not None:
+        with _lock:
+            _stats["hits"] += 1
+        return pages
+
+    with _lock:
+        _stats["misses"] += 1
+
+    doc = fitz.open(pdf_path)
+    try:
+        pages = [page.get_text("text") for page in doc]
+    finally:
+        doc.close()
+
+    try:
+        _write_entry(digest, pages)
+    except Exception as e:
+        logger.warning(f"Could not cache text for {pdf_path}: {str(e)}")
+    return pages
+
+
+def get_page_range_texts(pdf_path: str, first_page: int, last_page: int) -> List[str]:
+    """Text of pages first_page..last_page (0-based, inclusive).
+
+    Sliced from the cache when the whole document is already there; otherwise only those pages
+    are read with PyMuPDF, and the partial result is not cached.
+    """
+    pdf_path = str(pdf_path)
+    pages = _read_entry(file_sha256(pdf_path))
+    if pages is not None:
+        with _lock:
+            _stats["hits"] += 1
+        return pages[max(0, first_page):last_page + 1]
+
+    with _lock:
+        _stats["range_reads"] += 1
+
+    doc = fitz.open(pdf_path)
+    try:
+        last_page = min(last_page, doc.page_count - 1)
+        return [doc[number].get_text("text") for number in range(max(0, first_page), last_page + 1)]
+    finally:
+        doc.close()
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters and the current on-disk footprint"""
+    entries = _list_entries()
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    stats["entries"] = len(entries)
+    stats["bytes"] = sum(size for _, size, _ in entries)
+    stats["max_bytes"] = CACHE_MAX_BYTES
+    return stats
+
+
+def clear_cache() -> None:
+    """Delete every cached entry and reset the counters"""
+    for _, _, path in _list_entries():
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+    with _lock:
+        _digest_memo.clear()
+        for key in _stats:
+            _stats[key] = 0
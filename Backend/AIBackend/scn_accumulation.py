@@ -1,13 +1,21 @@
-import fitz  # PyMuPDF
 import re
-from fuzzywuzzy import fuzz
 from dotenv import load_dotenv
-import google.generativeai as genai
 import os
+import threading
+import multiprocessing
 import tabula
 import pandas as pd
 from fpdf import FPDF
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Any, Callable, Iterator
+import functools
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from section_locator import SectionLocation, extract_section_text
+from scn_index import get_scn_index, document_for_path
+from llm_cache import cached_generate_content
+from feature_summaries import Feature, parse_features, summarize_features, feature_rows, format_feature_summaries
+from scn_store import SCN_STORE_ENABLED, get_scn_store
+from par_ledger import PARLedger
 
 # FIXED PATHS AND DIRECTORIES
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -19,13 +27,78 @@ output_dir = os.path.join(script_dir, "outputs")
 os.makedirs(output_dir, exist_ok=True)
 
 load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
+
+# Degree of parallelism for per-release work. PyMuPDF and tabula run in worker processes,
+# Gemini summaries run in threads. Set SCN_MAX_WORKERS=1 to process releases serially.
+SCN_MAX_WORKERS = int(os.getenv("SCN_MAX_WORKERS", "4"))
+
+# tabula-py runs tabula-java in-process through jpype unless forced into a subprocess.
+# In-process keeps one JVM alive per worker, reused across releases and requests.
+TABULA_FORCE_SUBPROCESS = os.getenv("TABULA_FORCE_SUBPROCESS", "").lower() in ("1", "true", "yes")
+
+# One process pool and one thread pool of SCN_MAX_WORKERS each, shared by all requests and kept
+# alive between them so workers (and their JVMs) are not re-spawned per range
+_process_pool: Optional[ProcessPoolExecutor] = None
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_pools_lock = threading.Lock()
+
+
+def _resolve_workers(max_workers: Optional[int], task_count: int) -> int:
+    """Clamp the requested parallelism to the number of tasks and to SCN_MAX_WORKERS"""
+    workers = SCN_MAX_WORKERS if max_workers is None else min(max_workers, SCN_MAX_WORKERS)
+    return max(1, min(workers, task_count))
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool for CPU/JVM-bound PDF work"""
+    global _process_pool
+    with _pools_lock:
+        if _process_pool is None:
+            # spawn, not fork: the server process is multi-threaded
+            _process_pool = ProcessPoolExecutor(max_workers=SCN_MAX_WORKERS,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    """Return the shared thread pool for network-bound Gemini calls"""
+    global _thread_pool
+    with _pools_lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=SCN_MAX_WORKERS, thread_name_prefix="scn-llm")
+        return _thread_pool
+
+
+def shutdown_pools() -> None:
+    """Stop the shared pools; called on server shutdown"""
+    global _process_pool, _thread_pool
+    with _pools_lock:
+        process_pool, thread_pool = _process_pool, _thread_pool
+        _process_pool, _thread_pool = None, None
+    if thread_pool is not None:
+        thread_pool.shutdown(wait=False, cancel_futures=True)
+    if process_pool is not None:
+        process_pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _submit_limited(calls: List[Callable[[], Any]], workers: int) -> List[Callable[[], Any]]:
+    """Run the calls on the shared thread pool, at most `workers` of them at once, and return
+    one blocking callable per call. The pools are shared, so this caps one request's share"""
+    slots = threading.BoundedSemaphore(workers)
+
+    def run(call):
+        with slots:
+            return call()
+
+    thread_pool = get_thread_pool()
+    return [thread_pool.submit(run, call).result for call in calls]
 
 class SCNResult:
     def __init__(self):
         self.features: Dict[str, str] = {}
         self.fixed_issues: pd.DataFrame = pd.DataFrame()
         self.known_issues: pd.DataFrame = pd.DataFrame()
+        self.par_ledger: PARLedger = PARLedger()
         self.output_files: Dict[str, str] = {}
 
 def generate_feature_summary(text: str) -> str:
@@ -178,10 +251,9 @@ def generate_feature_summary(text: str) -> str:
 
 - **6.24 Update ADC to support 96 Point Universal Process Cabinet (UPC):** Updates the ADC to support a 96-point UPC.
     """
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    
-    response = model.generate_content(
+    # Identical SCN text produces an identical prompt, so repeats are served from the cache
+    response_text = cached_generate_content(
+        'gemini-1.5-flash',
         prompt,
         generation_config={
             "temperature": 0.3,
@@ -189,9 +261,9 @@ def generate_feature_summary(text: str) -> str:
         }
     )
     
-    print(f"Response: {response.text}")
+    print(f"Response: {response_text}")
     
-    return response.text
+    return response_text
 
 
 
@@ -220,79 +292,137 @@ def get_intermediate_upgrades(old_upgrade: str, new_upgrade: str) -> List[str]:
         return []
     
 
-def fuzzy_match_section(text: str, possible_titles: List[str], threshold: int = 80) -> Optional[str]:
-    """Finds the best-matching section title in the text using fuzzy matching."""
-    for line in text.split("\n"):
-        for title in possible_titles:
-            if fuzz.ratio(line.strip().lower(), title.lower()) >= threshold:
-                print(f"Matched title: {line.strip()}")
-                return line.strip()  # Return the best-matched title
-    return None
+# Returned by extract_new_features_fuzzy when a release has no usable features section
+NO_FEATURES_TEXTS = ("Section found but content extraction failed.", "Section title not found.", "")
+
 
 def extract_new_features_fuzzy(pdf_path: str) -> str:
-    """Extracts the "New Features and Enhancements" section using fuzzy search from a PDF."""
-    doc = fitz.open(pdf_path)  # Open PDF
-    full_text = ""
+    """Extracts the "New Features and Enhancements" chapter from a PDF.
 
-    # Extract text from all pages
-    for page in doc:
-        full_text += page.get_text() + "\n"  # Fixed: Using correct method get_text() instead of get_intermediate_upgrades
+    The chapter's page range comes from the SCN structure index, so only those pages are read.
+    """
+    section = document_for_path(pdf_path)["features_section"]
+    if section is None:
+        return "Section title not found."
+    location = SectionLocation.from_dict(section)
 
-    # Define possible variations of section titles
-    section_titles = [
-        "New Features and Enhancements", 
-        "New Features & Enhancements",
-    ]
+    print(f"Matched title: {location.title} (pages {location.first_page + 1}-{location.last_page + 1}, "
+          f"via {location.source})")
+    content = extract_section_text(pdf_path, location)
+    if not content:
+        return "Section found but content extraction failed."
+    return content
 
-    # Find the actual section title using fuzzy matching
-    matched_title = fuzzy_match_section(full_text, section_titles)
 
-    if not matched_title:
-        return "Section title not found."
+def extract_release_features(pdf_path: str) -> Tuple[str, List[Feature]]:
+    """Extract one release's features section and split it into its numbered features"""
+    features_text = extract_new_features_fuzzy(pdf_path)
+    document = document_for_path(pdf_path)
+    if document["features_section"] is None or features_text in NO_FEATURES_TEXTS:
+        return features_text, []
+    return features_text, parse_features(features_text, document["features"], document["features_section"]["title"])
 
-    # Ensure matched_title is properly escaped
-    escaped_title = re.escape(matched_title)
 
-    # Pattern 1: Extract text after matched_title till next section or subsection
-    pattern = rf"{escaped_title}\n(.*?)(?=\n(?:[A-Z0-9][A-Z0-9 .-]{{3,}}\n|\d+\.\d+(?:\.\d+)?))"
+def summarize_release_features(features_text: str, features: Optional[List[Feature]] = None) -> List[Dict[str, Any]]:
+    """Summarize one release's features section into {number, title, content_hash, summary} rows.
 
-    # Pattern 2: Matches subsection numbers like "6.2.1", "6.2.3" within matched_title section
-    pattern2 = rf"{escaped_title}.*?\b\d+\.\d+\.\d+\b"
+    Parsed features are summarized one description each, batched and cached per feature, so
+    features carried over unchanged from earlier releases cost no request. The whole section
+    only goes to Gemini when it could not be split into features (one row without a number).
+    """
+    if features_text in NO_FEATURES_TEXTS:
+        return []
+    if features:
+        return feature_rows(features, summarize_features(features))
+    return [{"number": None, "title": None, "content_hash": None, "summary": generate_feature_summary(features_text)}]
 
-    # Apply regex
-    match = re.search(pattern, full_text, re.DOTALL)
-    subsections = re.findall(pattern2, full_text, re.DOTALL)  # Get all matching subsections
 
-    if match:
-        content = match.group(1).strip()
-        if subsections:
-            content += "\n" + "\n".join(subsections)  # Append all subsections if found
-        print(f"Matched section:\n{content}")
-        return content  # Extract matched content
-    else:
-        return "Section found but content extraction failed."
+def format_release_features(rows: List[Dict[str, Any]]) -> str:
+    """Markdown for one release's feature rows"""
+    if not rows:
+        return "**NO FEATURES WERE FOUND**"
+    return format_feature_summaries(rows)
 
 
-def extract_new_features(old_upgrade: str, new_upgrade: str) -> Dict[str, str]:
+def extract_and_summarize_release(pdf_path: str, process_pool: Optional[ProcessPoolExecutor] = None) -> List[Dict[str, Any]]:
+    """Extract one release's features (in a worker process if given) and summarize them"""
+    if process_pool is None:
+        features_text, features = extract_release_features(pdf_path)
+    else:
+        features_text, features = process_pool.submit(extract_release_features, pdf_path).result()
+    return summarize_release_features(features_text, features)
+
+
+def _run_in_process(process_pool: ProcessPoolExecutor, func: Callable[..., Any], *args) -> Any:
+    return process_pool.submit(func, *args).result()
+
+
+def _stored_result(release: str, get_result: Callable[[], Any], save: Callable[[Any], None],
+                   on_error: Optional[Callable[[], Any]] = None) -> Callable[[], Any]:
+    """Wrap a per-release job so its result is written to the SCN store once it is ready. With
+    `on_error`, a failed job returns its value instead and nothing is stored"""
+    def get_and_save():
+        try:
+            value = get_result()
+        except Exception as e:
+            if on_error is None:
+                raise
+            print(f"Error processing {release}, not storing it: {str(e)}")
+            return on_error()
+        try:
+            save(value)
+        except Exception as e:
+            print(f"Could not store SCN result of {release}: {str(e)}")
+        return value
+    return get_and_save
+
+
+def submit_release_features(releases: List[str], max_workers: Optional[int] = None, use_store: bool = SCN_STORE_ENABLED,
+                            force: bool = False) -> List[Callable[[], List[Dict[str, Any]]]]:
+    """
+    Start feature extraction for each release and return one callable per release that
+    blocks until that release's feature rows are ready. Releases already in the SCN store are
+    read from it; the rest are extracted, then stored. Serial mode defers all work to the call.
+    """
+    store = get_scn_store() if use_store else None
+    jobs: Dict[str, Callable[[], List[Dict[str, Any]]]] = {}
+    if store is not None and not force:
+        for release in releases:
+            rows = store.features(release)
+            if rows is not None:
+                jobs[release] = functools.partial(list, rows)
+    pending = [release for release in releases if release not in jobs]
+
+    pdf_paths = [os.path.join(features_dir, f"{release}.pdf") for release in pending]
+    workers = _resolve_workers(max_workers, len(pdf_paths))
+    if workers <= 1:
+        computed = [functools.partial(extract_and_summarize_release, pdf_path) for pdf_path in pdf_paths]
+    else:
+        # PyMuPDF work runs in worker processes, the Gemini summary in a thread. Workers read the
+        # structure index, so bring it up to date here rather than in several processes at once
+        print(f"Extracting features for {len(pdf_paths)} releases with {workers} workers")
+        get_scn_index().refresh()
+        process_pool = get_process_pool()
+        computed = _submit_limited(
+            [functools.partial(extract_and_summarize_release, pdf_path, process_pool) for pdf_path in pdf_paths], workers
+        )
+
+    for release, get_rows in zip(pending, computed):
+        if store is not None:
+            get_rows = _stored_result(release, get_rows, functools.partial(store.put_features, release))
+        jobs[release] = get_rows
+    return [jobs[release] for release in releases]
+
+
+def extract_new_features(old_upgrade: str, new_upgrade: str, max_workers: Optional[int] = None) -> Dict[str, str]:
     """Extract new features between two versions"""
-    # Define the path to the PDF files
-    old_pdf_path = os.path.join(features_dir, f"{old_upgrade}.pdf")
-    new_pdf_path = os.path.join(features_dir, f"{new_upgrade}.pdf")
-
     # Extract pdfs that have intermediate releases
     intermediate_releases_pdfs = get_intermediate_upgrades(old_upgrade, new_upgrade)
-    
-    # Extract features from each intermediate release PDF
-    all_features = {}
-    for release in intermediate_releases_pdfs:
-        pdf_path = os.path.join(features_dir, f"{release}.pdf")
-        features_text = extract_new_features_fuzzy(pdf_path)
-        if(features_text == "Section found but content extraction failed." or features_text == "Section title not found." or features_text == ""):
-            all_features[release] = "**NO FEATURES WERE FOUND**"
-            continue
-        all_features[release] = generate_feature_summary(features_text)
-        
-    return all_features
+
+    # Results are collected in release order whatever order the workers finish in
+    feature_jobs = submit_release_features(intermediate_releases_pdfs, max_workers)
+    return {release: format_release_features(get_rows())
+            for release, get_rows in zip(intermediate_releases_pdfs, feature_jobs)}
 
     
     
@@ -347,19 +477,48 @@ def get_intermediate_releases(old_release: str, new_release: str) -> List[str]:
 
 
 
-def extract_fixed_known_issues(release: str, fixed_issues_table: pd.DataFrame, known_issues_table: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """Extract fixed and known issues from a release"""
+def find_issue_table_pages(pdf_path: str) -> Optional[List[int]]:
+    """1-based pages holding Fixed/Known issue tables, from the SCN structure index.
+
+    Returns None when the PDF has no text layer, in which case every page must be scanned.
+    """
+    return document_for_path(pdf_path)["issue_tables"]["pages"]
+
+
+def read_issue_tables(pdf_path: str, pages=None) -> List[pd.DataFrame]:
+    """Run tabula on the given pages only (all pages when none are given)"""
+    return tabula.read_pdf(
+        pdf_path,
+        pages=pages or 'all',
+        lattice=True,
+        multiple_tables=True,
+        guess=False,
+        force_subprocess=TABULA_FORCE_SUBPROCESS
+    )
+
+
+def read_release_issue_tables(release: str, raise_errors: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Read the fixed and known issue tables of a single release. Errors yield empty tables
+    unless `raise_errors` is set"""
     pdf_path = os.path.join(issues_dir, f"{release}.pdf")
     print(f"Processing {pdf_path} for fixed and known issues")
+    fixed_tables = []
+    known_tables = []
     
     if not os.path.exists(pdf_path):
         print(f"Warning: PDF file not found at {pdf_path}")
-        return fixed_issues_table, known_issues_table
+        return pd.DataFrame(), pd.DataFrame()
     
     try:
-        # Read all tables from the PDF
-        print(f"Reading tables from {pdf_path}")
-        tables = tabula.read_pdf(pdf_path, pages='all', lattice=True, multiple_tables=True, guess=False)
+        # Only hand tabula the pages that hold issue tables; fall back to the whole document
+        # when there is no text layer to pre-scan
+        table_pages = find_issue_table_pages(pdf_path)
+        if table_pages == []:
+            print(f"No issue tables found in {pdf_path}, skipping tabula")
+            tables = []
+        else:
+            print(f"Reading tables from {pdf_path} (pages: {table_pages or 'all'})")
+            tables = read_issue_tables(pdf_path, table_pages)
         print(f"Found {len(tables)} tables")
 
         for i, table in enumerate(tables):
@@ -379,23 +538,59 @@ def extract_fixed_known_issues(release: str, fixed_issues_table: pd.DataFrame, k
                 print(f"Found fixed issues table with {len(table)} rows")
                 # Add a column to identify the release
                 table['Release'] = release
-                fixed_issues_table = pd.concat([fixed_issues_table, table], ignore_index=True)
+                fixed_tables.append(table)
             
             # Check for known issues table
             if all(col in table.columns for col in ['PAR', 'Impact', 'Function', 'Description']):
                 print(f"Found known issues table with {len(table)} rows")
                 # Add a column to identify the release
                 table['Release'] = release
-                known_issues_table = pd.concat([known_issues_table, table], ignore_index=True)
-
-        print(f"After processing {release}:")
-        print(f"Fixed issues total rows: {len(fixed_issues_table)}")
-        print(f"Known issues total rows: {len(known_issues_table)}")
-        return fixed_issues_table, known_issues_table
+                known_tables.append(table)
         
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"Error processing {release}: {str(e)}")
-        return fixed_issues_table, known_issues_table
+
+    fixed_issues = pd.concat(fixed_tables, ignore_index=True) if fixed_tables else pd.DataFrame()
+    known_issues = pd.concat(known_tables, ignore_index=True) if known_tables else pd.DataFrame()
+    return fixed_issues, known_issues
+
+
+def submit_release_issues(releases: List[str], max_workers: Optional[int] = None, use_store: bool = SCN_STORE_ENABLED,
+                          force: bool = False) -> List[Callable[[], Tuple[pd.DataFrame, pd.DataFrame]]]:
+    """Start reading each release's issue tables; returns one blocking callable per release.
+    Releases already in the SCN store are read from it; the rest are read with tabula, then stored"""
+    store = get_scn_store() if use_store else None
+    jobs: Dict[str, Callable[[], Tuple[pd.DataFrame, pd.DataFrame]]] = {}
+    if store is not None and not force:
+        for release in releases:
+            tables = store.issues(release)
+            if tables is not None:
+                jobs[release] = functools.partial(tuple, tables)
+    pending = [release for release in releases if release not in jobs]
+
+    # With a store, failures must surface so empty tables from an error are not stored
+    raise_errors = store is not None
+    workers = _resolve_workers(max_workers, len(pending))
+    if workers <= 1:
+        computed = [functools.partial(read_release_issue_tables, release, raise_errors) for release in pending]
+    else:
+        print(f"Reading issue tables for {len(pending)} releases with {workers} workers")
+        get_scn_index().refresh()
+        process_pool = get_process_pool()
+        computed = _submit_limited([
+            functools.partial(_run_in_process, process_pool, read_release_issue_tables, release, raise_errors)
+            for release in pending
+        ], workers)
+
+    for release, get_tables in zip(pending, computed):
+        if store is not None:
+            get_tables = _stored_result(release, get_tables,
+                                        lambda tables, release=release: store.put_issues(release, *tables),
+                                        on_error=lambda: (pd.DataFrame(), pd.DataFrame()))
+        jobs[release] = get_tables
+    return [jobs[release] for release in releases]
 
 
 
@@ -441,7 +636,209 @@ def save_table_to_pdf(dataframe: pd.DataFrame, output_path: str, title: str) ->
 
 
 
-def process_scn_changes(old_version: str, new_version: str, include_features: bool = True, include_issues: bool = True) -> SCNResult:
+def dataframe_records(dataframe: pd.DataFrame) -> List[Dict]:
+    """Convert a DataFrame to JSON-safe records (NaN becomes None)"""
+    if dataframe.empty:
+        return []
+    return dataframe.astype(object).where(pd.notna(dataframe), None).to_dict('records')
+
+
+def drop_repeated_features(rows: List[Dict[str, Any]], seen: set) -> List[Dict[str, Any]]:
+    """Rows whose feature was not already listed under an earlier release of the range"""
+    new_rows = []
+    for row in rows:
+        if row["content_hash"] is not None and row["content_hash"] in seen:
+            continue
+        seen.add(row["content_hash"])
+        new_rows.append(row)
+    return new_rows
+
+
+def _reuse_output_files(name: str, fingerprint: str, write: Callable[[], Dict[str, str]]) -> Dict[str, str]:
+    """Files already written for identical content, otherwise whatever `write` produces"""
+    store = get_scn_store() if SCN_STORE_ENABLED else None
+    if store is not None:
+        files = store.output_files(name, fingerprint)
+        if files is not None:
+            print(f"Reusing unchanged output files for {name}")
+            return files
+    files = write()
+    if store is not None:
+        store.put_output_files(name, fingerprint, files)
+    return files
+
+
+def write_features_output(features: Dict[str, str], old_version: str, new_version: str) -> str:
+    """Save per-release feature summaries to markdown"""
+    features_file = os.path.join(output_dir, f"New_Features_{old_version}_to_{new_version}.md")
+    content = "".join(f"## {release}\n\n{release_features}\n\n" for release, release_features in features.items())
+
+    def write():
+        with open(features_file, "w", encoding="utf-8") as f:
+            f.write(content)
+        print(f"Features saved to: {features_file}")
+        return {"features": features_file}
+
+    fingerprint = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return _reuse_output_files(os.path.basename(features_file), fingerprint, write)["features"]
+
+
+def write_issues_output(fixed_issues_table: pd.DataFrame, known_issues_table: pd.DataFrame,
+                        old_version: str, new_version: str, ledger: Optional[PARLedger] = None) -> Dict[str, str]:
+    """Save fixed and known issues to CSV and PDF, plus the PAR ledger as CSV when given"""
+    ledger_table = ledger.to_frame() if ledger is not None and ledger.entries else pd.DataFrame()
+    fingerprint = hashlib.sha256("\0".join(
+        table.to_csv(index=False) for table in (fixed_issues_table, known_issues_table, ledger_table)
+    ).encode("utf-8")).hexdigest()
+    return _reuse_output_files(
+        f"Issues_{old_version}_to_{new_version}", fingerprint,
+        functools.partial(_write_issue_files, fixed_issues_table, known_issues_table, ledger_table,
+                          old_version, new_version)
+    )
+
+
+def _write_issue_files(fixed_issues_table: pd.DataFrame, known_issues_table: pd.DataFrame, ledger_table: pd.DataFrame,
+                       old_version: str, new_version: str) -> Dict[str, str]:
+    output_files = {}
+    base_path = os.path.join(output_dir, f"Fixed_Issues_{old_version}_to_{new_version}")
+    
+    # Save fixed issues
+    if not fixed_issues_table.empty:
+        fixed_csv = f"{base_path}.csv"
+        fixed_pdf = f"{base_path}.pdf"
+        fixed_issues_table.to_csv(fixed_csv, index=False)
+        save_table_to_pdf(fixed_issues_table, fixed_pdf, f"Fixed Issues {old_version}_to_{new_version}")
+        output_files["fixed_issues_csv"] = fixed_csv
+        output_files["fixed_issues_pdf"] = fixed_pdf
+        print(f"Fixed issues saved to: {fixed_csv} and {fixed_pdf}")
+    
+    # Save known issues
+    if not known_issues_table.empty:
+        known_csv = os.path.join(output_dir, f"Known_Issues_{old_version}_to_{new_version}.csv")
+        known_pdf = os.path.join(output_dir, f"Known_Issues_{old_version}_to_{new_version}.pdf")
+        known_issues_table.to_csv(known_csv, index=False)
+        save_table_to_pdf(known_issues_table, known_pdf, f"Known Issues {old_version}_to_{new_version}")
+        output_files["known_issues_csv"] = known_csv
+        output_files["known_issues_pdf"] = known_pdf
+        print(f"Known issues saved to: {known_csv} and {known_pdf}")
+
+    # One row per PAR with its status and release history
+    if not ledger_table.empty:
+        ledger_csv = os.path.join(output_dir, f"PAR_Ledger_{old_version}_to_{new_version}.csv")
+        ledger_table.to_csv(ledger_csv, index=False)
+        output_files["par_ledger_csv"] = ledger_csv
+        print(f"PAR ledger saved to: {ledger_csv}")
+
+    return output_files
+
+
+def precompute_releases(force: bool = False, max_workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Extract features and issues of every release in the SCN directories into the SCN store.
+    Releases whose PDFs are unchanged since they were stored are skipped unless `force` is set.
+    """
+    index = get_scn_index()
+    index.refresh()
+    feature_releases = index.releases("features")
+    issue_releases = index.releases("issues")
+
+    feature_jobs = submit_release_features(feature_releases, max_workers, use_store=True, force=force)
+    issue_jobs = submit_release_issues(issue_releases, max_workers, use_store=True, force=force)
+    built = {"features": {}, "issues": {}}
+    for release, get_rows in zip(feature_releases, feature_jobs):
+        built["features"][release] = len(get_rows())
+    for release, get_tables in zip(issue_releases, issue_jobs):
+        fixed, known = get_tables()
+        built["issues"][release] = {"fixed": len(fixed), "known": len(known)}
+    return built
+
+
+def iter_scn_changes(old_version: str, new_version: str, include_features: bool = True, include_issues: bool = True,
+                     max_workers: Optional[int] = None, result: Optional[SCNResult] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Process SCN changes between two versions, yielding each release as soon as it is done.
+
+    Events are yielded in release order: a "start" event listing the releases, one "features"
+    event and one "issues" event per release, then "complete" with the output files. The
+    accumulated features, issues and output files are also collected into `result`.
+    """
+    result = result if result is not None else SCNResult()
+    print(f"\nProcessing SCN changes from {old_version} to {new_version}")
+    print(f"Features directory: {features_dir}")
+    print(f"Issues directory: {issues_dir}")
+
+    feature_releases = []
+    if include_features:
+        old_features_path = os.path.join(features_dir, f"{old_version}.pdf")
+        new_features_path = os.path.join(features_dir, f"{new_version}.pdf")
+        print(f"\nChecking feature files:")
+        print(f"Old version: {old_features_path} (exists: {os.path.exists(old_features_path)})")
+        print(f"New version: {new_features_path} (exists: {os.path.exists(new_features_path)})")
+        
+        if os.path.exists(old_features_path) and os.path.exists(new_features_path):
+            feature_releases = get_intermediate_upgrades(old_version, new_version)
+
+    issue_releases = []
+    if include_issues:
+        print("\nProcessing issues...")
+        # Convert SCN version to TCU version for issues
+        # Example: R511.2_SCN -> R520.1_TCU1_SCN
+        tcu_old_version = "R520.1_TCU1_SCN"
+        tcu_new_version = "R520.1_TCU4_SCN"
+        issue_releases = get_intermediate_releases(tcu_old_version, tcu_new_version)
+        print(f"Found intermediate releases: {issue_releases}")
+
+    # Submit everything up front so feature and issue releases are worked on together
+    feature_jobs = submit_release_features(feature_releases, max_workers)
+    issue_jobs = submit_release_issues(issue_releases, max_workers)
+
+    yield {
+        "event": "start",
+        "old_version": old_version,
+        "new_version": new_version,
+        "feature_releases": feature_releases,
+        "issue_releases": issue_releases
+    }
+
+    if include_features and feature_releases:
+        seen_features = set()
+        for release, get_rows in zip(feature_releases, feature_jobs):
+            rows = get_rows()
+            new_rows = drop_repeated_features(rows, seen_features)
+            result.features[release] = (format_release_features(new_rows) if new_rows or not rows
+                                        else "**NO NEW FEATURES SINCE THE PREVIOUS RELEASE**")
+            yield {"event": "features", "release": release, "summary": result.features[release]}
+        result.output_files["features"] = write_features_output(result.features, old_version, new_version)
+
+    if include_issues:
+        # Each release reports only its net change; the ledger holds one row per PAR
+        ledger = result.par_ledger
+        for release, get_tables in zip(issue_releases, issue_jobs):
+            release_fixed, release_known = ledger.add_release(release, *get_tables())
+            yield {
+                "event": "issues",
+                "release": release,
+                "fixed_issues": dataframe_records(release_fixed),
+                "known_issues": dataframe_records(release_known)
+            }
+
+        result.fixed_issues = ledger.fixed_issues()
+        result.known_issues = ledger.known_issues()
+        
+        print(f"\nFinal results:")
+        print(f"Fixed issues rows: {len(result.fixed_issues)}")
+        print(f"Known issues rows: {len(result.known_issues)}")
+        print(f"PAR ledger: {ledger.stats()}")
+        
+        result.output_files.update(
+            write_issues_output(result.fixed_issues, result.known_issues, old_version, new_version, ledger)
+        )
+
+    yield {"event": "complete", "output_files": result.output_files}
+
+
+def process_scn_changes(old_version: str, new_version: str, include_features: bool = True, include_issues: bool = True,
+                        max_workers: Optional[int] = None) -> SCNResult:
     """
     Process SCN changes between two versions.
     
@@ -450,88 +847,15 @@ def process_scn_changes(old_version: str, new_version: str, include_features: bo
         new_version: Ending version
         include_features: Whether to process new features
         include_issues: Whether to process fixed/known issues
+        max_workers: Releases processed in parallel (defaults to SCN_MAX_WORKERS, 1 = serial)
     
     Returns:
         SCNResult object containing features, issues, and output file paths
     """
     result = SCNResult()
-    print(f"\nProcessing SCN changes from {old_version} to {new_version}")
-    print(f"Features directory: {features_dir}")
-    print(f"Issues directory: {issues_dir}")
-    
     try:
-        # Process features if requested
-        if include_features:
-            old_features_path = os.path.join(features_dir, f"{old_version}.pdf")
-            new_features_path = os.path.join(features_dir, f"{new_version}.pdf")
-            print(f"\nChecking feature files:")
-            print(f"Old version: {old_features_path} (exists: {os.path.exists(old_features_path)})")
-            print(f"New version: {new_features_path} (exists: {os.path.exists(new_features_path)})")
-            
-            if os.path.exists(old_features_path) and os.path.exists(new_features_path):
-                result.features = extract_new_features(old_version, new_version)
-                
-                # Save features to markdown
-                features_file = os.path.join(output_dir, f"New_Features_{old_version}_to_{new_version}.md")
-                with open(features_file, "w", encoding="utf-8") as f:
-                    for release, features in result.features.items():
-                        f.write(f"## {release}\n\n")
-                        f.write(features + "\n\n")
-                result.output_files["features"] = features_file
-                print(f"Features saved to: {features_file}")
-        
-        # Process issues if requested
-        if include_issues:
-            print("\nProcessing issues...")
-            # Initialize empty DataFrames
-            fixed_issues_table = pd.DataFrame()
-            known_issues_table = pd.DataFrame()
-            
-            # Convert SCN version to TCU version for issues
-            # Example: R511.2_SCN -> R520.1_TCU1_SCN
-            tcu_old_version = "R520.1_TCU1_SCN"
-            tcu_new_version = "R520.1_TCU4_SCN"
-            
-            # Process each intermediate release
-            intermediate_releases = get_intermediate_releases(tcu_old_version, tcu_new_version)
-            print(f"Found intermediate releases: {intermediate_releases}")
-                
-            for release in intermediate_releases:
-                print(f"\nProcessing issues for release: {release}")
-                fixed_issues_table, known_issues_table = extract_fixed_known_issues(
-                    release, fixed_issues_table, known_issues_table
-                )
-            
-            result.fixed_issues = fixed_issues_table
-            result.known_issues = known_issues_table
-            
-            print(f"\nFinal results:")
-            print(f"Fixed issues rows: {len(fixed_issues_table)}")
-            print(f"Known issues rows: {len(known_issues_table)}")
-            
-            # Save to CSV and PDF
-            base_path = os.path.join(output_dir, f"Fixed_Issues_{old_version}_to_{new_version}")
-            
-            # Save fixed issues
-            if not fixed_issues_table.empty:
-                fixed_csv = f"{base_path}.csv"
-                fixed_pdf = f"{base_path}.pdf"
-                fixed_issues_table.to_csv(fixed_csv, index=False)
-                save_table_to_pdf(fixed_issues_table, fixed_pdf, f"Fixed Issues {old_version}_to_{new_version}")
-                result.output_files["fixed_issues_csv"] = fixed_csv
-                result.output_files["fixed_issues_pdf"] = fixed_pdf
-                print(f"Fixed issues saved to: {fixed_csv} and {fixed_pdf}")
-            
-            # Save known issues
-            if not known_issues_table.empty:
-                known_csv = os.path.join(output_dir, f"Known_Issues_{old_version}_to_{new_version}.csv")
-                known_pdf = os.path.join(output_dir, f"Known_Issues_{old_version}_to_{new_version}.pdf")
-                known_issues_table.to_csv(known_csv, index=False)
-                save_table_to_pdf(known_issues_table, known_pdf, f"Known Issues {old_version}_to_{new_version}")
-                result.output_files["known_issues_csv"] = known_csv
-                result.output_files["known_issues_pdf"] = known_pdf
-                print(f"Known issues saved to: {known_csv} and {known_pdf}")
-        
+        for _ in iter_scn_changes(old_version, new_version, include_features, include_issues, max_workers, result):
+            pass
         return result
     
     except Exception as e:
@@ -0,0 +1,396 @@
+"""
+Persisted structure of the SCN PDFs: chapters, the "New Features and Enhancements" chapter and its
+numbered feature subsections (with page spans), and the pages holding Fixed/Known issue tables.
+
+Each PDF is parsed once and re-parsed only when its SHA-256 changes; SCN requests read from the
+index instead of re-discovering the layout.
+
+Usage:
+    python scn_index.py [--force]
+"""
+import os
+import re
+import json
+import time
+import logging
+import argparse
+import threading
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+from pdf_cache import file_sha256, get_page_texts, get_page_range_texts
+from section_locator import SectionLocation, get_outline, locate_section
+from scn_patterns import PAR_ID_PATTERN, heading_lines
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+SCN_INDEX_PATH = os.getenv("SCN_INDEX_PATH", os.path.join(script_dir, "cache", "scn_index.json"))
+SCN_INDEX_VERSION = 1
+SCN_DIRECTORIES = {
+    "features": os.path.join(script_dir, "data", "For_NewFeatures"),
+    "issues": os.path.join(script_dir, "data", "For_IssuesFixed_KnownIssues"),
+}
+
+FEATURE_SECTION_TITLES = [
+    "New Features and Enhancements",
+    "New Features & Enhancements",
+]
+
+# Issue tables carry a "PAR ... Description" header plus one of these columns on every page
+ISSUE_TABLE_HEADER = {"PAR", "Description"}
+ISSUE_TABLE_KIND_COLUMNS = {"Impact", "Subsystem", "Function"}
+
+CHAPTER_TITLE = re.compile(r"^\s*chapter\s+(\d+)\s*[-:.]?\s*(.*)$", re.IGNORECASE)
+NUMBERED_TITLE = re.compile(r"^\s*(\d+(?:\.\d+)+)\s+(.*)$")
+
+
+def _outline_spans(toc: Sequence[Tuple[int, str, int]], page_count: int) -> List[Tuple[int, str, int, int]]:
+    """(level, title, first_page, last_page) for every outline entry, 0-based and inclusive.
+
+    An entry runs to the page where the next entry of the same or a higher level starts, since
+    subsections often share that page.
+    """
+    spans = []
+    for position, (level, title, page) in enumerate(toc):
+        if page < 1:
+            continue
+        last_page = page_count - 1
+        for next_level, _, next_page in toc[position + 1:]:
+            if next_level <= level and next_page >= 1:
+                last_page = max(page - 1, next_page - 1)
+                break
+        spans.append((level, title.strip(), page - 1, last_page))
+    return spans
+
+
+def parse_chapters(toc: Sequence[Tuple[int, str, int]], page_count: int) -> List[Dict[str, Any]]:
+    chapters = []
+    for level, title, first_page, last_page in _outline_spans(toc, page_count):
+        match = CHAPTER_TITLE.match(title)
+        if level == 1 and match:
+            chapters.append({"number": int(match.group(1)), "title": match.group(2).strip(),
+                             "first_page": first_page, "last_page": last_page})
+    return chapters
+
+
+def features_from_outline(toc: Sequence[Tuple[int, str, int]], page_count: int,
+                          section: SectionLocation) -> List[Dict[str, Any]]:
+    """Numbered outline entries inside the features section"""
+    features = []
+    for level, title, first_page, last_page in _outline_spans(toc, page_count):
+        match = NUMBERED_TITLE.match(title)
+        if not match or not (section.first_page <= first_page <= section.last_page):
+            continue
+        features.append({"number": match.group(1), "title": match.group(2).strip(), "level": level,
+                         "first_page": first_page, "last_page": min(last_page, section.last_page)})
+    return _under_section_number(features, section)
+
+
+def features_from_text(pages: Sequence[str], section: SectionLocation) -> List[Dict[str, Any]]:
+    """Numbered headings found in the section's page text, for PDFs without an outline.
+
+    Chapter openings sometimes repeat their subsection list, so the last occurrence of each
+    number (the heading in the body) wins.
+    """
+    found: Dict[str, Dict[str, Any]] = {}
+    for offset, page_text in enumerate(pages):
+        lines = [line.strip() for line in page_text.split("\n")]
+        for _, number, title in heading_lines(lines):
+            found[number] = {"number": number, "title": title, "level": number.count(".") + 1,
+                             "first_page": section.first_page + offset}
+
+    features = sorted(found.values(), key=lambda feature: [int(part) for part in feature["number"].split(".")])
+    for position, feature in enumerate(features):
+        following = [other["first_page"] for other in features[position + 1:] if other["level"] <= feature["level"]]
+        feature["last_page"] = max(feature["first_page"], following[0]) if following else section.last_page
+    return _under_section_number(features, section)
+
+
+def _under_section_number(features: List[Dict[str, Any]], section: SectionLocation) -> List[Dict[str, Any]]:
+    """Keep subsections of the section's own number ("6.x" under "Chapter 6", "3.2.x" under "3.2")"""
+    match = CHAPTER_TITLE.match(section.title) or NUMBERED_TITLE.match(section.title)
+    if not match:
+        return features
+    prefix = f"{match.group(1)}."
+    return [feature for feature in features if feature["number"].startswith(prefix)]
+
+
+def _table_kind(page_index: int, lines: set, chapters: Sequence[Dict[str, Any]]) -> str:
+    """"fixed" or "known": by the enclosing chapter when it says so, else by the table's columns"""
+    for chapter in chapters:
+        if chapter["first_page"] <= page_index <= chapter["last_page"]:
+            title = chapter["title"].lower()
+            if "known" in title:
+                return "known"
+            if any(word in title for word in ("resolved", "fixed", "problems")):
+                return "fixed"
+    return "known" if "Function" in lines else "fixed"
+
+
+def find_issue_tables(page_texts: Sequence[str], chapters: Sequence[Dict[str, Any]] = ()) -> Dict[str, Optional[List[int]]]:
+    """1-based pages holding Fixed and Known issue tables.
+
+    Pages are None when the PDF has no text layer, in which case every page must be scanned.
+    """
+    if not any(page_text.strip() for page_text in page_texts):
+        return {"pages": None, "fixed": None, "known": None}
+
+    tables = {"pages": [], "fixed": [], "known": []}
+    for page_num, page_text in enumerate(page_texts, 1):
+        lines = {line.strip() for line in page_text.split("\n")}
+        pages = tables["pages"]
+        is_header_page = ISSUE_TABLE_HEADER <= lines and lines & ISSUE_TABLE_KIND_COLUMNS
+        # A table may continue onto a page without a repeated header row
+        if is_header_page or (pages and pages[-1] == page_num - 1 and PAR_ID_PATTERN.search(page_text)):
+            pages.append(page_num)
+            tables[_table_kind(page_num - 1, lines, chapters)].append(page_num)
+    return tables
+
+
+def index_document(pdf_path: str, digest: Optional[str] = None) -> Dict[str, Any]:
+    """Parse one SCN PDF into its index entry"""
+    start = time.perf_counter()
+    stats = os.stat(pdf_path)
+    toc, page_count = get_outline(pdf_path)
+
+    section = locate_section(pdf_path, FEATURE_SECTION_TITLES)
+
+    features = []
+    if section is not None:
+        features = features_from_outline(toc, page_count, section) if section.source == "toc" else []
+        if not features:
+            features = features_from_text(
+                get_page_range_texts(pdf_path, section.first_page, section.last_page), section
+            )
+
+    page_texts = get_page_texts(pdf_path)
+    chapters = parse_chapters(toc, page_count)
+    return {
+        "sha256": digest or file_sha256(pdf_path),
+        "size": stats.st_size,
+        "mtime_ns": stats.st_mtime_ns,
+        "page_count": page_count or len(page_texts),
+        "has_outline": bool(toc),
+        "chapters": chapters,
+        "features_section": section.to_dict() if section is not None else None,
+        "features": features,
+        "issue_tables": find_issue_tables(page_texts, chapters),
+        "indexed_at": time.time(),
+        "index_seconds": round(time.perf_counter() - start, 3)
+    }
+
+
+def failed_document(pdf_path: str, error: Exception, digest: Optional[str] = None) -> Dict[str, Any]:
+    """Entry for a PDF that could not be parsed: empty structure plus the error, so the file stays
+    listed and is only retried once it changes"""
+    stats = os.stat(pdf_path)
+    return {
+        "sha256": digest or "",
+        "size": stats.st_size,
+        "mtime_ns": stats.st_mtime_ns,
+        "page_count": 0,
+        "has_outline": False,
+        "chapters": [],
+        "features_section": None,
+        "features": [],
+        "issue_tables": {"pages": None, "fixed": None, "known": None},
+        "error": str(error),
+        "indexed_at": time.time(),
+        "index_seconds": 0.0
+    }
+
+
+def document_for_path(pdf_path: str) -> Dict[str, Any]:
+    """Index entry for a PDF: from the shared index when it lives in an SCN directory, otherwise
+    parsed on the spot (and not persisted)"""
+    index = get_scn_index()
+    directory, filename = os.path.split(os.path.abspath(str(pdf_path)))
+    for kind, kind_directory in index.directories.items():
+        if os.path.abspath(kind_directory) == directory and filename.lower().endswith(".pdf"):
+            return index.document(kind, filename[:-4])
+    return index_document(str(pdf_path))
+
+
+def document_key(kind: str, release: str) -> str:
+    return f"{kind}/{release}"
+
+
+class SCNIndex:
+    """JSON-persisted index of SCN documents keyed by "<kind>/<release>".
+
+    Entries are reused while the file's size and mtime are unchanged, and re-parsed only when a
+    changed file also hashes differently. The file is written atomically, so worker processes can
+    read it while the server refreshes it.
+    """
+
+    def __init__(self, index_path: str = SCN_INDEX_PATH, directories: Optional[Dict[str, str]] = None):
+        self.index_path = index_path
+        self.directories = directories or SCN_DIRECTORIES
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._loaded_mtime_ns: Optional[int] = None
+        self._lock = threading.RLock()
+        self.indexed = 0
+
+    def _load(self) -> None:
+        try:
+            mtime_ns = os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime_ns == self._loaded_mtime_ns:
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") == SCN_INDEX_VERSION:
+                self._documents = payload.get("documents", {})
+            self._loaded_mtime_ns = mtime_ns
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable SCN index {self.index_path}: {str(e)}")
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": SCN_INDEX_VERSION, "documents": self._documents}, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+        self._loaded_mtime_ns = os.stat(self.index_path).st_mtime_ns
+
+    def _fresh_entry(self, key: str, pdf_path: str, force: bool = False) -> Optional[Dict[str, Any]]:
+        """New entry for a file, or None while the indexed one is current. Parsing happens outside
+        the lock, so lookups are not held up by it; the caller publishes the entry"""
+        with self._lock:
+            self._load()
+            entry = self._documents.get(key)
+        stats = os.stat(pdf_path)
+        if entry is not None and not force:
+            if (entry["size"], entry["mtime_ns"]) == (stats.st_size, stats.st_mtime_ns):
+                return None
+            digest = file_sha256(pdf_path)
+            if digest == entry["sha256"]:
+                # Touched but identical: keep the parse, remember the new mtime
+                return dict(entry, size=stats.st_size, mtime_ns=stats.st_mtime_ns)
+        else:
+            digest = None
+
+        logger.info(f"Indexing SCN structure of {pdf_path}")
+        try:
+            entry = index_document(pdf_path, digest)
+        except Exception as e:
+            logger.error(f"Could not index {pdf_path}: {str(e)}")
+            entry = failed_document(pdf_path, e, digest)
+        entry["path"] = os.path.relpath(pdf_path, script_dir)
+        with self._lock:
+            self.indexed += 1
+        return entry
+
+    def _publish(self, entries: Dict[str, Dict[str, Any]], removed: Sequence[str] = ()) -> None:
+        """Store new entries and drop removed ones, on top of whatever another process saved meanwhile"""
+        if not entries and not removed:
+            return
+        with self._lock:
+            self._load()
+            self._documents.update(entries)
+            for key in removed:
+                self._documents.pop(key, None)
+            self._save()
+
+    def refresh(self, force: bool = False) -> Dict[str, int]:
+        """Bring every document in the SCN directories up to date and drop removed ones"""
+        paths: Dict[str, str] = {}
+        for kind, directory in self.directories.items():
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                if filename.lower().endswith(".pdf"):
+                    paths[document_key(kind, filename[:-4])] = os.path.join(directory, filename)
+
+        updated = {}
+        for key, pdf_path in paths.items():
+            try:
+                entry = self._fresh_entry(key, pdf_path, force)
+            except Exception as e:
+                logger.error(f"Could not index {pdf_path}: {str(e)}")
+                continue
+            if entry is not None:
+                updated[key] = entry
+        with self._lock:
+            self._load()
+            removed = [key for key in self._documents if key not in paths]
+        self._publish(updated, removed)
+        with self._lock:
+            return {"documents": len(self._documents), "indexed": self.indexed}
+
+    def _entry(self, kind: str, release: str) -> Optional[Dict[str, Any]]:
+        pdf_path = os.path.join(self.directories[kind], f"{release}.pdf")
+        if not os.path.exists(pdf_path):
+            return None
+        key = document_key(kind, release)
+        entry = self._fresh_entry(key, pdf_path)
+        if entry is not None:
+            self._publish({key: entry})
+            return entry
+        with self._lock:
+            return self._documents.get(key)
+
+    def document(self, kind: str, release: str) -> Optional[Dict[str, Any]]:
+        """Entry for one release's PDF, (re-)indexing just that file if needed; None if it does not exist.
+        Raises ValueError for a PDF that could not be indexed, rather than hand out its empty structure"""
+        entry = self._entry(kind, release)
+        if entry is not None and entry.get("error"):
+            raise ValueError(f"Could not index {entry['path']}: {entry['error']}")
+        return entry
+
+    def digest(self, kind: str, release: str) -> Optional[str]:
+        """SHA-256 of one release's PDF as indexed; None if it does not exist or could not be indexed"""
+        entry = self._entry(kind, release)
+        return entry["sha256"] if entry is not None and not entry.get("error") else None
+
+    def releases(self, kind: str) -> List[str]:
+        with self._lock:
+            prefix = f"{kind}/"
+            return sorted(key[len(prefix):] for key in self._documents if key.startswith(prefix))
+
+    def summary(self, kind: str) -> List[Dict[str, Any]]:
+        """Per-release overview for listings"""
+        with self._lock:
+            documents = [(release, self._documents[document_key(kind, release)]) for release in self.releases(kind)]
+        return [{
+            "release": release,
+            "pages": entry["page_count"],
+            "chapters": len(entry["chapters"]),
+            "features_section": entry["features_section"],
+            "features": len(entry["features"]),
+            "issue_table_pages": entry["issue_tables"]["pages"],
+            "error": entry.get("error")
+        } for release, entry in documents]
+
+
+_index: Optional[SCNIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_scn_index() -> SCNIndex:
+    """Process-wide index over the SCN data directories"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SCNIndex()
+        return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index the structure of the SCN PDFs.')
+    parser.add_argument('--force', action='store_true', help='Re-parse every PDF even if unchanged')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    start = time.perf_counter()
+    result = get_scn_index().refresh(force=args.force)
+    print(f"{result['documents']} documents, {result['indexed']} (re)indexed in "
+          f"{time.perf_counter() - start:.2f}s -> {SCN_INDEX_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import re
+from typing import Iterator, Sequence, Tuple
+
+# Patterns shared by the SCN modules. Kept free of PDF and LLM imports so light modules
+# (the PAR ledger, the retriever, feature parsing) can use them without loading PyMuPDF.
+
+# PAR numbers as printed in the issue tables ("1-G9ENCXT")
+PAR_ID_PATTERN = re.compile(r"\b1-[A-Z0-9]{6,8}\b")
+# A subsection heading in page text: "6.2 Title" on one line, or "6.2" alone followed by the title
+HEADING_LINE = re.compile(r"^(\d+(?:\.\d+)+)(?:\s+(\S.*))?$")
+
+
+def heading_lines(lines: Sequence[str]) -> Iterator[Tuple[int, str, str]]:
+    """(line index, number, title) of every numbered heading among stripped lines. A number whose
+    title would start with a digit is a table cell or a version, not a heading"""
+    for index, line in enumerate(lines):
+        match = HEADING_LINE.match(line)
+        if not match:
+            continue
+        title = match.group(2) or (lines[index + 1] if index + 1 < len(lines) else "")
+        if title and not title[0].isdigit():
+            yield index, match.group(1), title
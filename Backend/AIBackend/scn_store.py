@@ -0,0 +1,255 @@
+"""
+Precomputed per-release SCN results: feature summaries and Fixed/Known issue rows for every
+release, stored once in SQLite next to the SCN structure index.
+
+A release's rows are valid while its PDF's SHA-256 is unchanged, so a version range is answered
+by reading the releases it covers instead of re-running PyMuPDF, tabula and Gemini. Generated
+output files are recorded with a fingerprint of their content and reused while it matches.
+
+Usage:
+    python scn_store.py [--force] [--workers N]
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from typing import Dict, List, Any, Optional, Tuple, Sequence
+import pandas as pd
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+SCN_STORE_PATH = os.getenv("SCN_STORE_PATH", os.path.join(script_dir, "cache", "scn_store.sqlite3"))
+# Bump when what is stored per release changes, so older rows are rebuilt
+SCN_STORE_VERSION = 1
+# Set SCN_STORE_ENABLED=0 to always extract from the PDFs
+SCN_STORE_ENABLED = os.getenv("SCN_STORE_ENABLED", "1").lower() not in ("0", "false", "no")
+
+ISSUE_TABLE_KINDS = ("fixed", "known")
+
+
+def _json_value(value: Any) -> Any:
+    """Cell value as stored: NaN becomes None, numpy scalars become Python ones"""
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+class SCNStore:
+    """SQLite tables of per-release feature and issue rows, tagged with the source PDF's digest"""
+
+    def __init__(self, db_path: str = SCN_STORE_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS releases (
+                kind TEXT NOT NULL,
+                release TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                columns TEXT,
+                built_at REAL NOT NULL,
+                PRIMARY KEY (kind, release)
+            );
+            CREATE TABLE IF NOT EXISTS features (
+                release TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                number TEXT,
+                title TEXT,
+                content_hash TEXT,
+                summary TEXT NOT NULL,
+                PRIMARY KEY (release, position)
+            );
+            CREATE TABLE IF NOT EXISTS issues (
+                release TEXT NOT NULL,
+                table_kind TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                par TEXT,
+                row TEXT NOT NULL,
+                PRIMARY KEY (release, table_kind, position)
+            );
+            CREATE INDEX IF NOT EXISTS idx_issues_par ON issues (par);
+            CREATE TABLE IF NOT EXISTS outputs (
+                name TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                files TEXT NOT NULL
+            );"""
+        )
+        self._conn.commit()
+        self._stats = {"hits": 0, "misses": 0, "stored": 0, "outputs_reused": 0}
+
+    def _count(self, name: str) -> None:
+        self._stats[name] += 1
+
+    def _digest(self, kind: str, release: str) -> Optional[str]:
+        """Digest of the release's PDF; None (a store miss) when it is missing or unreadable, so
+        only that release's own extraction fails"""
+        # Imported here so worker processes that only read PDFs do not load the index
+        from scn_index import get_scn_index
+        try:
+            return get_scn_index().digest(kind, release)
+        except Exception as e:
+            logger.warning(f"No digest for {kind} of {release}: {str(e)}")
+            return None
+
+    def _fresh(self, kind: str, release: str) -> Optional[sqlite3.Row]:
+        digest = self._digest(kind, release)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256, version, columns FROM releases WHERE kind = ? AND release = ?", (kind, release)
+            ).fetchone()
+            found = row is not None and digest is not None and row[0] == digest and row[1] == SCN_STORE_VERSION
+            self._count("hits" if found else "misses")
+        return row if found else None
+
+    def _mark_built(self, kind: str, release: str, digest: Optional[str],
+                    columns: Optional[Dict[str, List[str]]] = None) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO releases (kind, release, sha256, version, columns, built_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, release, digest or "", SCN_STORE_VERSION,
+             json.dumps(columns) if columns is not None else None, time.time())
+        )
+        self._count("stored")
+
+    def features(self, release: str) -> Optional[List[Dict[str, Any]]]:
+        """Stored feature rows of a release in document order, or None when missing or stale"""
+        if self._fresh("features", release) is None:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT number, title, content_hash, summary FROM features WHERE release = ? ORDER BY position",
+                (release,)
+            ).fetchall()
+        return [{"number": number, "title": title, "content_hash": content_hash, "summary": summary}
+                for number, title, content_hash, summary in rows]
+
+    def put_features(self, release: str, rows: Sequence[Dict[str, Any]]) -> None:
+        """Store a release's feature rows; skipped while any summary is a provisional stand-in,
+        so the release is summarized again next time"""
+        if any(row.get("provisional") for row in rows):
+            logger.info(f"Not storing features of {release}: some summaries are provisional")
+            return
+        digest = self._digest("features", release)
+        with self._lock:
+            self._conn.execute("DELETE FROM features WHERE release = ?", (release,))
+            self._conn.executemany(
+                "INSERT INTO features (release, position, number, title, content_hash, summary) VALUES (?, ?, ?, ?, ?, ?)",
+                [(release, position, row["number"], row["title"], row["content_hash"], row["summary"])
+                 for position, row in enumerate(rows)]
+            )
+            self._mark_built("features", release, digest)
+            self._conn.commit()
+
+    def issues(self, release: str) -> Optional[Tuple[pd.DataFrame, pd.DataFrame]]:
+        """Stored (fixed, known) issue tables of a release, or None when missing or stale"""
+        built = self._fresh("issues", release)
+        if built is None:
+            return None
+        columns = json.loads(built[2] or "{}")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT table_kind, row FROM issues WHERE release = ? ORDER BY table_kind, position", (release,)
+            ).fetchall()
+        tables = {kind: [] for kind in ISSUE_TABLE_KINDS}
+        for table_kind, row in rows:
+            tables[table_kind].append(json.loads(row))
+        return tuple(
+            pd.DataFrame(tables[kind], columns=columns.get(kind)) if tables[kind] else pd.DataFrame()
+            for kind in ISSUE_TABLE_KINDS
+        )
+
+    def put_issues(self, release: str, fixed: pd.DataFrame, known: pd.DataFrame) -> None:
+        columns, values = {}, []
+        for kind, table in zip(ISSUE_TABLE_KINDS, (fixed, known)):
+            if table.empty:
+                continue
+            columns[kind] = [str(column) for column in table.columns]
+            par_column = table.columns.get_loc("PAR") if "PAR" in table.columns else None
+            for position, row in enumerate(table.itertuples(index=False)):
+                cells = [_json_value(value) for value in row]
+                par = cells[par_column] if par_column is not None else None
+                values.append((release, kind, position, str(par) if par is not None else None, json.dumps(cells)))
+        digest = self._digest("issues", release)
+        with self._lock:
+            self._conn.execute("DELETE FROM issues WHERE release = ?", (release,))
+            self._conn.executemany(
+                "INSERT INTO issues (release, table_kind, position, par, row) VALUES (?, ?, ?, ?, ?)", values
+            )
+            self._mark_built("issues", release, digest, columns)
+            self._conn.commit()
+
+    def output_files(self, name: str, fingerprint: str) -> Optional[Dict[str, str]]:
+        """Files written earlier for the same content, if all of them still exist"""
+        with self._lock:
+            row = self._conn.execute("SELECT fingerprint, files FROM outputs WHERE name = ?", (name,)).fetchone()
+        if row is None or row[0] != fingerprint:
+            return None
+        files = json.loads(row[1])
+        if not all(os.path.exists(path) for path in files.values()):
+            return None
+        with self._lock:
+            self._count("outputs_reused")
+        return files
+
+    def put_output_files(self, name: str, fingerprint: str, files: Dict[str, str]) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO outputs (name, fingerprint, files) VALUES (?, ?, ?)",
+                               (name, fingerprint, json.dumps(files)))
+            self._conn.commit()
+
+    def releases(self, kind: str) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT release FROM releases WHERE kind = ? ORDER BY release", (kind,))]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["features"] = self._conn.execute("SELECT COUNT(*) FROM features").fetchone()[0]
+            stats["issues"] = self._conn.execute("SELECT COUNT(*) FROM issues").fetchone()[0]
+            for kind in ("features", "issues"):
+                stats[f"{kind}_releases"] = self._conn.execute(
+                    "SELECT COUNT(*) FROM releases WHERE kind = ?", (kind,)).fetchone()[0]
+        stats["path"] = self.db_path
+        return stats
+
+
+_store: Optional[SCNStore] = None
+_store_lock = threading.Lock()
+
+
+def get_scn_store() -> SCNStore:
+    """Shared store instance, opened on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SCNStore()
+    return _store
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute SCN features and issues for every release.')
+    parser.add_argument('--force', action='store_true', help='Rebuild releases even if their PDFs are unchanged')
+    parser.add_argument('--workers', type=int, default=None, help='Releases processed in parallel')
+    args = parser.parse_args()
+
+    from scn_accumulation import precompute_releases
+    start = time.perf_counter()
+    built = precompute_releases(force=args.force, max_workers=args.workers)
+    print(json.dumps(built, indent=2))
+    print(json.dumps(get_scn_store().stats(), indent=2))
+    print(f"Finished in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
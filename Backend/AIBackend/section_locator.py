@@ -0,0 +1,187 @@
+import re
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple, Sequence
+import fitz  # PyMuPDF
+from rapidfuzz import fuzz, process
+from pdf_cache import file_sha256, get_page_texts, get_page_range_texts
+
+logger = logging.getLogger(__name__)
+
+# Finds a chapter (e.g. "New Features and Enhancements") in an SCN as a page range, so only that
+# chapter's pages are read. The PDF outline is tried first; documents without one fall back to a
+# page-by-page scan that only fuzzy-scores lines passing a cheap keyword/length prefilter.
+
+SECTION_MATCH_THRESHOLD = 80
+# "Chapter 6 - ", "6.2  ", "3 " ... in front of outline entries and headings
+NUMBERING_PREFIX = re.compile(r"^\s*(?:chapter\s+\d+\s*[-:.]?\s*|\d+(?:\.\d+)*\.?\s+)", re.IGNORECASE)
+# Dot leaders mark lines of the printed table of contents, not the heading itself
+TOC_LEADER = re.compile(r"\.{4,}|…")
+HEADING_NUMBER = re.compile(r"^\s*(?:chapter\s+)?(\d+)(?:\.\d+)*\b", re.IGNORECASE)
+
+_outline_lock = threading.Lock()
+# File digest -> (outline, page count), so the same PDF is only opened once for its outline
+_outline_memo: Dict[str, Tuple[List[Tuple[int, str, int]], int]] = {}
+
+
+class SectionLocation:
+    """Where a section lives: 0-based inclusive page range plus the heading as written"""
+
+    def __init__(self, title: str, first_page: int, last_page: int, source: str, score: float,
+                 next_title: Optional[str] = None):
+        self.title = title
+        self.first_page = first_page
+        self.last_page = last_page
+        self.source = source
+        self.score = score
+        self.next_title = next_title
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "SectionLocation":
+        return cls(data["title"], data["first_page"], data["last_page"], data["source"], data["score"],
+                   data.get("next_title"))
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "title": self.title,
+            "first_page": self.first_page,
+            "last_page": self.last_page,
+            "source": self.source,
+            "score": round(self.score, 1),
+            "next_title": self.next_title
+        }
+
+
+def normalize_title(title: str) -> str:
+    """Case-, numbering- and "&"-insensitive form of a heading"""
+    title = NUMBERING_PREFIX.sub("", title.replace("\xa0", " "))
+    title = title.replace("&", " and ").lower()
+    return " ".join(title.split())
+
+
+def get_outline(pdf_path: str) -> Tuple[List[Tuple[int, str, int]], int]:
+    """The PDF outline as (level, title, 1-based page) entries plus the page count, memoized by file content"""
+    digest = file_sha256(pdf_path)
+    with _outline_lock:
+        outline = _outline_memo.get(digest)
+    if outline is None:
+        doc = fitz.open(str(pdf_path))
+        try:
+            outline = ([(level, title, page) for level, title, page, *_ in doc.get_toc(simple=True)], doc.page_count)
+        finally:
+            doc.close()
+        with _outline_lock:
+            _outline_memo[digest] = outline
+    return outline
+
+
+def locate_in_toc(toc: Sequence[Tuple[int, str, int]], titles: Sequence[str], page_count: int,
+                  threshold: int = SECTION_MATCH_THRESHOLD) -> Optional[SectionLocation]:
+    """Match the titles against outline entries; the section ends where the next entry of the same
+    or a higher level starts"""
+    choices = [normalize_title(title) for title in titles]
+    for position, (level, entry_title, page) in enumerate(toc):
+        match = process.extractOne(normalize_title(entry_title), choices, scorer=fuzz.ratio, score_cutoff=threshold)
+        if match is None or page < 1:
+            continue
+        last_page, next_title = page_count - 1, None
+        for next_level, candidate, next_page in toc[position + 1:]:
+            if next_level <= level and next_page >= 1:
+                # The next heading can share a page with the end of this section
+                last_page, next_title = max(page - 1, next_page - 1), candidate
+                break
+        return SectionLocation(entry_title, page - 1, last_page, "toc", match[1], next_title)
+    return None
+
+
+def _candidate_lines(page_text: str, keywords: Sequence[str], min_length: int, max_length: int):
+    for line in page_text.split("\n"):
+        line = line.strip()
+        if not (min_length <= len(line) <= max_length) or TOC_LEADER.search(line):
+            continue
+        lowered = line.lower()
+        if any(keyword in lowered for keyword in keywords):
+            yield line
+
+
+def locate_in_pages(page_texts: Sequence[str], titles: Sequence[str],
+                    threshold: int = SECTION_MATCH_THRESHOLD) -> Optional[SectionLocation]:
+    """Scan page text for the heading. Only lines of a plausible length that contain a word of the
+    title are scored, and rapidfuzz stops scoring a line as soon as it cannot reach the threshold.
+    The section runs until the next heading with a different chapter number"""
+    choices = [normalize_title(title) for title in titles]
+    keywords = sorted({word for choice in choices for word in choice.split() if len(word) > 3})
+    min_length = min(len(choice) for choice in choices) // 2
+    max_length = max(len(choice) for choice in choices) * 2 + 20
+
+    for page_number, page_text in enumerate(page_texts):
+        for line in _candidate_lines(page_text, keywords, min_length, max_length):
+            match = process.extractOne(normalize_title(line), choices, scorer=fuzz.ratio, score_cutoff=threshold)
+            if match is None:
+                continue
+            last_page, next_title = _section_end(page_texts, page_number, line)
+            return SectionLocation(line, page_number, last_page, "text", match[1], next_title)
+    return None
+
+
+def _section_end(page_texts: Sequence[str], first_page: int, heading: str) -> Tuple[int, Optional[str]]:
+    """Last page of a section whose heading is numbered (e.g. "Chapter 6 - ..." or "3.2 ..."):
+    the page where a heading numbered past it appears. Unnumbered sections run to the end"""
+    number = HEADING_NUMBER.match(heading)
+    if number is None:
+        return len(page_texts) - 1, None
+    chapter = int(number.group(1))
+    next_heading = re.compile(rf"^\s*(?:chapter\s+)?{chapter + 1}(?:\.1)?\b\s*[-:.]?\s+[A-Z]", re.IGNORECASE | re.MULTILINE)
+    for page_number in range(first_page + 1, len(page_texts)):
+        found = next_heading.search(page_texts[page_number])
+        if found:
+            return page_number, page_texts[page_number][found.start():].split("\n", 1)[0].strip()
+    return len(page_texts) - 1, None
+
+
+def locate_section(pdf_path: str, titles: Sequence[str],
+                   threshold: int = SECTION_MATCH_THRESHOLD) -> Optional[SectionLocation]:
+    """Find a section by the PDF outline, falling back to scanning the page text"""
+    try:
+        toc, page_count = get_outline(pdf_path)
+    except Exception as e:
+        logger.warning(f"Could not read the outline of {pdf_path}: {str(e)}")
+        toc, page_count = [], 0
+    if toc:
+        location = locate_in_toc(toc, titles, page_count, threshold)
+        if location is not None:
+            return location
+    return locate_in_pages(get_page_texts(pdf_path), titles, threshold)
+
+
+def extract_section_text(pdf_path: str, location: SectionLocation) -> str:
+    """Text of the section's pages, trimmed to start at its heading and stop at the next one"""
+    pages = get_page_range_texts(pdf_path, location.first_page, location.last_page)
+    text = "\n".join(pages)
+
+    start = _find_heading(text, location.title)
+    if start is not None:
+        text = text[start:]
+    if location.next_title:
+        end = _find_heading(text, location.next_title, skip_first_line=True)
+        if end is not None:
+            text = text[:end]
+    return text.strip()
+
+
+def _find_heading(text: str, title: str, skip_first_line: bool = False) -> Optional[int]:
+    """Offset of the line that best matches a heading, or None. Headings whose number sits on
+    its own line ("3.3" / "Resolved PARs") are matched by joining the line with the next one"""
+    wanted = normalize_title(title)
+    lines = text.split("\n")
+    offset = 0
+    for index, line in enumerate(lines):
+        if not (skip_first_line and index == 0) and line.strip() and not TOC_LEADER.search(line):
+            candidates = [line]
+            if index + 1 < len(lines):
+                candidates.append(f"{line} {lines[index + 1]}")
+            if any(fuzz.ratio(normalize_title(candidate), wanted, score_cutoff=SECTION_MATCH_THRESHOLD)
+                   for candidate in candidates):
+                return offset
+        offset += len(line) + 1
+    return None
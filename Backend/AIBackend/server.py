@@ -1,35 +1,51 @@
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 import os
 from typing import List, Dict, Any, Optional
 import shutil
 from pathlib import Path
 from datetime import datetime
 from urllib.parse import unquote
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
-from chat_utils import setup_conversation_chain, get_conversation_response
 import logging
-from metadata_extraction import process_pdf, create_excel_output
 import json
 import asyncio
-from services.version_compatibility_service import process_migration, generate_migration_excel
-import pandas as pd
-from io import BytesIO
-from services.scn_service import process_scn_data
-from scn_accumulation import process_scn_changes, SCNResult
-from services.chat_service import process_chat_request
-from services.metadata_service import process_metadata_request
-from services.version_service import process_version_request
+from pdf_cache import get_cache_stats as get_pdf_cache_stats
+from llm_cache import get_llm_cache
+from services.job_service import job_manager
+from executors import run_blocking, executor_layer
+from session_memory import session_store
+from warmup import warmup, WARMUP_ON_STARTUP
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
 
+def build_conversation_chain():
+    from chat_utils import setup_conversation_chain
+    return setup_conversation_chain()
+
+# Heavy modules and the chat chain load on first use, or in the background once the server is up
+conversation_chain = warmup.register("chat_chain", build_conversation_chain)
+version_compatibility = warmup.module("version_compatibility", "services.version_compatibility_service")
+bulk_migration = warmup.module("bulk_migration", "services.bulk_migration_service")
+scn_accumulation = warmup.module("scn_accumulation", "scn_accumulation")
+metadata_extraction = warmup.module("metadata_extraction", "metadata_extraction")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ON_STARTUP:
+        warmup.start_all()
+    yield
+    # Stop the SCN worker processes (and their JVMs) if any request started them
+    if scn_accumulation.ready:
+        scn_accumulation.get().shutdown_pools()
+
+app = FastAPI(lifespan=lifespan)
 
-conversation_chain = setup_conversation_chain()
 
 app.add_middleware(
     CORSMiddleware,
@@ -132,6 +148,10 @@ async def delete_pdf(user_email: str, filename: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def save_upload(pdf: UploadFile, file_path: Path) -> None:
+    with file_path.open("wb") as buffer:
+        shutil.copyfileobj(pdf.file, buffer)
+
 @app.post("/upload-pdf/")
 async def upload_pdf(file: List[UploadFile] = File(...), userEmail: str = Form(...)):
     try:
@@ -147,8 +167,7 @@ async def upload_pdf(file: List[UploadFile] = File(...), userEmail: str = Form(.
                 raise HTTPException(status_code=400, detail=f"{pdf.filename} is not a PDF file")
             
             file_path = user_pdf_dir / pdf.filename
-            with file_path.open("wb") as buffer:
-                shutil.copyfileobj(pdf.file, buffer)
+            await run_blocking("upload_pdf", save_upload, pdf, file_path)
             uploaded_files.append(pdf.filename)
 
         return {"message": "Files uploaded successfully", "files": uploaded_files}
@@ -156,50 +175,38 @@ async def upload_pdf(file: List[UploadFile] = File(...), userEmail: str = Form(.
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/extract-metadata/")
-async def extract_metadata(userEmail: str = Form(...)):
-    try:
-      
-        user_pdf_dir = Path("pdfs") / userEmail
-        user_output_dir = Path("outputs") / userEmail
-        user_output_dir.mkdir(parents=True, exist_ok=True)
+def submit_metadata_job(userEmail: str):
+    """Validate the user's PDF folder and queue a background extraction job."""
+    user_pdf_dir = Path("pdfs") / userEmail
+    user_output_dir = Path("outputs") / userEmail
+    user_output_dir.mkdir(parents=True, exist_ok=True)
 
-        if not user_pdf_dir.exists():
-            raise HTTPException(status_code=404, detail="No PDFs found for processing")
+    if not user_pdf_dir.exists():
+        raise HTTPException(status_code=404, detail="No PDFs found for processing")
 
-        output_file = user_output_dir / "extracted_metadata.xlsx"
+    output_file = user_output_dir / "extracted_metadata.xlsx"
+    pdf_files = list(user_pdf_dir.glob("*.pdf"))
+    
+    if not pdf_files:
+        raise HTTPException(status_code=404, detail="No PDF files found in directory")
 
-       
-        metadata_list = []
-        pdf_files = list(user_pdf_dir.glob("*.pdf"))
-        
-        if not pdf_files:
-            raise HTTPException(status_code=404, detail="No PDF files found in directory")
+    return job_manager.submit_metadata_extraction(userEmail, pdf_files, output_file)
 
-      
-        for pdf_path in pdf_files:
-            try:
-                result = process_pdf(pdf_path)
-                if result:
-                    metadata_list.append(result)
-            except Exception as e:
-                logger.error(f"Error processing {pdf_path}: {str(e)}")
-                continue
+@app.post("/extract-metadata/")
+async def extract_metadata(userEmail: str = Form(...)):
+    try:
+        job = submit_metadata_job(userEmail)
 
-        if not metadata_list:
-            raise HTTPException(status_code=404, detail="No metadata could be extracted from PDFs")
+        # Wait for the job without blocking the event loop
+        await asyncio.wrap_future(job.future)
 
-       
-        try:
-            create_excel_output(metadata_list, str(output_file))
-        except Exception as e:
-            logger.error(f"Error creating Excel file: {str(e)}")
-            raise HTTPException(status_code=500, detail="Failed to create Excel file")
+        if job.status == "failed":
+            raise HTTPException(status_code=404 if not job.metadata else 500, detail=job.error)
 
         return {
             "message": "Metadata extraction completed",
-            "output_file": str(output_file),
-            "metadata": metadata_list
+            "output_file": str(job.output_file),
+            "metadata": job.metadata
         }
 
     except HTTPException as he:
@@ -208,6 +215,31 @@ async def extract_metadata(userEmail: str = Form(...)):
         logger.error(f"Error in metadata extraction: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/extract-metadata/jobs", status_code=202)
+async def create_metadata_job(userEmail: str = Form(...)):
+    """Queue metadata extraction and return immediately with a job ID to poll."""
+    try:
+        job = submit_metadata_job(userEmail)
+        return {
+            "message": "Metadata extraction queued",
+            "job_id": job.job_id,
+            "status": job.status,
+            "status_url": f"/jobs/{job.job_id}"
+        }
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error queueing metadata extraction: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Report the status and per-file progress of a background job."""
+    job = job_manager.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
 @app.get("/download-metadata/{userEmail}")
 async def download_metadata(userEmail: str):
     try:
@@ -255,10 +287,12 @@ async def list_pdfs(userEmail: str):
 
 class ChatRequest(BaseModel):
     question: str
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     answer: str
     sources: List[Dict[str, str]]
+    session_id: Optional[str] = None
 
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
@@ -269,14 +303,19 @@ async def chat_endpoint(request: ChatRequest):
         if not request.question.strip():
             raise HTTPException(status_code=400, detail="Question cannot be empty")
             
-        response = get_conversation_response(
-            conversation_chain=conversation_chain,
-            question=request.question
-        )
+        chain = await conversation_chain.aget()
+        from chat_utils import aget_conversation_response
+        async with executor_layer.limit("chat"):
+            response = await aget_conversation_response(
+                conversation_chain=chain,
+                question=request.question,
+                session_id=request.session_id
+            )
         
         return ChatResponse(
             answer=response["answer"],
-            sources=response["sources"]
+            sources=response["sources"],
+            session_id=response["session_id"]
         )
         
     except Exception as e:
@@ -284,6 +323,49 @@ async def chat_endpoint(request: ChatRequest):
             status_code=500,
             detail=str(e))
 
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Stream the chat answer as Server-Sent Events: one "token" event per chunk of the
+    answer, then a final "sources" event with the full answer and source documents.
+    """
+    if not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+
+    async def event_stream():
+        try:
+            chain = await conversation_chain.aget()
+            from chat_utils import astream_conversation_response
+            async with executor_layer.limit("chat"):
+                async for event in astream_conversation_response(
+                    chain, request.question, request.session_id
+                ):
+                    yield format_stream_event(event, "sse")
+        except Exception as e:
+            logger.error(f"Error streaming chat response: {str(e)}")
+            yield format_stream_event({"event": "error", "detail": str(e)}, "sse")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/chat/reindex")
+async def reindex_chat_documents(include_user_pdfs: Optional[bool] = None):
+    """Embed only new or changed knowledge-base chunks and drop vectors of removed files."""
+    try:
+        await conversation_chain.aget()
+        from chat_utils import reindex_knowledge_base
+        kwargs = {} if include_user_pdfs is None else {"include_user_pdfs": include_user_pdfs}
+        summary = await run_blocking("reindex", reindex_knowledge_base, **kwargs)
+        return {"message": "Knowledge base re-indexed", **summary}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/api/chat/sessions/{session_id}")
+async def delete_chat_session(session_id: str):
+    """Forget a chat session's history."""
+    if not session_store.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"message": f"Session {session_id} deleted"}
+
 @app.post("/api/process_migration")
 async def process_migration_endpoint(data: Dict[Any, Any]):
     try:
@@ -295,7 +377,10 @@ async def process_migration_endpoint(data: Dict[Any, Any]):
             raise HTTPException(status_code=400, detail="Missing required fields")
 
         # Process migration using the version compatibility service
-        recommended_versions = process_migration(
+        service = await version_compatibility.aget()
+        recommended_versions = await run_blocking(
+            "process_migration",
+            service.process_migration,
             installed_source=installed_source,
             installed_versions=source_details,
             target_version=target_source
@@ -317,7 +402,10 @@ async def download_migration_results(data: Dict[Any, Any]):
             raise HTTPException(status_code=400, detail="Missing required fields")
 
         # Generate Excel file using the version compatibility service
-        excel_bytes = generate_migration_excel(
+        service = await version_compatibility.aget()
+        excel_bytes = await run_blocking(
+            "download_results",
+            service.generate_migration_excel,
             installed_source=installed_source,
             installed_versions=source_details,
             target_version=target_source
@@ -335,6 +423,83 @@ async def download_migration_results(data: Dict[Any, Any]):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/migration/path")
+async def get_upgrade_path(source: str, target: str,
+                           strategy: str = Query("shortest", pattern="^(shortest|least_hardware_change)$")):
+    """
+    Multi-hop upgrade path between two releases (e.g. R510 -> R520.1 -> R530.1), either with the
+    fewest hops or with the fewest hardware models dropped along the way.
+    """
+    try:
+        service = await version_compatibility.aget()
+        return service.find_upgrade_path(source, target, strategy)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def bulk_migration_response(service, sites: List[Dict[str, Any]], output_format: str):
+    """Plan all sites and return the result as a workbook, a streamed CSV or JSON."""
+    if not sites:
+        raise HTTPException(status_code=400, detail="No site configurations provided")
+
+    result = await run_blocking("migration_batch", service.plan_bulk_migration, sites)
+    stats = result.stats()
+    logger.info(f"Planned {stats['sites']} sites ({stats['unique_configurations']} unique) "
+                f"at {stats['sites_per_second']} sites/s")
+    headers = {
+        "X-Sites": str(stats["sites"]),
+        "X-Unique-Configurations": str(stats["unique_configurations"]),
+        "X-Sites-Per-Second": str(stats["sites_per_second"])
+    }
+
+    if output_format == "json":
+        return JSONResponse(content=result.to_dict(), headers=headers)
+    if output_format == "csv":
+        headers["Content-Disposition"] = "attachment; filename=migration_plan.csv"
+        return StreamingResponse(service.iter_bulk_migration_csv(result), media_type="text/csv", headers=headers)
+
+    excel_bytes = await run_blocking("migration_batch", service.generate_bulk_migration_excel, result)
+    headers["Content-Disposition"] = "attachment; filename=migration_plan.xlsx"
+    return Response(
+        content=excel_bytes.getvalue(),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers=headers
+    )
+
+@app.post("/api/migration/batch")
+async def bulk_migration_upload(file: UploadFile = File(...), format: str = Query("xlsx", pattern="^(xlsx|csv|json)$")):
+    """
+    Plan migrations for many sites from a CSV/XLSX (one row per site) or JSON upload.
+    Identical (source, target, components) combinations are resolved once.
+    """
+    try:
+        service = await bulk_migration.aget()
+        content = await file.read()
+        try:
+            sites = service.parse_site_configurations(content, file.filename or "")
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Could not read site configurations: {str(e)}")
+        return await bulk_migration_response(service, sites, format)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error in bulk migration: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/migration/batch/json")
+async def bulk_migration_json(sites: List[Dict[str, Any]], format: str = Query("json", pattern="^(xlsx|csv|json)$")):
+    """Plan migrations for a JSON array of site configurations."""
+    try:
+        service = await bulk_migration.aget()
+        site_configurations = [service.site_from_record(site, position) for position, site in enumerate(sites, 1)]
+        return await bulk_migration_response(service, site_configurations, format)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error in bulk migration: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 class SCNRequest(BaseModel):
     old_version: str
     new_version: str
@@ -354,7 +519,10 @@ async def process_scn(request: SCNRequest):
     Returns features, fixed issues, and known issues found in the SCN documents.
     """
     try:
-        result = process_scn_changes(
+        scn = await scn_accumulation.aget()
+        result = await run_blocking(
+            "scn_process",
+            scn.process_scn_changes,
             request.old_version,
             request.new_version,
             request.include_features,
@@ -374,20 +542,78 @@ async def process_scn(request: SCNRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def format_stream_event(event: Dict[str, Any], stream_format: str) -> str:
+    payload = json.dumps(event, default=str)
+    if stream_format == "sse":
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+@app.post("/api/scn/process/stream")
+async def process_scn_stream(request: SCNRequest, format: str = Query("ndjson", pattern="^(ndjson|sse)$")):
+    """
+    Stream SCN changes between two versions as NDJSON (default) or Server-Sent Events.
+    Each release's features and issue rows are sent as soon as that release is processed.
+    """
+    scn = await scn_accumulation.aget()
+    events = scn.iter_scn_changes(
+        request.old_version,
+        request.new_version,
+        request.include_features,
+        request.include_issues
+    )
+
+    async def event_stream():
+        try:
+            while True:
+                # Each step of the generator does blocking PDF/LLM work, so pull it off the event loop
+                event = await run_blocking("scn_process", next, events, None)
+                if event is None:
+                    break
+                yield format_stream_event(event, format)
+        except Exception as e:
+            logger.error(f"Error streaming SCN changes: {str(e)}")
+            yield format_stream_event({"event": "error", "detail": str(e)}, format)
+        finally:
+            try:
+                events.close()
+            except ValueError:
+                # Still running in a worker after a client disconnect; it finishes on its own
+                pass
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(event_stream(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/scn/precompute")
+async def precompute_scn(force: bool = Query(False)):
+    """
+    Extract features and issues of every SCN release into the precomputed store, so that
+    /api/scn/process range queries are served from it. Unchanged releases are skipped.
+    """
+    try:
+        scn = await scn_accumulation.aget()
+        built = await run_blocking("scn_precompute", scn.precompute_releases, force)
+        from scn_store import get_scn_store
+        return {"releases": built, "store": get_scn_store().stats()}
+    except Exception as e:
+        logger.error(f"Error precomputing SCN releases: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/scn/files")
 async def get_scn_files():
-    """Get list of available SCN files"""
+    """Get list of available SCN files with their indexed structure"""
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        features_dir = os.path.join(script_dir, "data", "For_NewFeatures")
-        issues_dir = os.path.join(script_dir, "data", "For_IssuesFixed_KnownIssues")
-        
-        features_files = [f.replace(".pdf", "") for f in os.listdir(features_dir) if f.endswith('.pdf')]
-        issues_files = [f.replace(".pdf", "") for f in os.listdir(issues_dir) if f.endswith('.pdf')]
-        
+        # Only new or changed PDFs are parsed; otherwise this is a stat per file
+        from scn_index import get_scn_index
+        index = get_scn_index()
+        await run_blocking("scn_index", index.refresh)
+
         return {
-            "features_files": sorted(features_files),
-            "issues_files": sorted(issues_files)
+            "features_files": index.releases("features"),
+            "issues_files": index.releases("issues"),
+            "documents": {
+                "features": index.summary("features"),
+                "issues": index.summary("issues")
+            }
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -423,6 +649,43 @@ async def download_scn_file(file_path: str):
         logger.error(f"Error downloading file: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/metrics/executors")
+async def get_executor_metrics():
+    """Get per-endpoint queue depth, wait time and run time for blocking work"""
+    return executor_layer.metrics()
+
+@app.get("/api/metrics/gemini")
+async def get_gemini_metrics():
+    """Get request, retry, token and concurrency counters for the shared Gemini client"""
+    from gemini_client import get_gemini_client
+    return get_gemini_client().stats()
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Get hit/miss counters for the shared caches"""
+    try:
+        return {
+            "pdf_text": get_pdf_cache_stats(),
+            "llm_responses": get_llm_cache().stats(),
+            "chat_sessions": session_store.stats(),
+            **chat_cache_stats()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def chat_cache_stats() -> Dict[str, Any]:
+    # Don't load the chat stack just to report on it
+    if not conversation_chain.ready:
+        return {"embeddings": {}, "chat_answers": {}}
+    from chat_utils import get_embedding_stats, get_answer_cache_stats
+    return {"embeddings": get_embedding_stats(), "chat_answers": get_answer_cache_stats()}
+
+@app.get("/api/ready")
+async def readiness():
+    """Report whether the chat chain and deferred modules have finished loading (503 until they have)"""
+    status = warmup.readiness()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=5001)
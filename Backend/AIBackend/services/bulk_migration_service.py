@@ -0,0 +1,221 @@
+import io
+import csv
+import json
+import time
+from typing import Dict, List, Any, Iterator, Tuple
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.styles import PatternFill, Font
+from services.version_compatibility_service import process_migration
+
+# Column names (case- and spacing-insensitive) that describe the site rather than a component
+SITE_COLUMNS = ("site", "site_id", "site_name")
+SOURCE_COLUMNS = ("installed_source", "source")
+TARGET_COLUMNS = ("target_source", "target", "target_version")
+
+
+def _normalize_column(name: Any) -> str:
+    return "_".join(str(name).strip().lower().split())
+
+
+def _clean_value(value: Any) -> str:
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ""
+    return str(value).strip()
+
+
+def site_from_record(record: Dict[str, Any], position: int) -> Dict[str, Any]:
+    """Turn one input row/object into {site, installed_source, target_source, source_details}"""
+    site, installed_source, target_source = None, None, None
+    details = dict(record.get("source_details") or {})
+    for key, value in record.items():
+        if key == "source_details":
+            continue
+        column = _normalize_column(key)
+        if column in SITE_COLUMNS:
+            site = _clean_value(value)
+        elif column in SOURCE_COLUMNS:
+            installed_source = _clean_value(value)
+        elif column in TARGET_COLUMNS:
+            target_source = _clean_value(value)
+        else:
+            details[str(key).strip()] = value
+    return {
+        "site": site or f"site-{position}",
+        "installed_source": installed_source or "",
+        "target_source": target_source or "",
+        "source_details": {software: _clean_value(version) for software, version in details.items()}
+    }
+
+
+def parse_site_configurations(content: bytes, filename: str = "") -> List[Dict[str, Any]]:
+    """Read site configurations from a CSV/XLSX upload (one row per site) or a JSON array"""
+    name = filename.lower()
+    if name.endswith((".xlsx", ".xls")):
+        records = pd.read_excel(io.BytesIO(content), dtype=str).to_dict("records")
+    elif name.endswith(".csv"):
+        records = pd.read_csv(io.BytesIO(content), dtype=str, keep_default_na=False).to_dict("records")
+    else:
+        records = json.loads(content.decode("utf-8-sig"))
+        if isinstance(records, dict):
+            records = records.get("sites", [])
+        if not isinstance(records, list):
+            raise ValueError("Expected a JSON array of site configurations")
+    return [site_from_record(record, position) for position, record in enumerate(records, 1)]
+
+
+def configuration_key(site: Dict[str, Any]) -> Tuple[str, str, Tuple[Tuple[str, str], ...]]:
+    """Sites with the same source, target and installed components share one resolution"""
+    return (
+        site["installed_source"],
+        site["target_source"],
+        tuple(sorted(site["source_details"].items()))
+    )
+
+
+class BulkMigrationResult:
+    def __init__(self):
+        self.sites: List[Dict[str, Any]] = []
+        self.configurations: List[Dict[str, Any]] = []
+        self.elapsed_seconds: float = 0.0
+
+    @property
+    def failed_sites(self) -> int:
+        return sum(1 for site in self.sites if site["error"])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sites": len(self.sites),
+            "unique_configurations": len(self.configurations),
+            "failed_sites": self.failed_sites,
+            "elapsed_seconds": round(self.elapsed_seconds, 4),
+            "sites_per_second": round(len(self.sites) / self.elapsed_seconds, 2) if self.elapsed_seconds else None
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"stats": self.stats(), "sites": self.sites}
+
+
+def plan_bulk_migration(sites: List[Dict[str, Any]]) -> BulkMigrationResult:
+    """Resolve every distinct (source, target, components) combination once and fan results out to sites"""
+    start = time.perf_counter()
+    result = BulkMigrationResult()
+    resolved: Dict[Tuple, Dict[str, Any]] = {}
+
+    for site in sites:
+        key = configuration_key(site)
+        configuration = resolved.get(key)
+        if configuration is None:
+            configuration = {
+                "configuration_id": len(resolved) + 1,
+                "installed_source": site["installed_source"],
+                "target_source": site["target_source"],
+                "source_details": site["source_details"],
+                "updates": {},
+                "error": None,
+                "sites": 0
+            }
+            try:
+                if not site["target_source"]:
+                    raise ValueError("Missing target_source")
+                configuration["updates"] = process_migration(
+                    installed_source=site["installed_source"],
+                    installed_versions=site["source_details"],
+                    target_version=site["target_source"]
+                )
+            except Exception as e:
+                configuration["error"] = str(e)
+            resolved[key] = configuration
+            result.configurations.append(configuration)
+
+        configuration["sites"] += 1
+        result.sites.append({
+            "site": site["site"],
+            "installed_source": site["installed_source"],
+            "target_source": site["target_source"],
+            "configuration_id": configuration["configuration_id"],
+            "source_details": site["source_details"],
+            "updates": configuration["updates"],
+            "error": configuration["error"]
+        })
+
+    result.elapsed_seconds = time.perf_counter() - start
+    return result
+
+
+def _site_rows(site: Dict[str, Any]) -> Iterator[List[str]]:
+    if site["error"]:
+        yield [site["site"], site["installed_source"], site["target_source"], "", "", "", site["error"]]
+        return
+    for software, installed in site["source_details"].items():
+        yield [site["site"], site["installed_source"], site["target_source"], software, installed,
+               site["updates"].get(software, installed), ""]
+
+
+ROW_HEADER = ["Site", "Installed Source", "Target Source", "Installed Software", "Installed Version",
+              "Recommended Version", "Error"]
+
+
+def iter_bulk_migration_csv(result: BulkMigrationResult) -> Iterator[str]:
+    """Stream the plan as CSV, one site at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return text
+
+    writer.writerow(ROW_HEADER)
+    yield flush()
+    for site in result.sites:
+        for row in _site_rows(site):
+            writer.writerow(row)
+        yield flush()
+
+
+def generate_bulk_migration_excel(result: BulkMigrationResult) -> io.BytesIO:
+    """One workbook with a summary, every site's recommendations and the distinct configurations"""
+    header_yellow = PatternFill(start_color='FFFF80', end_color='FFFF80', fill_type='solid')
+    light_green = PatternFill(start_color='85E085', end_color='85E085', fill_type='solid')
+    bold = Font(bold=True)
+
+    wb = Workbook()
+    summary = wb.active
+    summary.title = "Summary"
+    summary.append(["Metric", "Value"])
+    for metric, value in result.stats().items():
+        summary.append([metric.replace("_", " ").title(), value])
+
+    recommendations = wb.create_sheet("Recommendations")
+    recommendations.append(ROW_HEADER)
+    for site in result.sites:
+        for row in _site_rows(site):
+            recommendations.append(row)
+    for row in recommendations.iter_rows(min_row=2, min_col=6, max_col=6):
+        for cell in row:
+            cell.fill = light_green
+
+    configurations = wb.create_sheet("Configurations")
+    configurations.append(["Configuration", "Installed Source", "Target Source", "Sites", "Installed Software",
+                           "Installed Version", "Recommended Version", "Error"])
+    for configuration in result.configurations:
+        items = list(configuration["source_details"].items()) or [("", "")]
+        for software, installed in items:
+            configurations.append([
+                configuration["configuration_id"], configuration["installed_source"],
+                configuration["target_source"], configuration["sites"], software, installed,
+                configuration["updates"].get(software, installed) if not configuration["error"] else "",
+                configuration["error"] or ""
+            ])
+
+    for ws in (summary, recommendations, configurations):
+        for cell in ws[1]:
+            cell.fill = header_yellow
+            cell.font = bold
+
+    excel_bytes = io.BytesIO()
+    wb.save(excel_bytes)
+    excel_bytes.seek(0)
+    return excel_bytes
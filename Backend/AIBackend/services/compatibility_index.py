@@ -0,0 +1,137 @@
+import os
+import re
+import time
+import logging
+import threading
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple, Mapping
+from openpyxl import load_workbook
+
+logger = logging.getLogger(__name__)
+
+# The compatibility matrix compiled once into release -> component -> versions, and
+# recompiled in the background whenever the Excel file changes on disk
+COMPATIBILITY_WATCH_SECONDS = float(os.getenv("COMPATIBILITY_WATCH_SECONDS", "5"))
+RELEASE_COLUMN = "Experion PKS"
+
+CELL_SEPARATOR = re.compile(r"\n+")
+
+
+def split_cell(value) -> Tuple[str, ...]:
+    """Split a matrix cell ("v1\\n\\nv2...") into its versions, normalising non-breaking spaces"""
+    if value is None:
+        return ()
+    versions = []
+    for part in CELL_SEPARATOR.split(str(value).replace("\xa0", " ")):
+        version = " ".join(part.split())
+        if version and version not in versions:
+            versions.append(version)
+    return tuple(versions)
+
+
+class CompatibilityIndex:
+    """Immutable snapshot of the matrix with constant-time lookups"""
+
+    def __init__(self, releases: Dict[str, Dict[str, Tuple[str, ...]]], components: List[str],
+                 source_path: str = "", source_mtime_ns: int = 0):
+        self._releases = MappingProxyType({
+            release: MappingProxyType(dict(versions)) for release, versions in releases.items()
+        })
+        self.components = tuple(components)
+        self.source_path = source_path
+        self.source_mtime_ns = source_mtime_ns
+        self.compiled_at = time.time()
+
+    @property
+    def releases(self) -> Tuple[str, ...]:
+        return tuple(self._releases)
+
+    def release(self, release: str) -> Optional[Mapping[str, Tuple[str, ...]]]:
+        """Component -> supported versions for a release, or None if the release is unknown"""
+        return self._releases.get(release.strip())
+
+    def versions(self, release: str, component: str) -> Tuple[str, ...]:
+        supported = self.release(release)
+        if supported is None:
+            return ()
+        return supported.get(component, ())
+
+
+def compile_matrix(path: str, sheet_name: str = "Sheet1") -> CompatibilityIndex:
+    """Read the Excel matrix once and index it by release and component"""
+    mtime_ns = os.stat(path).st_mtime_ns
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else "" for cell in next(rows)]
+        if RELEASE_COLUMN not in header:
+            raise ValueError(f"Column '{RELEASE_COLUMN}' not found in {path}")
+        release_col = header.index(RELEASE_COLUMN)
+        components = [name for i, name in enumerate(header) if name and i != release_col]
+
+        releases = {}
+        for row in rows:
+            release = str(row[release_col]).strip() if row[release_col] is not None else ""
+            if not release:
+                continue
+            releases[release] = {
+                name: split_cell(row[i]) for i, name in enumerate(header)
+                if name and i != release_col and i < len(row)
+            }
+    finally:
+        workbook.close()
+    return CompatibilityIndex(releases, components, path, mtime_ns)
+
+
+class CompatibilityIndexWatcher:
+    """Holds the current index and swaps in a recompiled one when the file's mtime changes.
+
+    Readers only ever see a complete index: a new one is built on the side and published with a
+    single reference assignment. If the file is missing or fails to compile, the last good index stays.
+    """
+
+    def __init__(self, path: str, sheet_name: str = "Sheet1", interval: float = COMPATIBILITY_WATCH_SECONDS):
+        self.path = path
+        self.sheet_name = sheet_name
+        self.interval = interval
+        self._index: Optional[CompatibilityIndex] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[str] = None
+        self.reloads = 0
+
+    def reload(self, force: bool = False) -> Optional[CompatibilityIndex]:
+        with self._lock:
+            try:
+                mtime_ns = os.stat(self.path).st_mtime_ns
+                if force or self._index is None or mtime_ns != self._index.source_mtime_ns:
+                    index = compile_matrix(self.path, self.sheet_name)
+                    self._index = index
+                    self.error = None
+                    self.reloads += 1
+                    logger.info(f"Compiled compatibility matrix: {len(index.releases)} releases, "
+                                f"{len(index.components)} components from {self.path}")
+            except Exception as e:
+                if str(e) != self.error:
+                    logger.error(f"Error loading compatibility matrix from {self.path}: {str(e)}")
+                self.error = str(e)
+            return self._index
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            self.reload()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None and self.interval > 0:
+                self._thread = threading.Thread(target=self._watch, name="compatibility-watch", daemon=True)
+                self._thread.start()
+
+    def get(self) -> Optional[CompatibilityIndex]:
+        """Current index; compiles it on first use and starts the watcher"""
+        index = self._index
+        if index is None:
+            index = self.reload()
+            self.start()
+        return index
@@ -0,0 +1,128 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bounded pool for background metadata extraction; request handlers never run process_pdf themselves
+METADATA_JOB_WORKERS = int(os.getenv("METADATA_JOB_WORKERS", "2"))
+# Finished jobs are kept this long so clients can still poll their final status
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+
+class ExtractionJob:
+    def __init__(self, user_email: str, pdf_files: List[Path], output_file: Path):
+        self.job_id: str = uuid.uuid4().hex
+        self.user_email = user_email
+        self.output_file = output_file
+        self.status: str = "queued"
+        self.files: Dict[str, Dict[str, Any]] = {
+            pdf.name: {"status": "pending", "error": None} for pdf in pdf_files
+        }
+        self.pdf_files = pdf_files
+        self.metadata: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.created_at: float = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.future: Optional[Future] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        processed = sum(1 for f in self.files.values() if f["status"] in ("completed", "failed"))
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "progress": {
+                "processed": processed,
+                "total": len(self.files),
+                "percent": round(100 * processed / len(self.files), 1) if self.files else 100.0
+            },
+            "files": self.files,
+            "output_file": str(self.output_file) if self.status == "completed" else None,
+            "metadata": self.metadata if self.done else [],
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobManager:
+    """Runs metadata extraction jobs on a bounded worker pool and tracks their progress"""
+
+    def __init__(self, max_workers: int = METADATA_JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="metadata-job")
+        self._jobs: Dict[str, ExtractionJob] = {}
+        self._lock = threading.Lock()
+
+    def submit_metadata_extraction(self, user_email: str, pdf_files: List[Path], output_file: Path) -> ExtractionJob:
+        self._prune()
+        job = ExtractionJob(user_email, pdf_files, output_file)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        job.future = self._executor.submit(self._run_metadata_extraction, job)
+        logger.info(f"Queued metadata job {job.job_id} for {user_email} ({len(pdf_files)} files)")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[ExtractionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.done and job.finished_at and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def _run_metadata_extraction(self, job: ExtractionJob) -> ExtractionJob:
+        # Imported on the worker so the server does not load PyMuPDF and Gemini at startup
+        from metadata_extraction import process_pdf, create_excel_output
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            for pdf_path in job.pdf_files:
+                file_state = job.files[pdf_path.name]
+                file_state["status"] = "processing"
+                try:
+                    result = process_pdf(pdf_path)
+                    if result:
+                        job.metadata.append(result)
+                        file_state["status"] = "completed"
+                    else:
+                        file_state["status"] = "failed"
+                        file_state["error"] = "No metadata extracted"
+                except Exception as e:
+                    logger.error(f"Error processing {pdf_path}: {str(e)}")
+                    file_state["status"] = "failed"
+                    file_state["error"] = str(e)
+
+            if not job.metadata:
+                raise Exception("No metadata could be extracted from PDFs")
+
+            try:
+                create_excel_output(job.metadata, str(job.output_file))
+            except Exception as e:
+                logger.error(f"Error creating Excel file: {str(e)}")
+                raise Exception("Failed to create Excel file")
+
+            job.status = "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+        return job
+
+
+job_manager = JobManager()
@@ -0,0 +1,140 @@
+import re
+from typing import Dict, List, Optional, Tuple, Callable, Sequence
+
+# Local encoding of the migration rules the Gemini prompt used to apply on every request:
+#   - Domain Controller: always the latest Windows Server release
+#   - Server Hardware: always the latest supported model of the installed vendor
+#     (Dell PE R450/XR11 -> Dell R740XL)
+#   - Workstation Hardware: the installed model while it is still compatible, otherwise the
+#     latest model of the same family (Dell R7910XL -> Dell R7910XL)
+# A recommender returns None when a name cannot be parsed; only those components go to the LLM.
+
+DEFAULT_HARDWARE_VENDOR = "dell"
+
+WINDOWS_SERVER_PATTERN = re.compile(r"windows\s+server\s+(\d{4})(\s+r2)?", re.IGNORECASE)
+# Dell PowerEdge: R740 -> class 7, generation 4
+DELL_SERVER_PATTERN = re.compile(r"\b(?:pe\s*)?([rt])(\d)(\d)(\d)", re.IGNORECASE)
+# HPE ProLiant: DL360 Gen10 -> model 360, generation 10
+HPE_SERVER_PATTERN = re.compile(r"\bdl\s*(\d{3})\s*gen\s*(\d+)", re.IGNORECASE)
+# Dell Precision: R7910 -> family (7, R), generation 910
+DELL_WORKSTATION_PATTERN = re.compile(r"\b([rt])(\d)(\d{3})", re.IGNORECASE)
+
+
+def normalize_name(name: str) -> str:
+    """Case-, whitespace- and slash-spacing-insensitive form used to compare names"""
+    name = (name or "").replace("\xa0", " ").lower()
+    name = re.sub(r"\s*/\s*", "/", name)
+    return " ".join(name.split())
+
+
+def find_supported(name: str, supported: Sequence[str]) -> Optional[str]:
+    """The matrix entry that names the same product, if any"""
+    target = normalize_name(name)
+    if not target:
+        return None
+    for candidate in supported:
+        if normalize_name(candidate) == target:
+            return candidate
+    return None
+
+
+def hardware_vendor(name: str) -> Optional[str]:
+    normalized = normalize_name(name)
+    if not normalized:
+        return None
+    if normalized.startswith("dell"):
+        return "dell"
+    if normalized.startswith(("hpe", "hp ")) or HPE_SERVER_PATTERN.search(normalized):
+        return "hpe"
+    if normalized.startswith("hp"):
+        return "hp"
+    return None
+
+
+def windows_server_key(name: str) -> Optional[Tuple[int, int]]:
+    match = WINDOWS_SERVER_PATTERN.search(name or "")
+    if not match:
+        return None
+    return int(match.group(1)), 1 if match.group(2) else 0
+
+
+def server_hardware_key(name: str) -> Optional[Tuple[int, int]]:
+    """(class, generation) of the best model named in an entry like "Dell PET150/R250XE/R350XE Server" """
+    vendor = hardware_vendor(name)
+    if vendor == "dell":
+        keys = [(int(m.group(2)), int(m.group(3))) for m in DELL_SERVER_PATTERN.finditer(name)]
+    elif vendor == "hpe":
+        keys = [(int(m.group(1)), int(m.group(2))) for m in HPE_SERVER_PATTERN.finditer(name)]
+    else:
+        return None
+    return max(keys) if keys else None
+
+
+def workstation_key(name: str) -> Optional[Tuple[Tuple[int, str], int]]:
+    """((series, form factor), generation) for Dell Precision names like "Dell R7920XL Workstation" """
+    if hardware_vendor(name) != "dell":
+        return None
+    match = DELL_WORKSTATION_PATTERN.search(name)
+    if not match:
+        return None
+    return (int(match.group(2)), match.group(1).upper()), int(match.group(3))
+
+
+def latest(candidates: Sequence[str], key: Callable[[str], Optional[tuple]]) -> Optional[str]:
+    """Highest-ordered candidate; matrix order breaks ties. None if nothing parses"""
+    best, best_key = None, None
+    for candidate in candidates:
+        candidate_key = key(candidate)
+        if candidate_key is not None and (best_key is None or candidate_key > best_key):
+            best, best_key = candidate, candidate_key
+    return best
+
+
+def recommend_domain_controller(installed: str, supported: Sequence[str]) -> Optional[str]:
+    return latest(supported, windows_server_key)
+
+
+def recommend_server_hardware(installed: str, supported: Sequence[str]) -> Optional[str]:
+    vendor = hardware_vendor(installed) if installed and installed.strip() else DEFAULT_HARDWARE_VENDOR
+    if vendor is None:
+        return None
+    return latest([candidate for candidate in supported if hardware_vendor(candidate) == vendor], server_hardware_key)
+
+
+def recommend_workstation_hardware(installed: str, supported: Sequence[str]) -> Optional[str]:
+    compatible = find_supported(installed, supported)
+    if compatible is not None:
+        return compatible
+    if not installed or not installed.strip():
+        return latest(supported, workstation_key)
+    installed_key = workstation_key(installed)
+    if installed_key is None:
+        return None
+    family = installed_key[0]
+    same_family = [candidate for candidate in supported
+                   if workstation_key(candidate) is not None and workstation_key(candidate)[0] == family]
+    return latest(same_family, workstation_key)
+
+
+RULES: Dict[str, Callable[[str, Sequence[str]], Optional[str]]] = {
+    "Domain Controller": recommend_domain_controller,
+    "Server Hardware": recommend_server_hardware,
+    "Workstation Hardware": recommend_workstation_hardware,
+}
+
+
+def recommend_versions(installed_versions: Dict[str, str],
+                       supported_versions: Dict[str, List[str]]) -> Tuple[Dict[str, str], List[str]]:
+    """Apply the rules to each component.
+
+    Returns (recommendations, ambiguous components); ambiguous ones are left for the LLM.
+    """
+    recommendations = {}
+    ambiguous = []
+    for component, rule in RULES.items():
+        recommendation = rule(installed_versions.get(component, ""), supported_versions.get(component, []))
+        if recommendation is None:
+            ambiguous.append(component)
+        else:
+            recommendations[component] = recommendation
+    return recommendations, ambiguous
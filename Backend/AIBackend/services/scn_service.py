@@ -1,15 +1,13 @@
 import os
 import re
-import fitz
 import pandas as pd
 from typing import Dict, List, Tuple, Any
-import google.generativeai as genai
 from dotenv import load_dotenv
 from scn_accumulation import process_scn_changes
+from pdf_cache import get_page_texts
+from llm_cache import cached_generate_content
 
 load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=api_key)
 
 def get_intermediate_upgrades(old_upgrade: str, new_upgrade: str, features_dir: str) -> list[str]:
     """Get all upgrade versions between two versions"""
@@ -51,10 +49,7 @@ def get_intermediate_releases(old_release: str, new_release: str, fixed_known_is
 
 def extract_new_features_fuzzy(pdf_path: str) -> str:
     """Extract the "New Features and Enhancements" section using fuzzy search"""
-    doc = fitz.open(pdf_path)
-    full_text = ""
-    for page in doc:
-        full_text += page.get_text("text") + "\n"
+    full_text = "".join(page_text + "\n" for page_text in get_page_texts(pdf_path))
 
     section_titles = [
         "New Features and Enhancements",
@@ -83,15 +78,14 @@ def generate_feature_summary(text: str) -> str:
     Text to analyze:
     {text}
     """
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    response = model.generate_content(
+    return cached_generate_content(
+        'gemini-1.5-flash',
         prompt,
         generation_config={
             "temperature": 0.3,
             "max_output_tokens": 2000
         }
     )
-    return response.text
 
 def extract_fixed_known_issues(pdf_path: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """Extract fixed and known issues from a PDF"""
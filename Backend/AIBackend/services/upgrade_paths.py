@@ -0,0 +1,153 @@
+import os
+import re
+import heapq
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from services.compatibility_index import CompatibilityIndex
+from services.migration_rules import normalize_name
+
+logger = logging.getLogger(__name__)
+
+# Upgrade-path search over Experion releases. Nodes are releases, edges are direct upgrades
+# (to a newer release at most UPGRADE_MAX_LINE_STEP release lines ahead, e.g. R510 -> R520.x),
+# and each edge is weighted by the hops it adds and the hardware models it stops supporting.
+UPGRADE_MAX_LINE_STEP = int(os.getenv("UPGRADE_MAX_LINE_STEP", "1"))
+HARDWARE_COMPONENTS = ("Server Hardware", "Workstation Hardware")
+RELEASE_PATTERN = re.compile(r"^R(\d{2})(\d)(?:\.(\d+))?", re.IGNORECASE)
+
+# Primary and tie-breaking cost for each strategy
+STRATEGIES = {
+    "shortest": ("hops", "hardware_changes"),
+    "least_hardware_change": ("hardware_changes", "hops"),
+}
+
+
+def release_key(release: str) -> Optional[Tuple[int, int, int]]:
+    """R520.1 -> (52, 0, 1): release line, point release, update"""
+    match = RELEASE_PATTERN.match(release.strip())
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2)), int(match.group(3) or 0)
+
+
+class UpgradeGraph:
+    """Release graph with every pair's best path precomputed for each strategy"""
+
+    def __init__(self, index: CompatibilityIndex, max_line_step: int = UPGRADE_MAX_LINE_STEP):
+        self.index = index
+        self.max_line_step = max_line_step
+        self.releases = sorted((r for r in index.releases if release_key(r)), key=release_key)
+        self._hardware = {release: self._hardware_models(release) for release in self.releases}
+        self._paths: Dict[Tuple[str, str, str], Optional[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        for strategy in STRATEGIES:
+            for source in self.releases:
+                self._paths.update(self._search_from(source, strategy))
+        logger.info(f"Precomputed upgrade paths for {len(self.releases)} releases")
+
+    def _hardware_models(self, release: str) -> Dict[str, Dict[str, str]]:
+        """Component -> {normalized model name: name as written in the matrix}"""
+        supported = self.index.release(release) or {}
+        return {
+            component: {normalize_name(model): model for model in supported.get(component, ())}
+            for component in HARDWARE_COMPONENTS
+        }
+
+    def can_upgrade(self, source: str, target: str) -> bool:
+        source_key, target_key = release_key(source), release_key(target)
+        if source_key is None or target_key is None or target_key <= source_key:
+            return False
+        return target_key[0] - source_key[0] <= self.max_line_step
+
+    def dropped_hardware(self, source: str, target: str) -> Dict[str, List[str]]:
+        """Hardware models supported on the source release but no longer on the target"""
+        source_models = self._hardware.get(source)
+        if source_models is None:
+            # Release outside the matrix: nothing is known to be dropped
+            return {}
+        target_models = self._hardware.get(target) or {component: {} for component in HARDWARE_COMPONENTS}
+        dropped = {}
+        for component in HARDWARE_COMPONENTS:
+            models = [model for name, model in source_models[component].items() if name not in target_models[component]]
+            if models:
+                dropped[component] = models
+        return dropped
+
+    def _edge_cost(self, source: str, target: str) -> Dict[str, int]:
+        return {
+            "hops": 1,
+            "hardware_changes": sum(len(models) for models in self.dropped_hardware(source, target).values())
+        }
+
+    def _search_from(self, source: str, strategy: str) -> Dict[Tuple[str, str, str], Optional[Dict[str, Any]]]:
+        """Dijkstra from one release (which may be outside the matrix) to every matrix release"""
+        primary, secondary = STRATEGIES[strategy]
+        best = {source: ((0, 0), [source])}
+        queue = [((0, 0), source, [source])]
+        while queue:
+            cost, release, path = heapq.heappop(queue)
+            if best[release][0] < cost:
+                continue
+            for target in self.releases:
+                if not self.can_upgrade(release, target):
+                    continue
+                edge = self._edge_cost(release, target)
+                new_cost = (cost[0] + edge[primary], cost[1] + edge[secondary])
+                if target not in best or new_cost < best[target][0]:
+                    best[target] = (new_cost, path + [target])
+                    heapq.heappush(queue, (new_cost, target, path + [target]))
+
+        results = {}
+        for target in self.releases:
+            if target == source:
+                continue
+            results[(source, target, strategy)] = self._describe(best[target][1], strategy) if target in best else None
+        return results
+
+    def _describe(self, path: List[str], strategy: str) -> Dict[str, Any]:
+        steps = [
+            {"from": source, "to": target, "dropped_hardware": self.dropped_hardware(source, target)}
+            for source, target in zip(path, path[1:])
+        ]
+        return {
+            "strategy": strategy,
+            "path": path,
+            "hops": len(steps),
+            "hardware_changes": sum(len(models) for step in steps for models in step["dropped_hardware"].values()),
+            "steps": steps
+        }
+
+    def find_path(self, source: str, target: str, strategy: str = "shortest") -> Optional[Dict[str, Any]]:
+        """Best upgrade path, or None when the target cannot be reached"""
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}', expected one of {', '.join(STRATEGIES)}")
+        source, target = source.strip(), target.strip()
+        if source == target:
+            return self._describe([source], strategy)
+        key = (source, target, strategy)
+        with self._lock:
+            if key in self._paths:
+                return self._paths[key]
+        if release_key(source) is None or (target not in self.releases):
+            return None
+        # A source release outside the matrix (e.g. R510): search once and remember the answers
+        if source not in self.releases:
+            results = self._search_from(source, strategy)
+            with self._lock:
+                self._paths.update(results)
+            return results.get(key)
+        return None
+
+
+_graph: Optional[UpgradeGraph] = None
+_graph_lock = threading.Lock()
+
+
+def get_upgrade_graph(index: CompatibilityIndex) -> UpgradeGraph:
+    """Graph for the current matrix; rebuilt (and its paths recomputed) when the index is reloaded"""
+    global _graph
+    with _graph_lock:
+        if _graph is None or _graph.index is not index:
+            _graph = UpgradeGraph(index)
+        return _graph
@@ -2,19 +2,17 @@ import pandas as pd
 import os
 import json
 from dotenv import load_dotenv
-import google.generativeai as genai
 from io import BytesIO
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font
 from openpyxl.utils.dataframe import dataframe_to_rows
+from llm_cache import cached_generate_json
+from services.compatibility_index import CompatibilityIndexWatcher
+from services.migration_rules import recommend_versions
+from services.upgrade_paths import get_upgrade_graph, STRATEGIES
 
 # Load environment variables
 load_dotenv()
-API_KEY = os.getenv("GEMINI_API_KEY")
-
-# Configure Gemini API
-genai.configure(api_key=API_KEY)
-model = genai.GenerativeModel('gemini-1.5-flash')
 
 # Get the absolute path to the Excel file
 current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # This will be AIBackend directory
@@ -22,14 +20,15 @@ data_file_path = os.path.join(current_dir, "Compatibile_Versions.xlsx")
 
 print(f"Looking for Excel file at: {data_file_path}")  # Debug print
 
-# Load compatibility matrix
-try:
-    COMPATIBILITY_MATRIX = pd.read_excel(data_file_path, sheet_name="Sheet1")
+# Compatibility matrix, compiled once and reloaded whenever the Excel file changes
+compatibility_index = CompatibilityIndexWatcher(data_file_path, sheet_name="Sheet1")
+if compatibility_index.get() is not None:
     print("Successfully loaded compatibility matrix")  # Debug print
-except Exception as e:
-    print(f"Error loading compatibility matrix: {str(e)}")
+    # Precompute upgrade paths between every pair of releases
+    get_upgrade_graph(compatibility_index.get())
+else:
+    print(f"Error loading compatibility matrix: {compatibility_index.error}")
     print(f"Trying to load from: {data_file_path}")
-    COMPATIBILITY_MATRIX = None
 
 def get_latest_version(installed_versions_check, compatibility_matrix):
     """Get latest compatible versions using Gemini AI."""
@@ -57,9 +56,8 @@ def get_latest_version(installed_versions_check, compatibility_matrix):
     """
 
     try:
-        response = model.generate_content(prompt)
-        cleaned_response = response.text.strip().strip("```json").strip("```")
-        return json.loads(cleaned_response)
+        # Unparseable answers are re-asked by the client and never cached
+        return cached_generate_json('gemini-1.5-flash', prompt)
     except Exception as e:
         print(f"Error in Gemini API call: {str(e)}")
         # Fallback default values
@@ -74,12 +72,13 @@ def process_migration(installed_source: str, installed_versions: dict, target_ve
     recommended_versions = {}
     
     try:
-        if COMPATIBILITY_MATRIX is None:
+        index = compatibility_index.get()
+        if index is None:
             raise Exception("Compatibility matrix not loaded. Please ensure the Excel file exists in the AIBackend directory.")
             
-        supported_versions = COMPATIBILITY_MATRIX[COMPATIBILITY_MATRIX["Experion PKS"] == target_version]
+        supported_versions = index.release(target_version)
         
-        if supported_versions.empty:
+        if supported_versions is None:
             raise Exception(f"No compatibility data found for version {target_version}")
         
         installed_versions_check = {
@@ -90,16 +89,23 @@ def process_migration(installed_source: str, installed_versions: dict, target_ve
         
         compatibility_matrix_for_llm = {}
         for software in ["Domain Controller", "Server Hardware", "Workstation Hardware"]:
-            available_versions = supported_versions[software].dropna().tolist()
-            compatibility_matrix_for_llm[software] = available_versions
-        
-        # Get LLM recommendations
-        llm_recommendations = get_latest_version(installed_versions_check, compatibility_matrix_for_llm)
+            compatibility_matrix_for_llm[software] = list(supported_versions.get(software, ()))
+        
+        # Apply the migration rules locally; only names the rules cannot parse go to the LLM
+        rule_recommendations, ambiguous = recommend_versions(installed_versions_check, compatibility_matrix_for_llm)
+        if ambiguous:
+            print(f"Asking Gemini about ambiguous components: {', '.join(ambiguous)}")
+            llm_recommendations = get_latest_version(
+                {software: installed_versions_check[software] for software in ambiguous},
+                {software: compatibility_matrix_for_llm[software] for software in ambiguous}
+            )
+            for software in ambiguous:
+                rule_recommendations[software] = llm_recommendations.get(software, installed_versions_check[software])
         
         # Build final recommendations
         for software, version in installed_versions.items():
             if software in ["Domain Controller", "Server Hardware", "Workstation Hardware"]:
-                recommended_versions[software] = llm_recommendations[software]
+                recommended_versions[software] = rule_recommendations[software]
             else:
                 recommended_versions[software] = version
         
@@ -109,6 +115,18 @@ def process_migration(installed_source: str, installed_versions: dict, target_ve
         print(f"Error in process_migration: {str(e)}")
         raise Exception(f"Error processing migration: {str(e)}")
 
+def find_upgrade_path(installed_source: str, target_version: str, strategy: str = "shortest") -> dict:
+    """Multi-hop upgrade path between two Experion releases."""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}', expected one of {', '.join(STRATEGIES)}")
+    index = compatibility_index.get()
+    if index is None:
+        raise Exception("Compatibility matrix not loaded. Please ensure the Excel file exists in the AIBackend directory.")
+    path = get_upgrade_graph(index).find_path(installed_source, target_version, strategy)
+    if path is None:
+        raise LookupError(f"No upgrade path from {installed_source} to {target_version}")
+    return path
+
 def generate_migration_excel(installed_source: str, installed_versions: dict, target_version: str) -> BytesIO:
     """Generate Excel file with migration results."""
     try:
@@ -0,0 +1,116 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+
+logger = logging.getLogger(__name__)
+
+# Per-session chat history, bounded by a token budget so prompt size stays flat over time
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500"))
+CHAT_HISTORY_MAX_TURNS = int(os.getenv("CHAT_HISTORY_MAX_TURNS", "10"))
+CHAT_SESSION_IDLE_SECONDS = float(os.getenv("CHAT_SESSION_IDLE_SECONDS", "1800"))
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (~4 characters per token) so trimming needs no API call"""
+    return max(1, len(text) // 4)
+
+
+class SessionMemory:
+    """Sliding window of (question, answer) turns kept within a token budget"""
+
+    def __init__(self, token_budget: int = CHAT_HISTORY_TOKEN_BUDGET, max_turns: int = CHAT_HISTORY_MAX_TURNS):
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.turns: deque = deque()
+        self.tokens = 0
+        self.last_used = time.time()
+        self._lock = threading.Lock()
+
+    def history(self) -> List["BaseMessage"]:
+        # Deferred so the server can start without loading langchain
+        from langchain_core.messages import HumanMessage, AIMessage
+        with self._lock:
+            self.last_used = time.time()
+            messages = []
+            for question, answer, _ in self.turns:
+                messages.append(HumanMessage(content=question))
+                messages.append(AIMessage(content=answer))
+            return messages
+
+    def add_turn(self, question: str, answer: str) -> None:
+        turn_tokens = estimate_tokens(question) + estimate_tokens(answer)
+        with self._lock:
+            self.last_used = time.time()
+            self.turns.append((question, answer, turn_tokens))
+            self.tokens += turn_tokens
+            # Drop the oldest turns first; always keep the latest one
+            while len(self.turns) > 1 and (self.tokens > self.token_budget or len(self.turns) > self.max_turns):
+                _, _, dropped_tokens = self.turns.popleft()
+                self.tokens -= dropped_tokens
+
+    def clear(self) -> None:
+        with self._lock:
+            self.turns.clear()
+            self.tokens = 0
+
+
+class SessionMemoryStore:
+    """Session ID -> SessionMemory, evicting idle sessions and capping the session count"""
+
+    def __init__(self, idle_seconds: float = CHAT_SESSION_IDLE_SECONDS, max_sessions: int = CHAT_MAX_SESSIONS):
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, SessionMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
+
+    def get(self, session_id: Optional[str] = None) -> Tuple[str, SessionMemory]:
+        """Return (session_id, memory), starting a new session when the ID is missing or unknown"""
+        session_id = session_id or uuid.uuid4().hex
+        with self._lock:
+            self._evict_idle()
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                memory = SessionMemory()
+                self._sessions[session_id] = memory
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self._evicted += 1
+            self._sessions.move_to_end(session_id)
+            return session_id, memory
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _evict_idle(self) -> None:
+        cutoff = time.time() - self.idle_seconds
+        # Sessions are ordered by last access, so idle ones are at the front
+        while self._sessions:
+            session_id, memory = next(iter(self._sessions.items()))
+            if memory.last_used >= cutoff:
+                break
+            del self._sessions[session_id]
+            self._evicted += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._evict_idle()
+            return {
+                "sessions": len(self._sessions),
+                "evicted": self._evicted,
+                "token_budget": CHAT_HISTORY_TOKEN_BUDGET,
+                "max_turns": CHAT_HISTORY_MAX_TURNS,
+                "idle_seconds": self.idle_seconds
+            }
+
+
+session_store = SessionMemoryStore()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules under test are imported the way server.py imports them, from the AIBackend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
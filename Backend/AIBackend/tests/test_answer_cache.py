@@ -0,0 +1,19 @@
+from answer_cache import SemanticAnswerCache
+
+
+def test_exact_question_hits_without_embedding():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store("What is R520.2?", None, ["a", "b"], {"answer": "A release"})
+    assert cache.exact("  what is r520.2? ", ["b", "a"]) == {"answer": "A release"}
+    assert cache.exact("What is R520.2?", ["a"]) is None
+    assert cache.stats()["misses"] == 0
+
+
+def test_unembedded_questions_are_embedded_on_demand():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store("What is R520.2?", None, ["a"], {"answer": "A release"})
+    assert cache.lookup([1.0, 0.0], ["a"]) is None
+    assert cache.unembedded_questions(["a"]) == ["What is R520.2?"]
+    cache.set_embedding("What is R520.2?", ["a"], [1.0, 0.0])
+    assert cache.unembedded_questions(["a"]) == []
+    assert cache.lookup([0.99, 0.05], ["a"]) == {"answer": "A release"}
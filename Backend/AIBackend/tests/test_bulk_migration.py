@@ -0,0 +1,46 @@
+import csv
+import io
+from services import bulk_migration_service
+from services.bulk_migration_service import iter_bulk_migration_csv, parse_site_configurations, plan_bulk_migration
+
+
+def fake_migration(calls):
+    def process_migration(installed_source, installed_versions, target_version):
+        calls.append((installed_source, target_version))
+        if target_version == "R999":
+            raise Exception("No compatibility data found for version R999")
+        return {software: f"{version} (new)" for software, version in installed_versions.items()}
+    return process_migration
+
+
+def test_identical_sites_are_resolved_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(bulk_migration_service, "process_migration", fake_migration(calls))
+    sites = parse_site_configurations(b"""[
+        {"Site": "Plant A", "Installed Source": "R510", "Target": "R520.1", "Domain Controller": "Windows Server 2019"},
+        {"Site": "Plant B", "Installed Source": "R510", "Target": "R520.1", "Domain Controller": " Windows Server 2019 "},
+        {"Site": "Plant C", "Installed Source": "R511", "Target": "R520.1", "Domain Controller": "Windows Server 2019"}
+    ]""", "sites.json")
+    result = plan_bulk_migration(sites)
+    assert calls == [("R510", "R520.1"), ("R511", "R520.1")]
+    assert [site["configuration_id"] for site in result.sites] == [1, 1, 2]
+    assert result.sites[1]["updates"] == {"Domain Controller": "Windows Server 2019 (new)"}
+    assert result.stats()["unique_configurations"] == 2
+
+
+def test_failed_configurations_become_error_rows(monkeypatch):
+    monkeypatch.setattr(bulk_migration_service, "process_migration", fake_migration([]))
+    sites = parse_site_configurations(
+        b"site,installed_source,target_source,Domain Controller\n"
+        b"Plant A,R510,R999,Windows Server 2019\n"
+        b"Plant B,R510,,Windows Server 2019\n"
+        b"Plant C,R510,R520.1,Windows Server 2019\n", "sites.csv")
+    result = plan_bulk_migration(sites)
+    assert result.failed_sites == 2
+    assert "R999" in result.sites[0]["error"]
+    assert result.sites[1]["error"] == "Missing target_source"
+
+    rows = list(csv.reader(io.StringIO("".join(iter_bulk_migration_csv(result)))))
+    assert rows[1] == ["Plant A", "R510", "R999", "", "", "", result.sites[0]["error"]]
+    assert rows[3] == ["Plant C", "R510", "R520.1", "Domain Controller", "Windows Server 2019",
+                       "Windows Server 2019 (new)", ""]
@@ -0,0 +1,39 @@
+from openpyxl import Workbook
+from services.compatibility_index import CompatibilityIndexWatcher, compile_matrix, split_cell
+
+
+def write_matrix(path, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Sheet1"
+    sheet.append(["Experion PKS", "Domain Controller", "Server Hardware"])
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def test_split_cell_normalises_and_deduplicates():
+    assert split_cell("Windows Server\xa02019\n\nWindows  Server 2022\nWindows Server 2019") == (
+        "Windows Server 2019", "Windows Server 2022")
+    assert split_cell(None) == ()
+
+
+def test_compiled_lookups(tmp_path):
+    path = tmp_path / "matrix.xlsx"
+    write_matrix(path, [["R520.1", "Windows Server 2019\nWindows Server 2022", "Dell R740XL Server"],
+                        [None, "ignored", "ignored"]])
+    index = compile_matrix(str(path))
+    assert index.releases == ("R520.1",)
+    assert index.versions(" R520.1 ", "Domain Controller") == ("Windows Server 2019", "Windows Server 2022")
+    assert index.versions("R999", "Domain Controller") == ()
+    assert index.release("R999") is None
+
+
+def test_watcher_keeps_the_last_good_index(tmp_path):
+    path = tmp_path / "matrix.xlsx"
+    write_matrix(path, [["R520.1", "Windows Server 2022", "Dell R740XL Server"]])
+    watcher = CompatibilityIndexWatcher(str(path), interval=0)
+    first = watcher.get()
+    path.write_bytes(b"not a workbook")
+    assert watcher.reload(force=True) is first
+    assert watcher.error
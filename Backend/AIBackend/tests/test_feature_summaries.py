@@ -0,0 +1,20 @@
+from feature_summaries import parse_features
+from scn_patterns import heading_lines
+
+
+def test_heading_lines_skip_numbers_followed_by_digits():
+    lines = ["6.1 Redundant controllers", "6.2", "Faster displays", "6.3 2024 update", "Body text"]
+    assert list(heading_lines(lines)) == [(0, "6.1", "Redundant controllers"), (1, "6.2", "Faster displays")]
+
+
+def test_parse_features_without_outline():
+    text = "\n".join([
+        "6.1 Redundant controllers", "Controllers now fail over in under a second.",
+        "- 79 -",
+        "6.2", "Faster displays", "Displays load from a local cache.",
+    ])
+    features = parse_features(text)
+    assert [(feature.number, feature.title) for feature in features] == [
+        ("6.1", "Redundant controllers"), ("6.2", "Faster displays")]
+    assert features[0].body == "Controllers now fail over in under a second."
+    assert features[1].body == "Displays load from a local cache."
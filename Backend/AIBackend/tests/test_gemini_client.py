@@ -0,0 +1,26 @@
+from gemini_client import FakeGeminiBackend, GeminiClient, estimate_tokens, is_transient_error
+
+
+class StatusError(Exception):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def test_transient_errors_match_status_codes_only():
+    assert is_transient_error(StatusError("boom", code=503))
+    assert is_transient_error(Exception("503 The service is currently unavailable."))
+    assert is_transient_error(Exception("Server returned HTTP status 504"))
+    assert is_transient_error(Exception("Deadline Exceeded"))
+    assert not is_transient_error(ValueError("Table has 500 rows but expected 503"))
+    assert not is_transient_error(ValueError("PAR 1-G9E5004 not found"))
+
+
+def test_unused_reserved_tokens_are_refunded():
+    client = GeminiClient(FakeGeminiBackend(), tokens_per_minute=100000)
+    config = {"max_output_tokens": 4000}
+    before = client.tokens_bucket._tokens
+    client.generate("gemini-1.5-flash", "Summarize this feature.", config)
+    assert estimate_tokens("Summarize this feature.", config) > 1000
+    # Only the tokens actually used stay charged (plus a little refill while the call ran)
+    assert before - client.tokens_bucket._tokens < 100
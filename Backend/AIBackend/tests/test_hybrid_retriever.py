@@ -0,0 +1,65 @@
+from langchain_core.documents import Document
+from hybrid_retriever import BM25Index, HybridRetriever, contains_identifier, identifier_terms, prefetched_documents
+
+
+class RecordingVectorStore:
+    """Vector store stand-in that records whether it was searched"""
+
+    def __init__(self, results):
+        self.results = results
+        self.queries = []
+
+    def similarity_search(self, query, k=4):
+        self.queries.append(query)
+        return self.results[:k]
+
+
+def make_retriever(texts, vector_results=()):
+    index = BM25Index()
+    for position, text in enumerate(texts):
+        index.add(str(position), Document(page_content=text, id=str(position)))
+    store = RecordingVectorStore(list(vector_results))
+    return HybridRetriever(vector_store=store, bm25_index=index, k=2), store
+
+
+def test_identifier_terms_keep_only_full_identifiers():
+    assert identifier_terms("R520.2 TCU6") == {"r520.2_tcu6"}
+    assert identifier_terms("Is 1-G9ENCXT fixed in R511.3?") == {"1-g9encxt", "r511.3"}
+
+
+def test_contains_identifier_rejects_other_releases():
+    assert contains_identifier("Fixed in R520.2_TCU6.", "r520.2_tcu6")
+    assert contains_identifier("R520.2 TCU6 notes", "r520.2")
+    assert not contains_identifier("R520.1 TCU3 notes", "r520.2_tcu6")
+    assert not contains_identifier("R520.21 TCU6", "r520.2_tcu6")
+    assert not contains_identifier("R520.2 TCU61", "r520.2_tcu6")
+
+
+def test_exact_identifier_match_skips_vector_search():
+    retriever, store = make_retriever(["R520.2 TCU6 adds redundant controllers", "R511.3 release notes"])
+    docs = retriever.invoke("What changed in R520.2 TCU6?")
+    assert docs[0].page_content.startswith("R520.2 TCU6")
+    assert store.queries == []
+
+
+def test_near_miss_release_falls_through_to_fusion():
+    semantic = Document(page_content="Controller redundancy overview", id="semantic")
+    retriever, store = make_retriever(["R520.1 TCU3 adds redundant controllers", "R511.3 release notes"], [semantic])
+    docs = retriever.invoke("What changed in R520.2 TCU6?")
+    assert store.queries == ["What changed in R520.2 TCU6?"]
+    assert "semantic" in [doc.id for doc in docs]
+
+
+def test_every_identifier_must_be_present():
+    retriever, store = make_retriever(["PAR 1-G9ENCXT is fixed in R511.2", "PAR 1-G9ENCXT"])
+    retriever.invoke("Is 1-G9ENCXT fixed in R511.3?")
+    assert len(store.queries) == 1
+
+
+def test_prefetched_documents_skip_retrieval():
+    retriever, store = make_retriever(["Controller notes"], [Document(page_content="Overview", id="semantic")])
+    prefetched = [Document(page_content="Prefetched", id="p")]
+    with prefetched_documents("How do controllers fail over?", prefetched):
+        assert retriever.invoke("How do controllers fail over?") == prefetched
+        retriever.invoke("Another question")
+    assert store.queries == ["Another question"]
@@ -0,0 +1,22 @@
+from metadata_extraction import score_page, select_windows
+
+
+def test_windows_start_at_the_best_pages_and_keep_neighbours():
+    pages = ["Introduction", "PAR 1-ABC1234 fixed in R520.1", "Details of the fix", "Appendix", "Index"]
+    windows = select_windows(pages, window_chars=50, max_windows=2)
+    assert windows[0]["pages"] == [1, 2]
+    assert windows[0]["score"] == score_page(pages[1]) > 0
+    # Only two windows: the unscored pages after the best window are left out
+    assert [window["pages"] for window in windows[1:]] == [[0]]
+
+
+def test_pages_without_keywords_fall_back_to_document_order():
+    pages = ["Cover", "Contents", "Overview", "Glossary"]
+    windows = select_windows(pages, window_chars=16, max_windows=2)
+    assert [window["pages"] for window in windows] == [[0, 1], [2, 3]]
+    assert all(window["score"] == 0 for window in windows)
+
+
+def test_blank_pages_never_seed_a_window():
+    windows = select_windows(["", "   ", "R520.1 release notes"], window_chars=1000, max_windows=5)
+    assert [window["pages"] for window in windows] == [[0, 1, 2]]
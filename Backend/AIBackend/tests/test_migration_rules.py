@@ -0,0 +1,41 @@
+from services.migration_rules import recommend_versions
+
+SUPPORTED = {
+    "Domain Controller": ["Windows Server 2016", "Windows Server 2022", "Windows Server 2019"],
+    "Server Hardware": ["Dell R640 Server", "Dell R740XL Server", "HPE DL360 Gen10 Server"],
+    "Workstation Hardware": ["Dell R7910XL Workstation", "Dell R7920XL Workstation", "Dell T5820 Workstation"],
+}
+
+
+def test_prompt_examples():
+    recommendations, ambiguous = recommend_versions({
+        "Domain Controller": "Windows Server 2019",
+        "Server Hardware": "Dell PE R450 / XR11 Server",
+        "Workstation Hardware": "Dell R7910XL Workstation",
+    }, SUPPORTED)
+    assert ambiguous == []
+    assert recommendations == {
+        "Domain Controller": "Windows Server 2022",
+        "Server Hardware": "Dell R740XL Server",
+        "Workstation Hardware": "Dell R7910XL Workstation",
+    }
+
+
+def test_unsupported_workstation_moves_to_latest_of_its_family():
+    supported = dict(SUPPORTED, **{"Workstation Hardware": ["Dell R7920XL Workstation", "Dell T5820 Workstation"]})
+    recommendations, _ = recommend_versions({"Workstation Hardware": "Dell R7910XL Workstation"}, supported)
+    assert recommendations["Workstation Hardware"] == "Dell R7920XL Workstation"
+
+
+def test_server_hardware_stays_with_the_installed_vendor():
+    recommendations, _ = recommend_versions({"Server Hardware": "HPE DL380 Gen9 Server"}, SUPPORTED)
+    assert recommendations["Server Hardware"] == "HPE DL360 Gen10 Server"
+
+
+def test_unparseable_names_are_left_for_the_llm():
+    recommendations, ambiguous = recommend_versions({
+        "Server Hardware": "Lenovo ThinkSystem SR650",
+        "Workstation Hardware": "Lenovo ThinkStation P520",
+    }, SUPPORTED)
+    assert ambiguous == ["Server Hardware", "Workstation Hardware"]
+    assert recommendations == {"Domain Controller": "Windows Server 2022"}
@@ -0,0 +1,63 @@
+import pandas as pd
+from par_ledger import PARLedger, STATUS_FIXED, STATUS_OPEN, STATUS_REOPENED
+
+
+def fixed_table(*rows):
+    return pd.DataFrame([{"PAR": par, "Impact": "Low", "Subsystem": "Controller", "Description": text}
+                         for par, text in rows])
+
+
+def known_table(*rows):
+    return pd.DataFrame([{"PAR": par, "Impact": "Low", "Function": "Display", "Description": text}
+                         for par, text in rows])
+
+
+def statuses(ledger):
+    return {par: entry.status for par, entry in ledger.entries.items()}
+
+
+def test_known_then_fixed():
+    ledger = PARLedger()
+    _, new_known = ledger.add_release("R520.1", pd.DataFrame(), known_table(("1-AAA1111", "Hangs")))
+    new_fixed, _ = ledger.add_release("R520.2", fixed_table(("1-AAA1111", "Hang fixed")), pd.DataFrame())
+    entry = ledger.entries["1-AAA1111"]
+    assert len(new_known) == 1 and len(new_fixed) == 1
+    assert (entry.status, entry.first_seen, entry.fixed_in) == (STATUS_FIXED, "R520.1", "R520.2")
+    assert entry.description() == "Hang fixed"
+    assert ledger.known_issues().empty
+    assert list(ledger.fixed_issues()["Release"]) == ["R520.2"]
+
+
+def test_listed_again_as_known_is_not_new():
+    ledger = PARLedger()
+    ledger.add_release("R520.1", pd.DataFrame(), known_table(("1-AAA1111", "Hangs")))
+    _, new_known = ledger.add_release("R520.2", pd.DataFrame(), known_table(("1-AAA1111", "Hangs on restart")))
+    assert new_known.empty
+    assert statuses(ledger) == {"1-AAA1111": STATUS_OPEN}
+    assert ledger.entries["1-AAA1111"].last_seen == "R520.2"
+
+
+def test_fixed_and_known_in_one_release_counts_as_fixed():
+    ledger = PARLedger()
+    new_fixed, new_known = ledger.add_release("R520.1", fixed_table(("1-AAA1111", "Fixed")),
+                                              known_table(("1-AAA1111", "Open")))
+    assert len(new_fixed) == 1 and new_known.empty
+    assert statuses(ledger) == {"1-AAA1111": STATUS_FIXED}
+
+
+def test_known_after_fix_reopens_and_uses_latest_description():
+    ledger = PARLedger()
+    ledger.add_release("R520.1", fixed_table(("1-AAA1111", "Hang fixed")), pd.DataFrame())
+    _, new_known = ledger.add_release("R520.2", pd.DataFrame(), known_table(("1-AAA1111", "Hangs again")))
+    entry = ledger.entries["1-AAA1111"]
+    assert len(new_known) == 1
+    assert entry.status == STATUS_REOPENED
+    assert entry.description() == "Hangs again"
+    assert list(ledger.known_issues()["Status"]) == [STATUS_REOPENED]
+    assert ledger.stats()[STATUS_REOPENED] == 1
+
+
+def test_rows_without_par_continue_the_previous_row():
+    ledger = PARLedger()
+    ledger.add_release("R520.1", pd.DataFrame(), known_table(("1-AAA1111", "Hangs when"), (None, "the server restarts")))
+    assert ledger.entries["1-AAA1111"].description() == "Hangs when the server restarts"
@@ -0,0 +1,17 @@
+import pytest
+from scn_index import SCNIndex
+
+
+def test_unreadable_pdf_stays_listed_with_its_error(tmp_path):
+    (tmp_path / "R520.2.pdf").write_bytes(b"not a pdf")
+    index = SCNIndex(index_path=str(tmp_path / "index.json"), directories={"features": str(tmp_path)})
+    index.refresh()
+    assert index.releases("features") == ["R520.2"]
+    [row] = index.summary("features")
+    assert row["error"] and row["pages"] == 0 and row["features"] == 0
+    with pytest.raises(ValueError):
+        index.document("features", "R520.2")
+    # Unchanged, the failed file is not parsed again
+    indexed = index.indexed
+    index.refresh()
+    assert index.indexed == indexed
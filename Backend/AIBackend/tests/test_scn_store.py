@@ -0,0 +1,72 @@
+import fitz
+import pandas as pd
+import pytest
+import scn_accumulation
+import scn_index
+from scn_index import SCNIndex
+from scn_store import SCNStore
+
+
+@pytest.fixture
+def features_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "features"
+    directory.mkdir()
+    document = fitz.open()
+    document.new_page().insert_text((72, 72), "Software Change Notice")
+    document.save(str(directory / "R510.1_SCN.pdf"))
+    (directory / "R999_SCN.pdf").write_bytes(b"not a pdf")
+    index = SCNIndex(index_path=str(tmp_path / "index.json"),
+                     directories={"features": str(directory), "issues": str(tmp_path / "issues")})
+    monkeypatch.setattr(scn_index, "_index", index)
+    return directory
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SCNStore(str(tmp_path / "store.sqlite3"))
+
+
+def feature_row(summary, **extra):
+    return dict({"number": "6.1", "title": "Redundancy", "content_hash": "abc", "summary": summary}, **extra)
+
+
+def test_features_are_fresh_until_the_pdf_changes(features_dir, store):
+    assert store.features("R510.1_SCN") is None
+    store.put_features("R510.1_SCN", [feature_row("Controllers fail over faster.")])
+    assert store.features("R510.1_SCN") == [feature_row("Controllers fail over faster.")]
+
+    document = fitz.open()
+    document.new_page().insert_text((72, 72), "Revised notice")
+    document.save(str(features_dir / "R510.1_SCN.pdf"))
+    assert store.features("R510.1_SCN") is None
+
+
+def test_provisional_rows_are_not_stored(features_dir, store):
+    store.put_features("R510.1_SCN", [feature_row("First line", provisional=True)])
+    assert store.features("R510.1_SCN") is None
+    assert store.stats()["features"] == 0
+
+
+def test_issue_tables_round_trip(features_dir, store, monkeypatch):
+    monkeypatch.setattr(scn_index.get_scn_index(), "directories", {"issues": str(features_dir)})
+    fixed = pd.DataFrame([{"PAR": "1-AAA1111", "Impact": "Low", "Subsystem": "Controller", "Description": "Fixed"}])
+    store.put_issues("R510.1_SCN", fixed, pd.DataFrame())
+    stored_fixed, stored_known = store.issues("R510.1_SCN")
+    assert stored_fixed.to_dict("records") == fixed.to_dict("records")
+    assert stored_known.empty
+
+
+def test_corrupt_pdf_is_a_store_miss(features_dir, store):
+    assert store.features("R999_SCN") is None
+    store.put_features("R510.1_SCN", [feature_row("Controllers fail over faster.")])
+    assert store.features("R510.1_SCN") is not None
+
+
+def test_corrupt_pdf_fails_only_its_own_job(features_dir, store, monkeypatch):
+    monkeypatch.setattr(scn_accumulation, "features_dir", str(features_dir))
+    monkeypatch.setattr(scn_accumulation, "get_scn_store", lambda: store)
+    store.put_features("R510.1_SCN", [feature_row("Controllers fail over faster.")])
+    good, bad = scn_accumulation.submit_release_features(["R510.1_SCN", "R999_SCN"], max_workers=1, use_store=True)
+    assert good() == [feature_row("Controllers fail over faster.")]
+    with pytest.raises(ValueError):
+        bad()
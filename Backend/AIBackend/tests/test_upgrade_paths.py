@@ -0,0 +1,45 @@
+import pytest
+from services.compatibility_index import CompatibilityIndex
+from services.upgrade_paths import UpgradeGraph
+
+COMPONENTS = ["Server Hardware", "Workstation Hardware"]
+
+
+def make_graph(releases):
+    return UpgradeGraph(CompatibilityIndex({
+        release: {"Server Hardware": tuple(servers), "Workstation Hardware": ("Dell R7920XL Workstation",)}
+        for release, servers in releases.items()
+    }, COMPONENTS))
+
+
+def test_release_outside_the_matrix_upgrades_one_line_at_a_time():
+    graph = make_graph({
+        "R520.1": ["Dell R740XL Server"],
+        "R530.1": ["Dell R740XL Server"],
+    })
+    path = graph.find_path("R510", "R530.1")
+    assert path["path"] == ["R510", "R520.1", "R530.1"]
+    assert path["hops"] == 2 and path["hardware_changes"] == 0
+    assert graph.find_path("R530.1", "R520.1") is None
+
+
+def test_least_hardware_change_avoids_dropping_models():
+    graph = make_graph({
+        "R511.1": ["Dell R640 Server", "Dell R740XL Server"],
+        "R520.1": ["Dell R740XL Server"],
+        "R520.2": ["Dell R640 Server", "Dell R740XL Server"],
+        "R530.1": ["Dell R640 Server", "Dell R740XL Server"],
+    })
+    path = graph.find_path("R511.1", "R530.1", "least_hardware_change")
+    assert path["path"] == ["R511.1", "R520.2", "R530.1"]
+    assert path["hardware_changes"] == 0
+
+    direct = graph.find_path("R511.1", "R520.1", "least_hardware_change")
+    assert direct["steps"][0]["dropped_hardware"] == {"Server Hardware": ["Dell R640 Server"]}
+    assert direct["hardware_changes"] == 1
+
+
+def test_unknown_strategy_is_rejected():
+    graph = make_graph({"R520.1": ["Dell R740XL Server"]})
+    with pytest.raises(ValueError):
+        graph.find_path("R510", "R520.1", "cheapest")
@@ -0,0 +1,198 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Callable, Optional, Tuple
+from langchain.text_splitter import CharacterTextSplitter
+from langchain_community.document_loaders import TextLoader
+from langchain_core.documents import Document
+from pdf_cache import file_sha256, get_page_texts
+from embedding_pipeline import BatchedEmbeddings
+
+logger = logging.getLogger(__name__)
+
+# Incremental indexing of the chat knowledge base: every chunk is stored under the hash of
+# its source and content, so re-indexing only embeds chunks that are new or changed.
+script_dir = os.path.dirname(os.path.abspath(__file__))
+docs_dir = os.path.join(script_dir, "documents")
+user_pdfs_dir = os.path.join(script_dir, "pdfs")
+MANIFEST_NAME = "index_manifest.json"
+MANIFEST_VERSION = 1
+INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "64"))
+
+SCOPE_DOCUMENTS = "documents"
+SCOPE_USER_PDFS = "pdfs"
+
+text_splitter = CharacterTextSplitter(
+    chunk_size=1000,
+    chunk_overlap=200,
+    separator="\n"
+)
+
+
+def chunk_id(source_key: str, content: str) -> str:
+    """Stable vector ID for a chunk: the hash of its source and text"""
+    return hashlib.sha256(f"{source_key}\0{content}".encode("utf-8")).hexdigest()
+
+
+def collect_sources(include_user_pdfs: bool = False) -> Dict[str, Dict[str, str]]:
+    """Map source key (path relative to AIBackend) -> {"path", "scope"} for every indexable file"""
+    sources = {}
+    for path in sorted(Path(docs_dir).glob("*.txt")):
+        sources[os.path.relpath(path, script_dir)] = {"path": str(path), "scope": SCOPE_DOCUMENTS}
+    if include_user_pdfs:
+        for path in sorted(Path(user_pdfs_dir).glob("*/*.pdf")):
+            sources[os.path.relpath(path, script_dir)] = {"path": str(path), "scope": SCOPE_USER_PDFS}
+    return sources
+
+
+def load_source_documents(path: str) -> List[Document]:
+    """Load a text file or PDF (one document per page) for splitting"""
+    if path.lower().endswith(".pdf"):
+        return [
+            Document(page_content=page_text, metadata={"source": path, "page": page_num})
+            for page_num, page_text in enumerate(get_page_texts(path), 1)
+            if page_text.strip()
+        ]
+    return TextLoader(path).load()
+
+
+class IncrementalIndexer:
+    """Keeps a vector store in sync with source files using a manifest of per-file chunk IDs"""
+
+    def __init__(self, vector_store, persist_directory: str, batch_size: int = INDEX_BATCH_SIZE):
+        self.vector_store = vector_store
+        self.manifest_path = os.path.join(persist_directory, MANIFEST_NAME)
+        self.batch_size = batch_size
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Register a callback fired with the sync summary whenever the index changes"""
+        self._listeners.append(callback)
+
+    def _load_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable index manifest: {str(e)}")
+        return None
+
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _split(self, source_key: str, path: str) -> Tuple[List[str], List[Document]]:
+        chunk_ids = []
+        chunks = []
+        for chunk in text_splitter.split_documents(load_source_documents(path)):
+            cid = chunk_id(source_key, chunk.page_content)
+            if cid in chunk_ids:
+                continue
+            chunk.metadata["source_key"] = source_key
+            chunk_ids.append(cid)
+            chunks.append(chunk)
+        return chunk_ids, chunks
+
+    def _prefetch_embeddings(self, texts: List[str]) -> None:
+        """Embed every new chunk up front through the batched pipeline.
+
+        The pipeline checkpoints each batch, so the per-file adds that follow read their
+        vectors from the checkpoint, and an interrupted build resumes where it stopped.
+        """
+        embeddings = getattr(self.vector_store, "embeddings", None)
+        if texts and isinstance(embeddings, BatchedEmbeddings) and embeddings.checkpoint is not None:
+            embeddings.embed_documents(texts)
+
+    def _add(self, chunk_ids: List[str], chunks: List[Document]) -> None:
+        for start in range(0, len(chunks), self.batch_size):
+            self.vector_store.add_documents(
+                chunks[start:start + self.batch_size],
+                ids=chunk_ids[start:start + self.batch_size]
+            )
+
+    def _delete(self, chunk_ids: List[str]) -> None:
+        for start in range(0, len(chunk_ids), self.batch_size):
+            self.vector_store.delete(ids=chunk_ids[start:start + self.batch_size])
+
+    def sync(self, include_user_pdfs: bool = False) -> Dict[str, Any]:
+        """Embed new/changed chunks and delete vectors of changed or removed files"""
+        with self._lock:
+            manifest = self._load_manifest()
+            if manifest is None:
+                manifest = {"version": MANIFEST_VERSION, "files": {}}
+                # A store built before the manifest existed has untracked vectors; clear them once
+                legacy_ids = self.vector_store.get(include=[])["ids"]
+                if legacy_ids:
+                    logger.info(f"Removing {len(legacy_ids)} untracked vectors from a pre-manifest index")
+                    self._delete(legacy_ids)
+
+            scopes = {SCOPE_DOCUMENTS, SCOPE_USER_PDFS} if include_user_pdfs else {SCOPE_DOCUMENTS}
+            sources = collect_sources(include_user_pdfs)
+            files = manifest["files"]
+            summary = {"added": 0, "deleted": 0, "changed_files": [], "removed_files": [], "unchanged_files": 0}
+
+            changed = []
+            for source_key, source in sources.items():
+                file_hash = file_sha256(source["path"])
+                entry = files.get(source_key)
+                if entry and entry["sha256"] == file_hash:
+                    summary["unchanged_files"] += 1
+                    continue
+                chunk_ids, chunks = self._split(source_key, source["path"])
+                changed.append((source_key, source, file_hash, entry, chunk_ids, chunks))
+
+            self._prefetch_embeddings([
+                chunk.page_content
+                for _, _, _, entry, chunk_ids, chunks in changed
+                for cid, chunk in zip(chunk_ids, chunks)
+                if not entry or cid not in entry["chunk_ids"]
+            ])
+
+            for source_key, source, file_hash, entry, chunk_ids, chunks in changed:
+                old_ids = set(entry["chunk_ids"]) if entry else set()
+                new_chunks = [(cid, chunk) for cid, chunk in zip(chunk_ids, chunks) if cid not in old_ids]
+                stale_ids = sorted(old_ids - set(chunk_ids))
+
+                if new_chunks:
+                    self._add([cid for cid, _ in new_chunks], [chunk for _, chunk in new_chunks])
+                if stale_ids:
+                    self._delete(stale_ids)
+
+                files[source_key] = {"sha256": file_hash, "scope": source["scope"], "chunk_ids": chunk_ids}
+                summary["added"] += len(new_chunks)
+                summary["deleted"] += len(stale_ids)
+                summary["changed_files"].append(source_key)
+                # Persist after each file so an interrupted run keeps its progress
+                self._save_manifest(manifest)
+
+            # Only files in the scanned scopes can count as removed
+            for source_key in [key for key, entry in files.items() if entry["scope"] in scopes and key not in sources]:
+                self._delete(files[source_key]["chunk_ids"])
+                summary["deleted"] += len(files[source_key]["chunk_ids"])
+                summary["removed_files"].append(source_key)
+                del files[source_key]
+
+            self._save_manifest(manifest)
+            summary["indexed_files"] = len(files)
+
+        logger.info(
+            f"Index sync: {summary['added']} chunks embedded, {summary['deleted']} deleted, "
+            f"{len(summary['changed_files'])} changed and {len(summary['removed_files'])} removed files"
+        )
+        if summary["added"] or summary["deleted"]:
+            for callback in self._listeners:
+                try:
+                    callback(summary)
+                except Exception as e:
+                    logger.error(f"Re-index listener failed: {str(e)}")
+        return summary
@@ -0,0 +1,106 @@
+import os
+import time
+import asyncio
+import logging
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Heavy resources (the chat chain, PDF/LLM/Excel modules) are built on first use or by a
+# background warm-up after the server has bound its port, never at import time
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", "4"))
+
+
+class LazyComponent:
+    """A resource built once, on a background thread, the first time it is needed.
+
+    A failed build is not cached: the next caller starts a new attempt.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], executor: ThreadPoolExecutor):
+        self.name = name
+        self.factory = factory
+        self._executor = executor
+        self._future: Optional[Future] = None
+        self._lock = threading.Lock()
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+
+    def _build(self) -> Any:
+        self.state = "warming"
+        self.started_at = time.time()
+        try:
+            value = self.factory()
+        except Exception as e:
+            logger.error(f"Warm-up of {self.name} failed: {str(e)}")
+            self.state = "failed"
+            self.error = str(e)
+            raise
+        self.state = "ready"
+        self.error = None
+        self.ready_at = time.time()
+        logger.info(f"{self.name} ready in {self.ready_at - self.started_at:.2f}s")
+        return value
+
+    def start(self) -> Future:
+        """Start building unless a build is running or has succeeded"""
+        with self._lock:
+            if self._future is None or (self._future.done() and self._future.exception() is not None):
+                self._future = self._executor.submit(self._build)
+            return self._future
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        return self.start().result(timeout)
+
+    async def aget(self) -> Any:
+        """Wait for the resource without blocking the event loop"""
+        return await asyncio.wrap_future(self.start())
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "error": self.error,
+            "seconds": round(self.ready_at - self.started_at, 2) if self.ready_at and self.started_at else None
+        }
+
+
+class WarmupRegistry:
+    def __init__(self, workers: int = WARMUP_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warmup")
+        self._components: Dict[str, LazyComponent] = {}
+        self.created_at = time.time()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> LazyComponent:
+        component = LazyComponent(name, factory, self._executor)
+        self._components[name] = component
+        return component
+
+    def module(self, name: str, module_name: str) -> LazyComponent:
+        """Register a module whose import is deferred until first use or warm-up"""
+        return self.register(name, lambda: importlib.import_module(module_name))
+
+    def start_all(self) -> None:
+        logger.info(f"Warming up {', '.join(self._components)} in the background")
+        for component in self._components.values():
+            component.start()
+
+    def readiness(self) -> Dict[str, Any]:
+        components = {name: component.status() for name, component in self._components.items()}
+        return {
+            "ready": all(component.ready for component in self._components.values()),
+            "uptime_seconds": round(time.time() - self.created_at, 2),
+            "components": components
+        }
+
+
+warmup = WarmupRegistry()
@@ -1,4 +1,3 @@
-import fitz
 import re
 import os
 import logging
@@ -9,6 +8,8 @@ from dotenv import load_dotenv
 from typing import List, Dict, Any
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
+from AIBackend.pdf_cache import get_page_texts
+from AIBackend.llm_cache import cached_generate_content, invalidate_cached_response
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -63,9 +64,8 @@ async def extract_with_llm(text: str, doc_id: str) -> Dict[str, Any]:
 
         for attempt in range(max_retries):
             try:
-                model = genai.GenerativeModel('gemini-1.5-flash')
-                response = model.generate_content(prompt)
-                json_str = response.text.replace('```json', '').replace('```', '').strip()
+                response_text = cached_generate_content('gemini-1.5-flash', prompt)
+                json_str = response_text.replace('```json', '').replace('```', '').strip()
                 chunk_data = json.loads(json_str)
 
                 for key in required_keys:
@@ -79,6 +79,7 @@ async def extract_with_llm(text: str, doc_id: str) -> Dict[str, Any]:
 
             except json.JSONDecodeError:
                 logger.warning(f"Invalid JSON in chunk {chunk_idx+1}, attempt {attempt+1}")
+                invalidate_cached_response('gemini-1.5-flash', prompt)
                 if attempt == max_retries-1:
                     continue
             except Exception as e:
@@ -125,8 +126,7 @@ def extract_sections(text: str, doc_id: str) -> Dict[str, str]:
 async def process_single_pdf(pdf_path: Path) -> Dict[str, Any]:
     """Process a single PDF file and extract metadata"""
     try:
-        doc = fitz.open(str(pdf_path))
-        text = " ".join([page.get_text("text") for page in doc])
+        text = " ".join(get_page_texts(pdf_path))
         doc_id = extract_document_id(str(pdf_path))
         
         # Get initial results from regex
@@ -173,7 +173,8 @@ const ChatInterface = () => {
       try {
         // Make API call to backend
         const response = await axios.post('http://localhost:5001/api/chat', {
-          question: inputMessage
+          question: inputMessage,
+          session_id: activeChat.sessionId
         });
 
         // Add bot response to chat
@@ -190,6 +191,7 @@ const ChatInterface = () => {
             ? { 
                 ...chat, 
                 messages: [...chat.messages, botResponse],
+                sessionId: response.data.session_id,
                 // Update chat title if it's the first user message
                 title: chat.messages.length <= 1 ? inputMessage.slice(0, 30) + '...' : chat.title
               } 